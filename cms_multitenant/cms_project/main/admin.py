@@ -1,21 +1,101 @@
+from django import forms
 from django.contrib import admin
+from django.contrib.admin.views.main import ChangeList, ORDER_VAR
+from django.conf import settings
+from django.http import HttpResponse
+from django.shortcuts import redirect, render
+from django.db.models.functions import Now
 from unfold.admin import ModelAdmin, TabularInline
+from unfold.contrib.filters.admin import AutocompleteSelectFilter
+from unfold.decorators import action
 from .models import Property, PropertyImage, Page, Section, ContactSubmission
+from .exports import ExportActionsMixin
+from .facets import invalidate_facets
+from .importer import PropertyImporter, read_rows
+from .page_cache import invalidate_pages
+from .search import search_properties
+from .sqlite import write_atomic
+from cms_project.media_files.quotas import StorageQuotaFormMixin
+from cms_project.tenants.admin_paginator import EstimatedCountPaginator
 from cms_project.tenants.custom_admin import tenant_admin_site
+from cms_project.tenants.models import Tenant
+
+
+class PropertyImageForm(StorageQuotaFormMixin, forms.ModelForm):
+    quota_file_fields = ('image',)
+
+    def get_quota_tenant(self):
+        prop = getattr(self.instance, 'property', None)
+        return prop.tenant if prop and prop.tenant_id else self.tenant
+
+
+class SectionForm(StorageQuotaFormMixin, forms.ModelForm):
+    quota_file_fields = ('background_image',)
+
+    def get_quota_tenant(self):
+        page = self.cleaned_data.get('page')
+        return page.tenant if page else self.tenant
+
+
+class PropertyImportForm(forms.Form):
+    file = forms.FileField(label="Archivo")
+    file_format = forms.ChoiceField(label="Formato", choices=[('csv', 'CSV'), ('jsonl', 'JSONL')])
+    tenant = forms.ModelChoiceField(
+        label="Tenant", queryset=Tenant.objects.all(), required=False,
+        help_text="Sólo superusuarios; por defecto el tenant actual"
+    )
+
+    def __init__(self, *args, request=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if not request.user.is_superuser:
+            del self.fields['tenant']
 
 
 class PropertyImageInline(TabularInline):
     model = PropertyImage
+    form = PropertyImageForm
     extra = 1
     fields = ['image', 'alt_text', 'is_main', 'order']
 
+    def get_formset(self, request, obj=None, **kwargs):
+        formset = super().get_formset(request, obj, **kwargs)
+        formset.form.tenant = getattr(request, 'tenant', None)
+        return formset
+
+
+class PropertySearchChangeList(ChangeList):
+    """Ordena por relevancia cuando hay búsqueda y no se eligió otra columna"""
+
+    def get_ordering(self, request, queryset):
+        ordering = super().get_ordering(request, queryset)
+        if 'search_rank' in queryset.query.annotations and not self.params.get(ORDER_VAR):
+            ordering = ['search_rank'] + ordering
+        return ordering
 
-class PropertyAdmin(ModelAdmin):
+
+class PropertyAdmin(ExportActionsMixin, ModelAdmin):
     list_display = ['title', 'property_type', 'sale_type', 'price', 'city', 'is_featured', 'is_available', 'tenant']
-    list_filter = ['property_type', 'sale_type', 'is_featured', 'is_available', 'tenant', 'created_at']
+    list_filter = [
+        'property_type', 'sale_type', 'is_featured', 'is_available',
+        ('tenant', AutocompleteSelectFilter), 'created_at',
+    ]
+    list_filter_submit = True
+    list_select_related = ['tenant']
+    show_full_result_count = False
+    paginator = EstimatedCountPaginator
     search_fields = ['title', 'address', 'city', 'description']
     readonly_fields = ['created_at', 'updated_at']
     inlines = [PropertyImageInline]
+    actions = [
+        'mark_available', 'mark_unavailable', 'mark_featured', 'unmark_featured',
+        'export_csv', 'export_jsonl',
+    ]
+    actions_list = ['import_feed']
+    export_fields = [
+        'id', 'tenant__subdomain', 'title', 'property_type', 'sale_type', 'price', 'price_currency',
+        'address', 'city', 'state', 'country', 'zip_code', 'bedrooms', 'bathrooms', 'area',
+        'parking_spaces', 'is_featured', 'is_available', 'created_at', 'updated_at',
+    ]
     
     fieldsets = (
         ('Información Básica', {
@@ -47,12 +127,77 @@ class PropertyAdmin(ModelAdmin):
                 qs = qs.filter(tenant=request.tenant)
         return qs
     
+    def get_changelist(self, request, **kwargs):
+        return PropertySearchChangeList
+    
+    def get_search_results(self, request, queryset, search_term):
+        """Búsqueda de texto completo (FTS5) en lugar de LIKE sobre cada campo"""
+        # El superusuario ve todos los tenants; el resto sólo el suyo
+        tenant = None if request.user.is_superuser else getattr(request, 'tenant', None)
+        return search_properties(queryset, search_term, tenant), False
+    
     def save_model(self, request, obj, form, change):
         """Asignar tenant automáticamente"""
         if not change and hasattr(request, 'tenant'):
             obj.tenant = request.tenant
         super().save_model(request, obj, form, change)
 
+    def update_flags(self, request, queryset, **values):
+        """
+        Un solo UPDATE para todo el lote y una invalidación de caché por
+        tenant afectado, en lugar de las señales de cada save()
+        """
+        with write_atomic(using=queryset.db):
+            tenant_ids = list(queryset.order_by().values_list('tenant_id', flat=True).distinct())
+            updated = queryset.update(updated_at=Now(), **values)
+        for tenant_id in tenant_ids:
+            invalidate_facets(tenant_id)
+            invalidate_pages(tenant_id)
+        self.message_user(request, f"{updated} propiedades actualizadas.")
+
+    @action(description='Importar propiedades', url_path='import', permissions=['add'])
+    def import_feed(self, request):
+        """Sube un feed CSV/JSONL y lo importa con PropertyImporter"""
+        form = PropertyImportForm(request.POST or None, request.FILES or None, request=request)
+        if request.method == 'POST' and form.is_valid():
+            tenant = form.cleaned_data.get('tenant') or getattr(request, 'tenant', None)
+            importer = PropertyImporter(tenant, images_dir=getattr(settings, 'PROPERTY_IMPORT_IMAGES_DIR', None))
+            report = importer.run(read_rows(form.cleaned_data['file'], form.cleaned_data['file_format']))
+            self.message_user(
+                request,
+                f"Creadas: {report.created}. Actualizadas: {report.updated}. "
+                f"Imágenes: {report.images}. Errores: {len(report.errors)}."
+            )
+            if report.errors:
+                response = HttpResponse(content_type='text/csv; charset=utf-8')
+                response['Content-Disposition'] = 'attachment; filename="errores-importacion.csv"'
+                report.write_errors(response)
+                return response
+            return redirect(f'{self.admin_site.name}:main_property_changelist')
+
+        return render(request, 'admin/main/property/import.html', {
+            **self.admin_site.each_context(request),
+            'title': 'Importar propiedades',
+            'opts': self.model._meta,
+            'form': form,
+        })
+
+    @admin.action(description='Marcar como disponibles')
+    def mark_available(self, request, queryset):
+        self.update_flags(request, queryset, is_available=True)
+
+    @admin.action(description='Marcar como no disponibles')
+    def mark_unavailable(self, request, queryset):
+        self.update_flags(request, queryset, is_available=False)
+
+    @admin.action(description='Destacar')
+    def mark_featured(self, request, queryset):
+        self.update_flags(request, queryset, is_featured=True)
+
+    @admin.action(description='Quitar de destacadas')
+    def unmark_featured(self, request, queryset):
+        self.update_flags(request, queryset, is_featured=False)
+
 
 class SectionInline(TabularInline):
     model = Section
@@ -62,7 +207,9 @@ class SectionInline(TabularInline):
 
 class PageAdmin(ModelAdmin):
     list_display = ['title', 'page_type', 'is_homepage', 'is_active', 'tenant', 'created_at']
-    list_filter = ['page_type', 'is_active', 'is_homepage', 'tenant']
+    list_filter = ['page_type', 'is_active', 'is_homepage', ('tenant', AutocompleteSelectFilter)]
+    list_filter_submit = True
+    list_select_related = ['tenant']
     search_fields = ['title', 'slug', 'meta_description']
     prepopulated_fields = {'slug': ('title',)}
     inlines = [SectionInline]
@@ -90,8 +237,11 @@ class PageAdmin(ModelAdmin):
 
 
 class SectionAdmin(ModelAdmin):
+    form = SectionForm
     list_display = ['page', 'section_type', 'title', 'order', 'is_active']
-    list_filter = ['section_type', 'is_active', 'page__tenant']
+    list_filter = ['section_type', 'is_active', ('page__tenant', AutocompleteSelectFilter)]
+    list_filter_submit = True
+    list_select_related = ['page__tenant']
     search_fields = ['title', 'subtitle', 'content']
     
     fieldsets = (
@@ -114,12 +264,29 @@ class SectionAdmin(ModelAdmin):
                 qs = qs.filter(page__tenant=request.tenant)
         return qs
 
+    def get_form(self, request, obj=None, **kwargs):
+        form = super().get_form(request, obj, **kwargs)
+        form.tenant = getattr(request, 'tenant', None)
+        return form
+
 
-class ContactSubmissionAdmin(ModelAdmin):
+class ContactSubmissionAdmin(ExportActionsMixin, ModelAdmin):
     list_display = ['name', 'email', 'phone', 'subject', 'property_interest', 'is_read', 'created_at', 'tenant']
-    list_filter = ['is_read', 'tenant', 'created_at', 'property_interest']
+    list_filter = [
+        'is_read', ('tenant', AutocompleteSelectFilter), 'created_at',
+        ('property_interest', AutocompleteSelectFilter),
+    ]
+    list_filter_submit = True
+    list_select_related = ['tenant', 'property_interest__tenant']
+    show_full_result_count = False
+    paginator = EstimatedCountPaginator
     search_fields = ['name', 'email', 'phone', 'subject', 'message']
     readonly_fields = ['created_at']
+    actions = ['mark_read', 'mark_unread', 'export_csv', 'export_jsonl']
+    export_fields = [
+        'id', 'tenant__subdomain', 'name', 'email', 'phone', 'subject', 'message',
+        'property_interest_id', 'property_interest__title', 'is_read', 'created_at',
+    ]
     
     fieldsets = (
         ('Información del Contacto', {
@@ -146,9 +313,24 @@ class ContactSubmissionAdmin(ModelAdmin):
         super().save_model(request, obj, form, change)
 
 
+    @admin.action(description='Marcar como leídos')
+    def mark_read(self, request, queryset):
+        updated = queryset.update(is_read=True)
+        self.message_user(request, f"{updated} contactos marcados como leídos.")
+
+    @admin.action(description='Marcar como no leídos')
+    def mark_unread(self, request, queryset):
+        updated = queryset.update(is_read=False)
+        self.message_user(request, f"{updated} contactos marcados como no leídos.")
+
+
 class PropertyImageAdmin(ModelAdmin):
     list_display = ['property', 'alt_text', 'is_main', 'order', 'created_at']
-    list_filter = ['is_main', 'property__tenant']
+    list_filter = ['is_main', ('property__tenant', AutocompleteSelectFilter)]
+    list_filter_submit = True
+    list_select_related = ['property__tenant']
+    show_full_result_count = False
+    paginator = EstimatedCountPaginator
     search_fields = ['property__title', 'alt_text']
     
     def get_queryset(self, request):
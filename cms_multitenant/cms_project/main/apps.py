@@ -6,3 +6,12 @@ class MainConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'cms_project.main'
     verbose_name = 'Páginas y Propiedades'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+        from django.db.models.signals import post_migrate
+        from . import signals  # noqa: F401
+        from .sqlite import install_locked_retry, set_transaction_mode
+        post_migrate.connect(signals.ensure_search_index, sender=self)
+        connection_created.connect(install_locked_retry)
+        connection_created.connect(set_transaction_mode)
@@ -0,0 +1,202 @@
+
+import json
+import math
+import random
+import time
+
+from django.db import connection
+from django.test import Client
+
+from cms_project.tenants.models import Tenant
+from .facets import invalidate_facets
+from .instrumentation import QueryTimer
+from .models import Page, Property
+from .page_cache import invalidate_pages
+from .sharding import use_tenant
+from .submissions import submission_writer
+
+
+# Métricas comparadas contra la línea base: latencia con tolerancia
+# relativa (p99 sólo se informa: con pocas muestras es ruidoso), consultas
+# SQL sin tolerancia (deberían ser deterministas)
+LATENCY_METRICS = ['p50_ms', 'p95_ms']
+QUERY_METRICS = ['queries']
+
+
+def home_request(rng, target, number):
+    return 'get', '/', None
+
+
+def properties_request(rng, target, number):
+    return 'get', '/propiedades/', None
+
+
+def properties_filtered_request(rng, target, number):
+    city = rng.choice(target['cities'])
+    return 'get', f'/propiedades/?type=house&sale=sale&city={city}&min_price=100000&sort=price_asc', None
+
+
+def properties_search_request(rng, target, number):
+    word = rng.choice(['piscina', 'terraza', 'jardín', 'ático', 'centro'])
+    return 'get', f'/propiedades/?q={word}', None
+
+
+def page_detail_request(rng, target, number):
+    return 'get', f"/{rng.choice(target['pages'])}/", None
+
+
+def property_detail_request(rng, target, number):
+    return 'get', f"/propiedad/{rng.choice(target['properties'])}/", None
+
+
+def contact_request(rng, target, number):
+    data = {
+        'name': 'Benchmark',
+        'email': f'benchmark{number}@example.com',
+        'message': 'Consulta de prueba',
+        'property_id': rng.choice(target['properties']),
+    }
+    return 'post', '/contacto/', data
+
+
+SCENARIOS = {
+    'home': home_request,
+    'properties': properties_request,
+    'properties_filtered': properties_filtered_request,
+    'properties_search': properties_search_request,
+    'page_detail': page_detail_request,
+    'property_detail': property_detail_request,
+    'contact': contact_request,
+}
+
+
+def build_targets(limit=500):
+    """Por tenant: host, ciudades, páginas y propiedades disponibles para las URLs"""
+    targets = []
+    for tenant in Tenant.objects.filter(is_active=True).order_by('pk'):
+        with use_tenant(tenant):
+            properties = list(Property.objects.filter(tenant=tenant, is_available=True)
+                              .order_by('pk').values_list('pk', flat=True)[:limit])
+            if not properties:
+                continue
+            targets.append({
+                'tenant_id': tenant.pk,
+                'host': f'{tenant.subdomain}.localhost',
+                'cities': sorted(set(Property.objects.filter(tenant=tenant).values_list('city', flat=True)[:limit])),
+                'pages': list(Page.objects.filter(tenant=tenant, is_active=True, is_homepage=False)
+                              .exclude(slug='propiedades').values_list('slug', flat=True)) or ['propiedades'],
+                'properties': properties,
+            })
+    return targets
+
+
+def percentile(values, pct):
+    """Percentil por rango más cercano sobre una lista ordenada"""
+    if not values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100 * len(values)))
+    return values[rank - 1]
+
+
+def summarize(timings, queries, sql_times, errors):
+    timings = sorted(timings)
+    total = sum(timings)
+    count = len(timings)
+    return {
+        'requests': count,
+        'errors': errors,
+        'p50_ms': round(percentile(timings, 50) * 1000, 2),
+        'p95_ms': round(percentile(timings, 95) * 1000, 2),
+        'p99_ms': round(percentile(timings, 99) * 1000, 2),
+        'mean_ms': round(total / count * 1000, 2) if count else 0.0,
+        'rps': round(count / total, 1) if total else 0.0,
+        'queries': round(sum(queries) / count, 2) if count else 0.0,
+        'max_queries': max(queries, default=0),
+        'sql_ms': round(sum(sql_times) / count * 1000, 2) if count else 0.0,
+    }
+
+
+def run_scenario(name, targets, requests=100, warmup=5, warm_cache=False, seed=0):
+    """
+    Ejecuta `requests` peticiones de un escenario repartidas entre los
+    tenants y devuelve sus métricas. Sin `warm_cache` se invalidan las
+    cachés de páginas y facets antes de cada petición, así se mide el
+    trabajo de la vista y no sólo la lectura de la caché.
+    """
+    builder = SCENARIOS[name]
+    rng = random.Random(f'{seed}:{name}')
+    client = Client()
+    timings, queries, sql_times, errors = [], [], [], 0
+    for number in range(-warmup, requests):
+        target = targets[number % len(targets)]
+        method, path, data = builder(rng, target, number)
+        if not warm_cache:
+            invalidate_pages(target['tenant_id'])
+            invalidate_facets(target['tenant_id'])
+        extra = {
+            'HTTP_HOST': target['host'],
+            # Una IP por petición: el límite de contactos no debe cortar el benchmark
+            'REMOTE_ADDR': f'10.{number % 250}.{number // 250 % 250}.1',
+        }
+        timer = QueryTimer()
+        with connection.execute_wrapper(timer):
+            started = time.perf_counter()
+            if method == 'post':
+                response = client.post(path, json.dumps(data), content_type='application/json', **extra)
+            else:
+                response = client.get(path, **extra)
+            elapsed = time.perf_counter() - started
+        if number < 0:
+            continue
+        timings.append(elapsed)
+        queries.append(timer.count)
+        sql_times.append(timer.seconds)
+        if response.status_code >= 400:
+            errors += 1
+    if name == 'contact':
+        # Los contactos se escriben en segundo plano; no dejar trabajo pendiente
+        submission_writer.flush()
+    return summarize(timings, queries, sql_times, errors)
+
+
+def run_benchmark(scenarios=None, requests=100, warmup=5, warm_cache=False, seed=0):
+    targets = build_targets()
+    if not targets:
+        raise ValueError('No hay tenants con propiedades disponibles')
+    return {
+        name: run_scenario(name, targets, requests, warmup, warm_cache, seed)
+        for name in scenarios or SCENARIOS
+    }
+
+
+def compare(results, baseline, tolerance=0.25):
+    """Lista de regresiones respecto de la línea base (vacía si no hay)"""
+    regressions = []
+    for name, metrics in results.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        if metrics['errors'] > base.get('errors', 0):
+            regressions.append(f"{name}: errores {base.get('errors', 0)} -> {metrics['errors']}")
+        for metric in LATENCY_METRICS:
+            if metric in base and metrics[metric] > base[metric] * (1 + tolerance):
+                regressions.append(f'{name}: {metric} {base[metric]} -> {metrics[metric]}')
+        for metric in QUERY_METRICS:
+            if metric in base and metrics[metric] > base[metric]:
+                regressions.append(f'{name}: {metric} {base[metric]} -> {metrics[metric]}')
+    return regressions
+
+
+def format_table(results, baseline=None):
+    """Tabla de texto con la variación de p95 y consultas respecto de la línea base"""
+    baseline = baseline or {}
+    columns = ['p50_ms', 'p95_ms', 'p99_ms', 'rps', 'queries', 'sql_ms', 'errors']
+    lines = [f"{'escenario':<22}" + ''.join(f'{column:>10}' for column in columns) + f"{'Δp95':>9}{'Δsql#':>8}"]
+    for name, metrics in results.items():
+        line = f'{name:<22}' + ''.join(f'{metrics[column]:>10}' for column in columns)
+        base = baseline.get(name)
+        if base and base.get('p95_ms'):
+            line += f"{(metrics['p95_ms'] / base['p95_ms'] - 1) * 100:>+8.0f}%"
+            line += f"{metrics['queries'] - base.get('queries', 0):>+8.1f}"
+        lines.append(line)
+    return '\n'.join(lines)
@@ -0,0 +1,22 @@
+
+from contextlib import contextmanager
+
+
+@contextmanager
+def explicit_timestamps(model):
+    """
+    Desactiva auto_now/auto_now_add mientras dura el bloque para que
+    bulk_create respete las fechas de los objetos. Cambia el campo del
+    modelo en todo el proceso: sólo para comandos (seed_data, move_tenant),
+    nunca en una request.
+    """
+    fields = [field for field in model._meta.concrete_fields if getattr(field, 'auto_now', False)
+              or getattr(field, 'auto_now_add', False)]
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
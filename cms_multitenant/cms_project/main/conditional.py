@@ -0,0 +1,92 @@
+
+import hashlib
+from datetime import datetime
+
+from django.db.models import Count, Max
+from django.views.decorators.http import condition
+
+from .models import Page, Property
+
+
+def properties_modified(tenant):
+    """
+    Última modificación y cantidad de propiedades del tenant, ambas sobre
+    el índice (tenant, updated_at). La cantidad detecta los borrados.
+    """
+    result = Property.objects.filter(tenant=tenant).aggregate(
+        last_modified=Max('updated_at'), total=Count('id')
+    )
+    return [result['last_modified'], result['total']]
+
+
+def page_modified(tenant, **lookup):
+    """
+    Última modificación de la página y sus secciones, o None si la página
+    no existe (la vista se encarga del 404 o de crearla)
+    """
+    page = Page.objects.filter(tenant=tenant, is_active=True, **lookup).annotate(
+        sections_updated_at=Max('section__updated_at'), sections=Count('section')
+    ).values('page_type', 'updated_at', 'sections_updated_at', 'sections').first()
+    if page is None:
+        return None
+    parts = [page['updated_at'], page['sections_updated_at'], page['sections']]
+    if page['page_type'] in ('home', 'properties'):
+        parts += properties_modified(tenant)
+    return parts
+
+
+def content_validator(validator_func):
+    """
+    Decorador que responde 304 sin ejecutar la vista si el contenido no
+    cambió. `validator_func(request, ...)` devuelve las fechas de
+    modificación (y cantidades) de los objetos que muestra la vista; se
+    calcula una sola vez por request.
+
+    Last-Modified es la fecha más reciente y el ETag resume todas las
+    partes, así que también cambia cuando se borra algún objeto.
+    """
+    def get_parts(request, *args, **kwargs):
+        if not hasattr(request, '_content_validator'):
+            tenant = getattr(request, 'tenant', None)
+            parts = validator_func(request, *args, **kwargs) if tenant else None
+            if parts is not None:
+                parts = [tenant.pk, tenant.updated_at, *parts]
+            request._content_validator = parts
+        return request._content_validator
+
+    def get_last_modified(request, *args, **kwargs):
+        parts = get_parts(request, *args, **kwargs)
+        dates = [part for part in parts or [] if isinstance(part, datetime)]
+        return max(dates) if dates else None
+
+    def get_etag(request, *args, **kwargs):
+        parts = get_parts(request, *args, **kwargs)
+        if parts is None:
+            return None
+        token = ':'.join(str(part) for part in [*parts, request.get_full_path()])
+        return hashlib.md5(token.encode()).hexdigest()
+
+    return condition(etag_func=get_etag, last_modified_func=get_last_modified)
+
+
+def home_validator(request):
+    return page_modified(request.tenant, is_homepage=True)
+
+
+def page_detail_validator(request, slug):
+    return page_modified(request.tenant, slug=slug)
+
+
+def property_detail_validator(request, property_id):
+    """
+    La fila de la propiedad y el mismo corte de similares que muestra la
+    ficha. Guardar o borrar una imagen (o terminar sus variantes) actualiza
+    updated_at de su propiedad, así que las imágenes ya quedan cubiertas.
+    """
+    prop = Property.objects.filter(
+        tenant=request.tenant, pk=property_id, is_available=True
+    ).only('tenant_id', 'property_type', 'updated_at').first()
+    if prop is None:
+        return None
+    similar = Property.objects.similar_to(prop).values_list('pk', 'updated_at')
+    return [prop.updated_at, *[part for row in similar for part in row]]
@@ -0,0 +1,64 @@
+
+import csv
+import json
+
+from django.contrib import admin
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+
+class Echo:
+    """Pseudo-buffer: csv.writer devuelve cada línea en lugar de acumularla"""
+
+    def write(self, value):
+        return value
+
+
+def export_rows(queryset, fields, chunk_size=2000):
+    # values_list + iterator: sin instancias de modelo ni caché del queryset
+    return queryset.order_by('pk').values_list(*fields).iterator(chunk_size=chunk_size)
+
+
+def csv_lines(queryset, fields):
+    writer = csv.writer(Echo())
+    yield writer.writerow(fields)
+    for row in export_rows(queryset, fields):
+        yield writer.writerow(row)
+
+
+def jsonl_lines(queryset, fields):
+    for row in export_rows(queryset, fields):
+        yield json.dumps(dict(zip(fields, row)), default=str, ensure_ascii=False) + '\n'
+
+
+def streaming_export(queryset, fields, basename, export_format):
+    # La respuesta se genera después de la vista, ya sin el tenant de la
+    # request en el contexto: la base (shard) se fija ahora
+    queryset = queryset.using(queryset.db)
+    if export_format == 'csv':
+        lines, content_type = csv_lines(queryset, fields), 'text/csv; charset=utf-8'
+    else:
+        lines, content_type = jsonl_lines(queryset, fields), 'application/x-ndjson; charset=utf-8'
+    filename = f'{basename}-{timezone.now():%Y%m%d-%H%M}.{export_format}'
+    response = StreamingHttpResponse(lines, content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+class ExportActionsMixin:
+    """
+    Acciones de exportación del queryset filtrado/seleccionado en el admin.
+    Cada admin define `export_fields` (se admiten rutas con __).
+    """
+    export_fields = ()
+
+    def get_export_basename(self):
+        return self.model._meta.model_name
+
+    @admin.action(description='Exportar seleccionados a CSV')
+    def export_csv(self, request, queryset):
+        return streaming_export(queryset, list(self.export_fields), self.get_export_basename(), 'csv')
+
+    @admin.action(description='Exportar seleccionados a JSONL')
+    def export_jsonl(self, request, queryset):
+        return streaming_export(queryset, list(self.export_fields), self.get_export_basename(), 'jsonl')
@@ -0,0 +1,121 @@
+
+import hashlib
+import json
+from collections import Counter
+
+from django.conf import settings
+from django.db.models import BooleanField, Case, CharField, Count, Q, Value, When
+
+from cms_project.tenants.cache import tenant_cache, get_tenant_version, bump_tenant_version
+from .models import Property
+from .replicas import primary_reads_after_bump
+
+
+FACETS_NAMESPACE = 'facets'
+
+# Rangos de precio (clave, etiqueta, mínimo inclusive, máximo exclusivo)
+PRICE_BUCKETS = [
+    ('0-1000', 'Hasta $1.000', None, 1000),
+    ('1000-100000', '$1.000 - $100.000', 1000, 100000),
+    ('100000-250000', '$100.000 - $250.000', 100000, 250000),
+    ('250000-500000', '$250.000 - $500.000', 250000, 500000),
+    ('500000-1000000', '$500.000 - $1.000.000', 500000, 1000000),
+    ('1000000-', 'Más de $1.000.000', 1000000, None),
+]
+
+
+def price_bucket_expression():
+    whens = []
+    for key, _, low, high in PRICE_BUCKETS:
+        condition = Q()
+        if low is not None:
+            condition &= Q(price__gte=low)
+        if high is not None:
+            condition &= Q(price__lt=high)
+        whens.append(When(condition, then=Value(key)))
+    return Case(*whens, output_field=CharField())
+
+
+# Filtro que pertenece a cada facet además del de su propia dimensión: el
+# rango de precio elegido no se aplica a los conteos por rango de precio
+OWN_FILTERS = {'price_bucket': 'in_price_range'}
+
+
+def facet_rows(properties, price_filter=None):
+    """
+    Una sola consulta agrupada por tipo, operación, ciudad y rango de
+    precio. Las combinaciones son pocas, así que el resto se suma en Python.
+    `in_price_range` marca las filas que cumplen el filtro de precio.
+    """
+    if price_filter:
+        in_price_range = Case(When(price_filter, then=Value(True)), default=Value(False),
+                              output_field=BooleanField())
+    else:
+        in_price_range = Value(True, output_field=BooleanField())
+    return list(
+        properties
+        .order_by()
+        .annotate(price_bucket=price_bucket_expression(), in_price_range=in_price_range)
+        .values('property_type', 'sale_type', 'city', 'price_bucket', 'in_price_range')
+        .annotate(total=Count('id'))
+    )
+
+
+def row_matches(row, dimension, value):
+    if dimension == 'city':
+        # Igual que el filtro city__icontains de la vista
+        return value.lower() in row['city'].lower()
+    return row[dimension] == value
+
+
+def count_facet(rows, dimension, selected):
+    """
+    Cuenta por `dimension` aplicando los demás filtros seleccionados pero no
+    el propio, para que las otras opciones sigan mostrando su total
+    """
+    own = {dimension, OWN_FILTERS.get(dimension)}
+    counts = Counter()
+    for row in rows:
+        if all(row_matches(row, other, value)
+               for other, value in selected.items() if value and other not in own):
+            counts[row[dimension]] += row['total']
+    return counts
+
+
+def get_facets(tenant, properties, signature, selected, price_filter=None):
+    """
+    Devuelve los conteos por tipo, operación, ciudad y precio.
+
+    `properties` es el queryset con los filtros que se resuelven en SQL
+    (búsqueda) y `signature` los identifica junto con el rango de precio
+    `price_filter`. `selected` contiene los filtros de tipo, operación y
+    ciudad, que se aplican sobre las filas cacheadas, así una misma entrada
+    sirve para cualquier combinación. Cada facet aplica todos los filtros
+    menos el suyo: los rangos de precio no se restringen al rango elegido.
+    """
+    digest = hashlib.md5(json.dumps(signature, sort_keys=True).encode()).hexdigest()
+    version = get_tenant_version(FACETS_NAMESPACE, tenant.pk)
+    key = f'facets:{tenant.pk}:{version}:{digest}'
+    cache = tenant_cache.shared
+    rows = cache.get(key)
+    if rows is None:
+        with primary_reads_after_bump(FACETS_NAMESPACE, tenant.pk):
+            rows = facet_rows(properties, price_filter)
+        cache.set(key, rows, getattr(settings, 'FACETS_CACHE_TIMEOUT', 300))
+
+    if price_filter:
+        selected = {**selected, 'in_price_range': True}
+    types = count_facet(rows, 'property_type', selected)
+    sale_types = count_facet(rows, 'sale_type', selected)
+    cities = count_facet(rows, 'city', selected)
+    prices = count_facet(rows, 'price_bucket', selected)
+    return {
+        'property_type': [(key, label, types[key]) for key, label in Property.PROPERTY_TYPES],
+        'sale_type': [(key, label, sale_types[key]) for key, label in Property.SALE_TYPES],
+        'city': [(city, city, cities[city]) for city in sorted(cities)],
+        'price': [(key, label, prices[key]) for key, label, _, _ in PRICE_BUCKETS],
+    }
+
+
+def invalidate_facets(tenant_id):
+    bump_tenant_version(FACETS_NAMESPACE, tenant_id)
@@ -0,0 +1,234 @@
+
+import threading
+import time
+from contextlib import ExitStack
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+from django.template import TemplateDoesNotExist
+from django.template.backends.django import DjangoTemplates, Template, reraise
+
+
+# Límites superiores (ms) de los buckets de latencia; el último es abierto
+LATENCY_BUCKETS = [5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000]
+
+# Métricas de la request en curso (para el backend de plantillas)
+_current = ContextVar('request_metrics', default=None)
+
+
+class QueryTimer:
+    """execute_wrapper que cuenta y cronometra las consultas de la conexión"""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.seconds += time.perf_counter() - started
+
+
+class RequestMetrics:
+    """Tiempos de una request: total, SQL y render de plantillas"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.total = 0.0
+        self.queries = QueryTimer()
+        self.template_seconds = 0.0
+        self.template_depth = 0
+
+    def finish(self):
+        self.total = time.perf_counter() - self.started
+
+    def server_timing(self):
+        return ', '.join([
+            f'db;dur={self.queries.seconds * 1000:.1f};desc="{self.queries.count} consultas"',
+            f'tpl;dur={self.template_seconds * 1000:.1f};desc="plantillas"',
+            f'total;dur={self.total * 1000:.1f}',
+        ])
+
+
+class TimedTemplate(Template):
+    def render(self, context=None, request=None):
+        metrics = _current.get()
+        if metrics is None:
+            return super().render(context, request)
+        # Sólo se mide el render externo; los anidados ya están incluidos
+        metrics.template_depth += 1
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            metrics.template_depth -= 1
+            if not metrics.template_depth:
+                metrics.template_seconds += time.perf_counter() - started
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """
+    Backend de plantillas de Django que mide el render para las métricas
+    de la request. El tiempo incluye las consultas que se ejecutan al
+    recorrer querysets perezosos desde la plantilla.
+    """
+
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return TimedTemplate(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            reraise(exc, self)
+
+
+class Histogram:
+    """Acumulado de las requests de un tenant y una vista"""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.sql = 0.0
+        self.queries = 0
+        self.templates = 0.0
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+
+    def add(self, metrics):
+        total_ms = metrics.total * 1000
+        self.count += 1
+        self.total += metrics.total
+        self.max = max(self.max, total_ms)
+        self.sql += metrics.queries.seconds
+        self.queries += metrics.queries.count
+        self.templates += metrics.template_seconds
+        self.buckets[self.bucket(total_ms)] += 1
+
+    @staticmethod
+    def bucket(total_ms):
+        for index, bound in enumerate(LATENCY_BUCKETS):
+            if total_ms <= bound:
+                return index
+        return len(LATENCY_BUCKETS)
+
+    def merge(self, other):
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+        self.sql += other.sql
+        self.queries += other.queries
+        self.templates += other.templates
+        self.buckets = [a + b for a, b in zip(self.buckets, other.buckets)]
+        return self
+
+    def percentile(self, pct):
+        """Cota superior del bucket que contiene el percentil (nunca más que el máximo)"""
+        target = pct / 100 * self.count
+        seen = 0
+        for index, count in enumerate(self.buckets):
+            seen += count
+            if count and seen >= target:
+                bound = LATENCY_BUCKETS[index] if index < len(LATENCY_BUCKETS) else self.max
+                return min(bound, self.max)
+        return self.max
+
+    def as_dict(self):
+        count = self.count or 1
+        return {
+            'count': self.count,
+            'mean_ms': round(self.total / count * 1000, 1),
+            'p50_ms': round(self.percentile(50), 1),
+            'p95_ms': round(self.percentile(95), 1),
+            'max_ms': round(self.max, 1),
+            'queries': round(self.queries / count, 1),
+            'sql_ms': round(self.sql / count * 1000, 1),
+            'template_ms': round(self.templates / count * 1000, 1),
+            'total_s': round(self.total, 2),
+            'sql_total_s': round(self.sql, 2),
+        }
+
+
+class MetricsRegistry:
+    """
+    Histogramas en memoria por (tenant, vista), propios de cada proceso.
+    La cantidad de claves está acotada: las que no entran se agrupan en
+    el tenant OVERFLOW_TENANT.
+    """
+    OVERFLOW_TENANT = '(otros)'
+
+    def __init__(self, max_keys=2000):
+        self.max_keys = max_keys
+        self.lock = threading.Lock()
+        self.histograms = {}
+        self.since = time.time()
+
+    def record(self, tenant, view, metrics):
+        with self.lock:
+            key = (tenant, view)
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                if len(self.histograms) >= self.max_keys:
+                    key = (self.OVERFLOW_TENANT, view)
+                histogram = self.histograms.setdefault(key, Histogram())
+            histogram.add(metrics)
+
+    def summary(self, by, tenant=None, order='total_s', limit=20):
+        """
+        Filas agrupadas por 'view', 'tenant' o 'both', ordenadas de mayor a
+        menor según `order` (cualquier clave de Histogram.as_dict)
+        """
+        groups = {}
+        with self.lock:
+            for (row_tenant, view), histogram in self.histograms.items():
+                if tenant is not None and row_tenant != tenant:
+                    continue
+                name = {'view': view, 'tenant': row_tenant, 'both': f'{row_tenant} · {view}'}[by]
+                groups.setdefault(name, Histogram()).merge(histogram)
+        rows = [{'name': name, **histogram.as_dict()} for name, histogram in groups.items()]
+        rows.sort(key=lambda row: row[order], reverse=True)
+        return rows[:limit]
+
+    def reset(self):
+        with self.lock:
+            self.histograms.clear()
+            self.since = time.time()
+
+
+registry = MetricsRegistry(max_keys=getattr(settings, 'REQUEST_METRICS_MAX_KEYS', 2000))
+
+
+class RequestMetricsMiddleware:
+    """
+    Mide cada request (consultas y tiempo SQL en todas las conexiones,
+    render de plantillas y tiempo total), la suma al histograma de su
+    tenant y su vista, y la informa en la cabecera Server-Timing.
+    Va primero en MIDDLEWARE para que el total incluya a los demás.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.server_timing = getattr(settings, 'REQUEST_METRICS_SERVER_TIMING', True)
+
+    def __call__(self, request):
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        try:
+            with ExitStack() as stack:
+                for alias in connections:
+                    stack.enter_context(connections[alias].execute_wrapper(metrics.queries))
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        metrics.finish()
+
+        tenant = getattr(request, 'tenant', None)
+        match = getattr(request, 'resolver_match', None)
+        registry.record(tenant.subdomain if tenant else '-', match.view_name if match else '(sin ruta)', metrics)
+        if self.server_timing:
+            response['Server-Timing'] = metrics.server_timing()
+        return response
@@ -0,0 +1,97 @@
+import json
+import os
+import platform
+import tempfile
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+
+from cms_project.main.benchmark import SCENARIOS, compare, format_table, run_benchmark
+from cms_project.main.seeding import TenantSeeder
+
+
+class Command(BaseCommand):
+    help = (
+        'Mide las vistas públicas (p50/p95/p99, req/s, consultas y tiempo SQL) sobre una base '
+        'de pruebas sembrada y compara con la línea base guardada'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tenants', type=int, default=3)
+        parser.add_argument('--properties', type=int, default=2000, help='Propiedades por tenant')
+        parser.add_argument('--requests', type=int, default=200, help='Peticiones medidas por escenario')
+        parser.add_argument('--warmup', type=int, default=10)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--scenarios', help=f"Separados por coma: {', '.join(SCENARIOS)}")
+        parser.add_argument('--warm-cache', action='store_true', help='No invalidar las cachés entre peticiones')
+        parser.add_argument('--baseline', default=os.path.join(settings.BASE_DIR, 'benchmarks', 'baseline.json'))
+        parser.add_argument('--save-baseline', action='store_true', help='Guardar el resultado como nueva línea base')
+        parser.add_argument('--output', help='Guardar el resultado en este archivo JSON')
+        parser.add_argument('--tolerance', type=float, default=0.25, help='Aumento de p50/p95 tolerado (0.25 = 25%%)')
+        parser.add_argument('--fail-on-regression', action='store_true')
+
+    def handle(self, *args, **options):
+        scenarios = options['scenarios'].split(',') if options['scenarios'] else list(SCENARIOS)
+        unknown = set(scenarios) - set(SCENARIOS)
+        if unknown:
+            raise CommandError(f"Escenarios desconocidos: {', '.join(sorted(unknown))}")
+        meta = {
+            'tenants': options['tenants'],
+            'properties': options['properties'],
+            'requests': options['requests'],
+            'warm_cache': options['warm_cache'],
+            'seed': options['seed'],
+        }
+
+        # Base de pruebas aparte: la base de desarrollo no se toca
+        # (y las imágenes de relleno van a una carpeta temporal)
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            with tempfile.TemporaryDirectory() as media_root, override_settings(MEDIA_ROOT=media_root):
+                for index in range(options['tenants']):
+                    TenantSeeder(index, properties=options['properties'], images=1, pages=2,
+                                 seed=options['seed']).run()
+                results = run_benchmark(scenarios, options['requests'], options['warmup'],
+                                        options['warm_cache'], options['seed'])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        baseline = {}
+        if os.path.exists(options['baseline']):
+            with open(options['baseline'], encoding='utf-8') as handle:
+                stored = json.load(handle)
+            baseline = stored.get('results', {})
+            if stored.get('meta') != meta:
+                self.stderr.write(self.style.WARNING(
+                    f"La línea base se midió con otros parámetros: {stored.get('meta')}"
+                ))
+
+        self.stdout.write(format_table(results, baseline))
+        report = {
+            'meta': meta,
+            'environment': {
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'database': connection.vendor,
+            },
+            'results': results,
+        }
+        for path in filter(None, [options['output'], options['save_baseline'] and options['baseline']]):
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            with open(path, 'w', encoding='utf-8') as handle:
+                json.dump(report, handle, indent=2, ensure_ascii=False)
+                handle.write('\n')
+            self.stdout.write(f'Resultado guardado en {path}')
+
+        regressions = compare(results, baseline, options['tolerance']) if not options['save_baseline'] else []
+        for regression in regressions:
+            self.stdout.write(self.style.ERROR(f'Regresión: {regression}'))
+        if regressions and options['fail_on_regression']:
+            raise CommandError(f'{len(regressions)} regresiones respecto de la línea base')
+        if not regressions:
+            self.stdout.write(self.style.SUCCESS('Sin regresiones'))
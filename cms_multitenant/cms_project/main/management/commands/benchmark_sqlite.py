@@ -0,0 +1,81 @@
+import json
+import multiprocessing
+import os
+import tempfile
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from cms_project.main.benchmark import summarize
+from cms_project.main.sqlite import bench_reader, bench_setup, bench_writer
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark de concurrencia de SQLite: lectores del catálogo mientras escriben el admin y '
+        'los contactos, con la configuración por defecto de SQLite y con el perfil de producción'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--readers', type=int, default=4)
+        parser.add_argument('--writers', type=int, default=2)
+        parser.add_argument('--duration', type=float, default=5.0, help='Segundos por perfil')
+        parser.add_argument('--rows', type=int, default=20000)
+        parser.add_argument('--output', help='Guardar el resultado en este archivo JSON')
+
+    def profiles(self):
+        options = settings.DATABASES['default'].get('OPTIONS', {})
+        return {
+            # Lo que usa Django sin configurar nada
+            'default': {'init_command': 'PRAGMA journal_mode = DELETE', 'timeout': 5, 'begin': 'DEFERRED', 'retries': 0},
+            'production': {
+                'init_command': options.get('init_command', ''),
+                'timeout': options.get('timeout', 5),
+                'begin': options.get('transaction_mode') or 'DEFERRED',
+                'retries': getattr(settings, 'SQLITE_WRITE_RETRIES', 0),
+            },
+        }
+
+    def handle(self, *args, **options):
+        context = multiprocessing.get_context('spawn')
+        report = {}
+        with tempfile.TemporaryDirectory() as directory:
+            for name, profile in self.profiles().items():
+                path = os.path.join(directory, f'{name}.sqlite3')
+                bench_setup(path, profile, options['rows'])
+                results = context.Queue()
+                processes = [
+                    context.Process(target=target, args=(path, profile, options['duration'], results))
+                    for target, count in ((bench_reader, options['readers']), (bench_writer, options['writers']))
+                    for _ in range(count)
+                ]
+                for process in processes:
+                    process.start()
+                collected = {'read': ([], 0), 'write': ([], 0)}
+                for _ in processes:
+                    kind, latencies, errors = results.get()
+                    collected[kind] = (collected[kind][0] + latencies, collected[kind][1] + errors)
+                for process in processes:
+                    process.join()
+
+                report[name] = {}
+                for kind, (latencies, errors) in collected.items():
+                    metrics = summarize(latencies, [], [], errors)
+                    # Rendimiento agregado de todos los procesos, no por proceso
+                    metrics['ops_per_s'] = round(len(latencies) / options['duration'], 1)
+                    report[name][kind] = {key: metrics[key] for key in
+                                          ('ops_per_s', 'p50_ms', 'p95_ms', 'p99_ms', 'errors')}
+
+        self.stdout.write(f"{options['readers']} lectores y {options['writers']} escritores, "
+                          f"{options['duration']:.0f}s por perfil")
+        self.stdout.write(f"{'perfil':<12}{'tipo':<7}{'ops/s':>10}{'p50_ms':>10}{'p95_ms':>10}{'p99_ms':>10}{'errores':>9}")
+        for name, kinds in report.items():
+            for kind, metrics in kinds.items():
+                self.stdout.write(
+                    f'{name:<12}{kind:<7}' + ''.join(f'{metrics[key]:>10}' for key in ('ops_per_s', 'p50_ms', 'p95_ms', 'p99_ms'))
+                    + f"{metrics['errors']:>9}"
+                )
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as handle:
+                json.dump(report, handle, indent=2)
+                handle.write('\n')
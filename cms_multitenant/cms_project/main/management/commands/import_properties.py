@@ -0,0 +1,52 @@
+import os
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from cms_project.main.importer import PropertyImporter, read_rows
+from cms_project.tenants.models import Tenant
+
+
+class Command(BaseCommand):
+    help = 'Importa un feed CSV/JSONL de propiedades para un tenant (clave: external_ref)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('tenant', help='Subdominio del tenant')
+        parser.add_argument('path', help='Archivo .csv o .jsonl')
+        parser.add_argument('--format', choices=['csv', 'jsonl'], help='Por defecto según la extensión')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--workers', type=int, default=4, help='Hilos para copiar imágenes')
+        parser.add_argument('--images-dir', help='Carpeta base de las rutas de la columna images')
+        parser.add_argument('--errors', help='Archivo CSV para el reporte de errores (por defecto stderr)')
+
+    def handle(self, *args, **options):
+        try:
+            tenant = Tenant.objects.get(subdomain=options['tenant'])
+        except Tenant.DoesNotExist:
+            raise CommandError(f"Tenant '{options['tenant']}' no encontrado")
+        file_format = options['format'] or ('csv' if options['path'].endswith('.csv') else 'jsonl')
+        if options['images_dir'] and not os.path.isdir(options['images_dir']):
+            raise CommandError(f"La carpeta {options['images_dir']} no existe")
+
+        importer = PropertyImporter(
+            tenant,
+            batch_size=options['batch_size'],
+            image_workers=options['workers'],
+            images_dir=options['images_dir'],
+        )
+        started = time.monotonic()
+        with open(options['path'], 'rb') as stream:
+            report = importer.run(read_rows(stream, file_format))
+
+        if report.errors:
+            if options['errors']:
+                with open(options['errors'], 'w', newline='', encoding='utf-8') as output:
+                    report.write_errors(output)
+            else:
+                report.write_errors(sys.stderr)
+        self.stdout.write(self.style.SUCCESS(
+            f'Creadas: {report.created}. Actualizadas: {report.updated}. Sin cambios: {report.unchanged}. '
+            f'Imágenes: {report.images}. '
+            f'Errores: {len(report.errors)}. Tiempo: {time.monotonic() - started:.1f}s'
+        ))
@@ -0,0 +1,55 @@
+import time
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+
+from cms_project.main.sharding import MoveAbortedError, TenantMover, shard_aliases, tenant_database
+from cms_project.tenants.cache import is_cross_process
+from cms_project.tenants.models import Tenant
+
+
+class Command(BaseCommand):
+    help = (
+        'Mueve los datos de un tenant a otra base (shard) sin detener el sitio: sólo sus '
+        'escrituras quedan bloqueadas mientras se copian las últimas diferencias'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('tenant', help='Subdominio del tenant')
+        parser.add_argument('database', help=f"Base de destino ({', '.join(shard_aliases())})")
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--settle', type=float,
+                            help='Segundos de espera tras cambiar la ubicación (por defecto TENANT_CACHE_LOCAL_TTL '
+                                 '+ SHARD_PLACEMENT_CACHE_TIMEOUT)')
+
+    def handle(self, *args, **options):
+        # El comando corre en su propio proceso: con una caché por proceso los
+        # workers no ven la invalidación de la ubicación
+        if not is_cross_process():
+            raise CommandError('TENANT_CACHE_ALIAS debe ser una caché compartida entre procesos '
+                               '(Redis, Memcached o de BD) para mover tenants')
+        try:
+            tenant = Tenant.objects.get(subdomain=options['tenant'])
+        except Tenant.DoesNotExist:
+            raise CommandError(f"Tenant '{options['tenant']}' no encontrado")
+        target = options['database']
+        if target not in shard_aliases():
+            raise CommandError(f"'{target}' no es un shard ({', '.join(shard_aliases())})")
+        source = tenant_database(tenant.pk)
+        if source == target:
+            raise CommandError(f'{tenant.subdomain} ya está en {target}')
+
+        # Un shard nuevo se crea al vuelo con el esquema completo
+        call_command('migrate', database=target, verbosity=0)
+        started = time.monotonic()
+        mover = TenantMover(tenant, target, batch_size=options['batch_size'], settle=options['settle'],
+                            log=self.stdout.write)
+        try:
+            counts = mover.run()
+        except MoveAbortedError as error:
+            raise CommandError(str(error))
+        for label, count in counts.items():
+            self.stdout.write(f"  {label}: {count['inserted']} copiadas, {count['updated']} actualizadas")
+        self.stdout.write(self.style.SUCCESS(
+            f'{tenant.subdomain}: {source} -> {target} en {time.monotonic() - started:.1f}s'
+        ))
@@ -0,0 +1,49 @@
+import json
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError
+
+from cms_project.main.models import ContactSubmission
+from cms_project.main.sharding import use_tenant
+
+
+class Command(BaseCommand):
+    help = (
+        'Reintenta los contactos que el escritor en segundo plano no pudo guardar '
+        '(CONTACT_DEAD_LETTER_PATH). Los que vuelven a fallar quedan en el archivo.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', help='Archivo JSONL (por defecto CONTACT_DEAD_LETTER_PATH)')
+
+    def handle(self, *args, **options):
+        path = options['path'] or getattr(settings, 'CONTACT_DEAD_LETTER_PATH', None)
+        if not path:
+            raise CommandError('No hay archivo de contactos pendientes (CONTACT_DEAD_LETTER_PATH)')
+        if not os.path.exists(path):
+            self.stdout.write('No hay contactos pendientes')
+            return
+
+        with open(path, encoding='utf-8') as handle:
+            entries = [json.loads(line) for line in handle if line.strip()]
+        by_tenant = {}
+        for entry in entries:
+            by_tenant.setdefault(entry['fields']['tenant_id'], []).append(entry)
+
+        remaining = []
+        for tenant_id, group in by_tenant.items():
+            try:
+                with use_tenant(tenant_id):
+                    ContactSubmission.objects.bulk_create([ContactSubmission(**entry['fields']) for entry in group])
+            except DatabaseError as error:
+                remaining += [{**entry, 'error': str(error)} for entry in group]
+
+        # Se reemplaza el archivo de una vez: un corte a la mitad no pierde filas
+        temporary = f'{path}.tmp'
+        with open(temporary, 'w', encoding='utf-8') as handle:
+            for entry in remaining:
+                handle.write(json.dumps(entry) + '\n')
+        os.replace(temporary, path)
+        self.stdout.write(f'{len(entries) - len(remaining)} contactos guardados, {len(remaining)} pendientes')
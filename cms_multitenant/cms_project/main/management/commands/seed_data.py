@@ -0,0 +1,90 @@
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import django
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from cms_project.main.seeding import OWNER_PASSWORD, TenantSeeder, placeholder_images, seed_tenant, tenant_data
+
+
+class Command(BaseCommand):
+    help = (
+        'Genera datos de prueba reproducibles: N tenants x M propiedades con imágenes, '
+        'contactos y páginas, por lotes y opcionalmente en varios procesos'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tenants', type=int, default=3)
+        parser.add_argument('--properties', type=int, default=6, help='Propiedades por tenant')
+        parser.add_argument('--images', type=int, default=0, help='Imágenes por propiedad')
+        parser.add_argument('--contacts', type=int, default=0, help='Contactos por tenant')
+        parser.add_argument('--pages', type=int, default=0, help='Páginas extra por tenant (además de inicio y catálogo)')
+        parser.add_argument('--seed', type=int, default=0, help='Misma semilla, mismos datos')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--workers', type=int, default=1, help='Procesos (cada uno genera tenants completos)')
+        parser.add_argument('--superuser', action='store_true', help='Crear admin / admin123 si no existe')
+
+    def handle(self, *args, **options):
+        if options['tenants'] < 1 or options['properties'] < 0 or options['batch_size'] < 1:
+            raise CommandError('Cantidades inválidas')
+
+        if options['superuser'] and not User.objects.filter(username='admin').exists():
+            User.objects.create_superuser('admin', 'admin@example.com', 'admin123')
+            self.stdout.write('Superusuario creado: admin / admin123')
+
+        seeder_options = {
+            'properties': options['properties'],
+            'images': options['images'],
+            'contacts': options['contacts'],
+            'pages': options['pages'],
+            'batch_size': options['batch_size'],
+            'seed': options['seed'],
+            # Un solo hash para todos los dueños (PBKDF2 por usuario sería lo más lento)
+            'owner_password': make_password(OWNER_PASSWORD),
+        }
+        if options['images']:
+            # Antes de repartir el trabajo, para que los procesos no las creen a la vez
+            placeholder_images()
+
+        started = time.monotonic()
+        indexes = range(options['tenants'])
+        if options['workers'] > 1:
+            results = self.run_parallel(indexes, seeder_options, options['workers'])
+        else:
+            results = ((index, TenantSeeder(index, **seeder_options).run()) for index in indexes)
+
+        totals = {'tenants': 0, 'properties': 0, 'images': 0, 'contacts': 0, 'pages': 0}
+        for index, counts in results:
+            subdomain = tenant_data(index)['subdomain']
+            if counts is None:
+                self.stdout.write(f'{subdomain}: ya existe, se omite')
+                continue
+            totals['tenants'] += 1
+            for key, value in counts.items():
+                totals[key] += value
+            if options['verbosity'] > 1:
+                self.stdout.write(f'{subdomain}: {counts}')
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Tenants: {totals['tenants']}. Propiedades: {totals['properties']}. Imágenes: {totals['images']}. "
+            f"Contactos: {totals['contacts']}. Páginas: {totals['pages']}. "
+            f'Tiempo: {time.monotonic() - started:.1f}s'
+        ))
+        if totals['tenants']:
+            self.stdout.write(f'Dueños: owner_<subdominio> / {OWNER_PASSWORD}')
+
+    def run_parallel(self, indexes, seeder_options, workers):
+        # Cada proceso abre su propia conexión; la del padre no se comparte
+        connections.close_all()
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=django.setup,
+        ) as pool:
+            futures = [pool.submit(seed_tenant, index, seeder_options) for index in indexes]
+            for future in as_completed(futures):
+                yield future.result()
@@ -0,0 +1,35 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
+
+from cms_project.main.replicas import copy_sqlite_database
+
+
+class Command(BaseCommand):
+    help = (
+        'Copia la base primaria a las réplicas SQLite de DATABASE_REPLICAS (para probar el '
+        'enrutamiento localmente; con Postgres la replicación es del servidor)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, help='Repetir cada N segundos (simula el retraso de replicación)')
+
+    def handle(self, *args, **options):
+        databases = settings.DATABASES
+        if not settings.DATABASE_REPLICAS:
+            raise CommandError('No hay réplicas configuradas (DATABASE_REPLICAS / SQLITE_REPLICAS)')
+        for alias in [DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS]:
+            if databases[alias]['ENGINE'] != 'django.db.backends.sqlite3':
+                raise CommandError(f'{alias} no es SQLite')
+
+        while True:
+            started = time.perf_counter()
+            for alias in settings.DATABASE_REPLICAS:
+                copy_sqlite_database(str(databases[DEFAULT_DB_ALIAS]['NAME']), str(databases[alias]['NAME']))
+            self.stdout.write(f"{len(settings.DATABASE_REPLICAS)} réplicas copiadas en "
+                              f"{(time.perf_counter() - started) * 1000:.0f} ms")
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
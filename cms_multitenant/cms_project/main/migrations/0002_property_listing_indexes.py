@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-17 17:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0001_initial'),
+        ('tenants', '0002_tenant_domain_unique'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='property',
+            index=models.Index(condition=models.Q(('is_available', True)), fields=['tenant', '-created_at'], name='prop_avail_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='property',
+            index=models.Index(condition=models.Q(('is_available', True), ('is_featured', True)), fields=['tenant', '-created_at'], name='prop_avail_featured_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='property',
+            index=models.Index(condition=models.Q(('is_available', True)), fields=['tenant', 'property_type', '-created_at'], name='prop_avail_type_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='property',
+            index=models.Index(condition=models.Q(('is_available', True)), fields=['tenant', 'sale_type', '-created_at'], name='prop_avail_sale_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='property',
+            index=models.Index(condition=models.Q(('is_available', True)), fields=['tenant', 'city'], name='prop_avail_city_idx'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-17 17:53
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def populate_main_image(apps, schema_editor):
+    Property = apps.get_model('main', 'Property')
+    PropertyImage = apps.get_model('main', 'PropertyImage')
+    main_image = PropertyImage.objects.filter(
+        property=models.OuterRef('pk')
+    ).order_by('-is_main', 'order', 'id').values('pk')[:1]
+    Property.objects.update(main_image=models.Subquery(main_image))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0002_property_listing_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='property',
+            name='main_image',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='main.propertyimage', verbose_name='Imagen principal'),
+        ),
+        migrations.RunPython(populate_main_image, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.18 on 2026-10-17 17:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0003_property_main_image'),
+        ('tenants', '0002_tenant_domain_unique'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='property',
+            name='prop_avail_created_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='property',
+            name='prop_avail_type_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='property',
+            name='prop_avail_sale_idx',
+        ),
+        migrations.AddIndex(
+            model_name='property',
+            index=models.Index(condition=models.Q(('is_available', True)), fields=['tenant', '-created_at', '-id'], name='prop_avail_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='property',
+            index=models.Index(condition=models.Q(('is_available', True)), fields=['tenant', 'property_type', '-created_at', '-id'], name='prop_avail_type_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='property',
+            index=models.Index(condition=models.Q(('is_available', True)), fields=['tenant', 'sale_type', '-created_at', '-id'], name='prop_avail_sale_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='property',
+            index=models.Index(condition=models.Q(('is_available', True)), fields=['tenant', 'price', 'id'], name='prop_avail_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='property',
+            index=models.Index(condition=models.Q(('area__isnull', False), ('is_available', True)), fields=['tenant', 'area', 'id'], name='prop_avail_area_idx'),
+        ),
+    ]
@@ -0,0 +1,65 @@
+from django.db import migrations
+
+
+# SQL fijo de esta migración (no se importa de main.search: el código
+# vivo puede cambiar y esta migración debe seguir creando lo mismo)
+FTS_TRIGGERS = ['main_property_fts_ai', 'main_property_fts_ad', 'main_property_fts_au']
+
+CREATE_FTS_SQL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS main_property_fts USING fts5(
+        title, description, address, city, tenant_id UNINDEXED,
+        content='main_property', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS main_property_fts_ai AFTER INSERT ON main_property BEGIN
+        INSERT INTO main_property_fts(rowid, title, description, address, city, tenant_id)
+        VALUES (new.id, new.title, new.description, new.address, new.city, new.tenant_id);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS main_property_fts_ad AFTER DELETE ON main_property BEGIN
+        INSERT INTO main_property_fts(main_property_fts, rowid, title, description, address, city, tenant_id)
+        VALUES ('delete', old.id, old.title, old.description, old.address, old.city, old.tenant_id);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS main_property_fts_au
+    AFTER UPDATE OF title, description, address, city, tenant_id ON main_property BEGIN
+        INSERT INTO main_property_fts(main_property_fts, rowid, title, description, address, city, tenant_id)
+        VALUES ('delete', old.id, old.title, old.description, old.address, old.city, old.tenant_id);
+        INSERT INTO main_property_fts(rowid, title, description, address, city, tenant_id)
+        VALUES (new.id, new.title, new.description, new.address, new.city, new.tenant_id);
+    END
+    """,
+    "INSERT INTO main_property_fts(main_property_fts) VALUES ('rebuild')",
+]
+
+
+def create_property_fts(apps, schema_editor):
+    # FTS5 sólo existe en SQLite; los demás motores buscan con icontains
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for sql in CREATE_FTS_SQL:
+        schema_editor.execute(sql)
+
+
+def remove_property_fts(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for trigger in FTS_TRIGGERS:
+        schema_editor.execute(f'DROP TRIGGER IF EXISTS {trigger}')
+    schema_editor.execute('DROP TABLE IF EXISTS main_property_fts')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0004_property_sort_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_property_fts, remove_property_fts),
+    ]
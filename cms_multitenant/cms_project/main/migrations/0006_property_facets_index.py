@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 17:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0005_property_fts'),
+        ('tenants', '0002_tenant_domain_unique'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='property',
+            index=models.Index(condition=models.Q(('is_available', True)), fields=['tenant', 'property_type', 'sale_type', 'city', 'price', 'is_available'], name='prop_avail_facets_idx'),
+        ),
+    ]
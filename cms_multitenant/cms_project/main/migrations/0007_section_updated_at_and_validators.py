@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-17 18:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0006_property_facets_index'),
+        ('tenants', '0002_tenant_domain_unique'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='section',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddIndex(
+            model_name='property',
+            index=models.Index(fields=['tenant', '-updated_at'], name='prop_tenant_updated_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-17 18:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0007_section_updated_at_and_validators'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='propertyimage',
+            name='renditions',
+            field=models.JSONField(blank=True, default=dict, editable=False, verbose_name='Variantes'),
+        ),
+        migrations.AddField(
+            model_name='section',
+            name='background_renditions',
+            field=models.JSONField(blank=True, default=dict, editable=False, verbose_name='Variantes del fondo'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-17 18:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0008_image_renditions'),
+        ('tenants', '0004_tenant_contact_rate_limit'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='property',
+            name='external_ref',
+            field=models.CharField(blank=True, help_text='Clave de la propiedad en el feed importado', max_length=100, null=True, verbose_name='Referencia externa'),
+        ),
+        migrations.AddConstraint(
+            model_name='property',
+            constraint=models.UniqueConstraint(fields=('tenant', 'external_ref'), name='prop_tenant_external_ref_uniq'),
+        ),
+    ]
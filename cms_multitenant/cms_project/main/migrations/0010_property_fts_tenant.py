@@ -0,0 +1,84 @@
+# Generated by Django 5.2.18 on 2026-10-17 19:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+# SQL fijo de esta migración (no se importa de main.search)
+FTS_TRIGGERS = ['main_property_fts_ai', 'main_property_fts_ad', 'main_property_fts_au']
+
+TRIGGERS_SQL = [
+    """
+    CREATE TRIGGER main_property_fts_ai AFTER INSERT ON main_property BEGIN
+        INSERT INTO main_property_fts(rowid, title, description, address, city, tenant_id)
+        VALUES (new.id, new.title, new.description, new.address, new.city, new.tenant_id);
+    END
+    """,
+    """
+    CREATE TRIGGER main_property_fts_ad AFTER DELETE ON main_property BEGIN
+        INSERT INTO main_property_fts(main_property_fts, rowid, title, description, address, city, tenant_id)
+        VALUES ('delete', old.id, old.title, old.description, old.address, old.city, old.tenant_id);
+    END
+    """,
+    """
+    CREATE TRIGGER main_property_fts_au
+    AFTER UPDATE OF title, description, address, city, tenant_id ON main_property BEGIN
+        INSERT INTO main_property_fts(main_property_fts, rowid, title, description, address, city, tenant_id)
+        VALUES ('delete', old.id, old.title, old.description, old.address, old.city, old.tenant_id);
+        INSERT INTO main_property_fts(rowid, title, description, address, city, tenant_id)
+        VALUES (new.id, new.title, new.description, new.address, new.city, new.tenant_id);
+    END
+    """,
+]
+
+# tenant_id pasa a estar indexada (antes UNINDEXED) para filtrar el MATCH por tenant
+TABLE_SQL = """
+    CREATE VIRTUAL TABLE main_property_fts USING fts5(
+        title, description, address, city, {tenant_id},
+        content='main_property', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+"""
+
+
+def recreate_property_fts(schema_editor, tenant_id):
+    """Recrea la tabla, sus triggers y el contenido del índice"""
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for trigger in FTS_TRIGGERS:
+        schema_editor.execute(f'DROP TRIGGER IF EXISTS {trigger}')
+    schema_editor.execute('DROP TABLE IF EXISTS main_property_fts')
+    schema_editor.execute(TABLE_SQL.format(tenant_id=tenant_id))
+    for sql in TRIGGERS_SQL:
+        schema_editor.execute(sql)
+    schema_editor.execute("INSERT INTO main_property_fts(main_property_fts) VALUES ('rebuild')")
+
+
+def index_tenant_id(apps, schema_editor):
+    recreate_property_fts(schema_editor, 'tenant_id')
+
+
+def unindex_tenant_id(apps, schema_editor):
+    recreate_property_fts(schema_editor, 'tenant_id UNINDEXED')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0009_property_external_ref'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PropertySearchIndex',
+            fields=[
+                ('property', models.OneToOneField(db_column='rowid', db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search_index', serialize=False, to='main.property')),
+                ('document', models.TextField(db_column='main_property_fts')),
+            ],
+            options={
+                'db_table': 'main_property_fts',
+                'managed': False,
+            },
+        ),
+        migrations.RunPython(index_tenant_id, unindex_tenant_id),
+    ]
@@ -1,7 +1,33 @@
 
 from django.db import models
+from django.db.models.functions import Now
 from django.contrib.auth.models import User
 from cms_project.tenants.models import Tenant
+from cms_project.media_files.renditions import RenditionsMixin
+from .search import PROPERTY_FTS_TABLE, FTSDocumentField
+
+
+class PropertyQuerySet(models.QuerySet):
+    def with_main_image(self):
+        """Trae la imagen principal en la misma consulta"""
+        return self.select_related('main_image')
+
+    def similar_to(self, prop, limit=4):
+        """Propiedades disponibles del mismo tipo y tenant que muestra la ficha de `prop`"""
+        return self.filter(
+            tenant_id=prop.tenant_id, property_type=prop.property_type, is_available=True
+        ).exclude(pk=prop.pk)[:limit]
+
+    def refresh_main_images(self):
+        """
+        Recalcula main_image en una sola UPDATE: primero la imagen marcada
+        como principal y después la de menor orden. También actualiza
+        updated_at para que los validadores HTTP de la propiedad cambien.
+        """
+        main_image = PropertyImage.objects.filter(
+            property=models.OuterRef('pk')
+        ).order_by('-is_main', 'order', 'id').values('pk')[:1]
+        return self.update(main_image=models.Subquery(main_image), updated_at=Now())
 
 
 class Property(models.Model):
@@ -51,20 +77,116 @@ class Property(models.Model):
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="Fecha de creación")
     updated_at = models.DateTimeField(auto_now=True, verbose_name="Fecha de actualización")
     
+    # Identificador en el sistema de origen de una importación masiva
+    external_ref = models.CharField(
+        max_length=100,
+        null=True,
+        blank=True,
+        verbose_name="Referencia externa",
+        help_text="Clave de la propiedad en el feed importado"
+    )
+    
+    # Imagen principal desnormalizada, mantenida por las señales de PropertyImage
+    main_image = models.ForeignKey(
+        'PropertyImage',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        editable=False,
+        related_name='+',
+        verbose_name="Imagen principal"
+    )
+    
+    objects = PropertyQuerySet.as_manager()
+    
     class Meta:
         verbose_name = "Propiedad"
         verbose_name_plural = "Propiedades"
         ordering = ['-created_at']
+        indexes = [
+            # Índices parciales: las vistas públicas sólo listan propiedades disponibles
+            # Catálogo (tenant + disponibles, recientes primero, id como desempate del cursor)
+            models.Index(
+                fields=['tenant', '-created_at', '-id'],
+                condition=models.Q(is_available=True),
+                name='prop_avail_created_idx',
+            ),
+            # Destacadas de la página principal
+            models.Index(
+                fields=['tenant', '-created_at'],
+                condition=models.Q(is_available=True, is_featured=True),
+                name='prop_avail_featured_idx',
+            ),
+            # Filtro por tipo y propiedades similares
+            models.Index(
+                fields=['tenant', 'property_type', '-created_at', '-id'],
+                condition=models.Q(is_available=True),
+                name='prop_avail_type_idx',
+            ),
+            # Filtro por tipo de venta
+            models.Index(
+                fields=['tenant', 'sale_type', '-created_at', '-id'],
+                condition=models.Q(is_available=True),
+                name='prop_avail_sale_idx',
+            ),
+            # Ordenamiento por precio
+            models.Index(
+                fields=['tenant', 'price', 'id'],
+                condition=models.Q(is_available=True),
+                name='prop_avail_price_idx',
+            ),
+            # Ordenamiento por área (sólo propiedades con área)
+            models.Index(
+                fields=['tenant', 'area', 'id'],
+                condition=models.Q(is_available=True, area__isnull=False),
+                name='prop_avail_area_idx',
+            ),
+            # Índice de cobertura para los conteos de facets (sin leer la tabla).
+            # SQLite sólo lo considera de cobertura si incluye is_available.
+            models.Index(
+                fields=['tenant', 'property_type', 'sale_type', 'city', 'price', 'is_available'],
+                condition=models.Q(is_available=True),
+                name='prop_avail_facets_idx',
+            ),
+            # Última modificación del tenant para ETag / Last-Modified
+            models.Index(fields=['tenant', '-updated_at'], name='prop_tenant_updated_idx'),
+            # Valores únicos de ciudad para los filtros
+            models.Index(
+                fields=['tenant', 'city'],
+                condition=models.Q(is_available=True),
+                name='prop_avail_city_idx',
+            ),
+        ]
+        constraints = [
+            # Clave de las importaciones (también sirve de índice para buscarlas)
+            models.UniqueConstraint(fields=['tenant', 'external_ref'], name='prop_tenant_external_ref_uniq'),
+        ]
         
     def __str__(self):
         return f"{self.title} - {self.city} ({self.tenant.name})"
     
     def get_main_image(self):
-        """Obtiene la primera imagen de la propiedad"""
-        return self.propertyimage_set.first()
+        """Obtiene la imagen principal de la propiedad"""
+        return self.main_image
 
 
-class PropertyImage(models.Model):
+class PropertySearchIndex(models.Model):
+    """
+    Tabla FTS5 de búsqueda de propiedades. La crean y mantienen los
+    triggers de search.py; el modelo sólo sirve para unirla a Property.
+    """
+    property = models.OneToOneField(
+        Property, on_delete=models.DO_NOTHING, primary_key=True, db_column='rowid',
+        db_constraint=False, related_name='search_index',
+    )
+    document = FTSDocumentField(db_column=PROPERTY_FTS_TABLE)
+
+    class Meta:
+        managed = False
+        db_table = PROPERTY_FTS_TABLE
+
+
+class PropertyImage(RenditionsMixin, models.Model):
     """
     Imágenes asociadas a las propiedades
     """
@@ -73,6 +195,7 @@ class PropertyImage(models.Model):
     alt_text = models.CharField(max_length=200, blank=True, verbose_name="Texto alternativo")
     is_main = models.BooleanField(default=False, verbose_name="Imagen principal")
     order = models.PositiveIntegerField(default=0, verbose_name="Orden")
+    renditions = models.JSONField(default=dict, blank=True, editable=False, verbose_name="Variantes")
     created_at = models.DateTimeField(auto_now_add=True)
     
     class Meta:
@@ -115,7 +238,7 @@ class Page(models.Model):
         return f"{self.title} ({self.tenant.name})"
 
 
-class Section(models.Model):
+class Section(RenditionsMixin, models.Model):
     """
     Secciones/componentes de las páginas
     """
@@ -138,9 +261,14 @@ class Section(models.Model):
     hero_button_text = models.CharField(max_length=50, blank=True, verbose_name="Texto del botón")
     hero_button_link = models.CharField(max_length=200, blank=True, verbose_name="Enlace del botón")
     background_image = models.ImageField(upload_to='sections/', blank=True, verbose_name="Imagen de fondo")
+    background_renditions = models.JSONField(default=dict, blank=True, editable=False, verbose_name="Variantes del fondo")
     
     order = models.PositiveIntegerField(default=0, verbose_name="Orden")
     is_active = models.BooleanField(default=True, verbose_name="Activa")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    rendition_source_field = 'background_image'
+    renditions_field = 'background_renditions'
     
     class Meta:
         verbose_name = "Sección"
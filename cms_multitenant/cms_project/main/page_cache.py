@@ -0,0 +1,105 @@
+
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import parse_http_date_safe
+
+from cms_project.tenants.cache import tenant_cache, get_tenant_version, bump_tenant_version
+
+from .replicas import primary_reads_after_bump
+
+
+PAGES_NAMESPACE = 'pages'
+
+# Cabeceras que se guardan junto con el HTML
+CACHED_HEADERS = ['Content-Type', 'Content-Language', 'ETag', 'Last-Modified']
+
+STATS_KEYS = ['hits', 'misses', 'bypass']
+
+
+def page_cache_key(tenant, request):
+    version = get_tenant_version(PAGES_NAMESPACE, tenant.pk)
+    digest = hashlib.md5(request.get_full_path().encode()).hexdigest()
+    return f'pages:{tenant.pk}:{version}:{digest}'
+
+
+def record(stat):
+    """Contadores compartidos entre procesos en la caché de Django"""
+    cache = tenant_cache.shared
+    key = f'pages:stats:{stat}'
+    if not cache.add(key, 1, None):
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 1, None)
+
+
+def page_cache_stats():
+    cache = tenant_cache.shared
+    values = cache.get_many([f'pages:stats:{stat}' for stat in STATS_KEYS])
+    return {stat: values.get(f'pages:stats:{stat}', 0) for stat in STATS_KEYS}
+
+
+def is_cacheable(request, response):
+    return (
+        response.status_code == 200
+        and not response.streaming
+        and not response.cookies
+        # Un token CSRF en el HTML pertenece a un solo visitante
+        and not request.META.get('CSRF_COOKIE_NEEDS_UPDATE')
+    )
+
+
+def tenant_cache_page(view_func):
+    """
+    Cachea la respuesta completa por tenant, ruta y query string. Sólo
+    aplica a GET/HEAD de visitantes anónimos; guardar contenido del tenant
+    cambia su versión y descarta todas sus páginas de una vez.
+    """
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        tenant = getattr(request, 'tenant', None)
+        if (request.method not in ('GET', 'HEAD') or tenant is None
+                or request.user.is_authenticated):
+            record('bypass')
+            return view_func(request, *args, **kwargs)
+
+        cache = tenant_cache.shared
+        key = page_cache_key(tenant, request)
+        cached = cache.get(key)
+        if cached is not None:
+            record('hits')
+            content, status, headers = cached
+            response = HttpResponse(content, status=status)
+            for header, value in headers.items():
+                response[header] = value
+            response['X-Page-Cache'] = 'HIT'
+            # Responder 304 si el navegador ya tiene esta versión
+            return get_conditional_response(
+                request,
+                etag=headers.get('ETag'),
+                last_modified=parse_http_date_safe(headers.get('Last-Modified')),
+                response=response,
+            )
+
+        record('misses')
+        with primary_reads_after_bump(PAGES_NAMESPACE, tenant.pk):
+            response = view_func(request, *args, **kwargs)
+        if is_cacheable(request, response):
+            headers = {header: response[header] for header in CACHED_HEADERS if response.has_header(header)}
+            cache.set(
+                key,
+                (response.content, response.status_code, headers),
+                getattr(settings, 'PAGE_CACHE_TIMEOUT', 600)
+            )
+        response['X-Page-Cache'] = 'MISS'
+        return response
+
+    return wrapper
+
+
+def invalidate_pages(tenant_id):
+    bump_tenant_version(PAGES_NAMESPACE, tenant_id)
@@ -0,0 +1,118 @@
+
+import base64
+import json
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Q
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+class KeysetPage:
+    """
+    Página de resultados con los cursores para la siguiente y la anterior
+    """
+
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+class KeysetPaginator:
+    """
+    Paginación por cursor (keyset) sobre `ordering` más el id como desempate.
+    Cada página filtra a partir de la última fila vista en lugar de usar
+    OFFSET, así que la página N cuesta lo mismo que la primera y los enlaces
+    no se desplazan cuando se agregan filas nuevas.
+    """
+
+    def __init__(self, queryset, ordering, per_page=24):
+        self.queryset = queryset
+        self.per_page = per_page
+        self.descending = ordering.startswith('-')
+        self.field_name = ordering.lstrip('-')
+        try:
+            self.field = queryset.model._meta.get_field(self.field_name)
+            self.is_annotation = False
+        except FieldDoesNotExist:
+            # Ordenar por una anotación (por ejemplo la relevancia de búsqueda)
+            self.field = queryset.query.annotations[self.field_name].output_field
+            self.is_annotation = True
+
+    def get_ordering(self, forward):
+        descending = self.descending == forward
+        prefix = '-' if descending else ''
+        return [f'{prefix}{self.field_name}', f'{prefix}id']
+
+    def filter_from(self, queryset, cursor, forward):
+        value, pk = cursor
+        field = self.field_name
+        # `campo <= v AND (campo < v OR id < pk)` equivale a la comparación
+        # de tuplas (campo, id) < (v, pk) y permite a la BD usar el índice
+        if self.descending == forward:
+            condition = Q(**{f'{field}__lte': value}) & (Q(**{f'{field}__lt': value}) | Q(id__lt=pk))
+        else:
+            condition = Q(**{f'{field}__gte': value}) & (Q(**{f'{field}__gt': value}) | Q(id__gt=pk))
+        return queryset.filter(condition)
+
+    def encode_cursor(self, obj):
+        if self.is_annotation:
+            value = getattr(obj, self.field_name)
+        else:
+            value = self.field.value_to_string(obj)
+        data = json.dumps([value, obj.pk]).encode()
+        return base64.urlsafe_b64encode(data).decode().rstrip('=')
+
+    def decode_cursor(self, token):
+        try:
+            padded = token + '=' * (-len(token) % 4)
+            value, pk = json.loads(base64.urlsafe_b64decode(padded.encode()))
+            return self.field.to_python(value), int(pk)
+        except Exception as exc:
+            raise InvalidCursor(token) from exc
+
+    def page(self, after=None, before=None):
+        """
+        Devuelve la página que sigue al cursor `after` o la que precede al
+        cursor `before`. Sin cursores devuelve la primera página.
+        """
+        size = self.per_page
+        if before:
+            queryset = self.filter_from(self.queryset, self.decode_cursor(before), forward=False)
+            rows = list(queryset.order_by(*self.get_ordering(forward=False))[:size + 1])
+            has_previous = len(rows) > size
+            rows = rows[:size][::-1]
+            if not rows:
+                return self.page()
+            has_next = True
+        else:
+            queryset = self.queryset
+            if after:
+                queryset = self.filter_from(queryset, self.decode_cursor(after), forward=True)
+            rows = list(queryset.order_by(*self.get_ordering(forward=True))[:size + 1])
+            has_next = len(rows) > size
+            rows = rows[:size]
+            has_previous = bool(after) and bool(rows)
+
+        return KeysetPage(
+            rows,
+            next_cursor=self.encode_cursor(rows[-1]) if has_next and rows else None,
+            previous_cursor=self.encode_cursor(rows[0]) if has_previous else None,
+        )
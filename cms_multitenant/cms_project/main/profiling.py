@@ -0,0 +1,193 @@
+
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+
+from cms_project.tenants.membership import is_member
+
+
+# Categorías del resumen en orden de prioridad: una muestra es ORM si la
+# pila pasa por django.db (aunque venga de una plantilla), si no plantillas
+CATEGORIES = [
+    ('orm', ('django.db',)),
+    ('templates', ('django.template', 'django.templatetags')),
+]
+
+
+def frame_name(frame):
+    """módulo:Clase.función, el formato de cada nivel en la pila colapsada"""
+    module = frame.f_globals.get('__name__', '?')
+    code = frame.f_code
+    return f"{module}:{getattr(code, 'co_qualname', code.co_name)}"
+
+
+def classify(stack):
+    for category, prefixes in CATEGORIES:
+        if any(name.startswith(prefixes) for name in stack):
+            return category
+    return 'python'
+
+
+class StackSampler:
+    """
+    Muestrea cada `interval` segundos la pila de un hilo desde otro hilo
+    (sys._current_frames) y cuenta las pilas colapsadas, el formato que
+    leen flamegraph.pl y speedscope. Las pilas se cortan en `root_code`
+    para no incluir el servidor WSGI.
+    """
+
+    def __init__(self, interval=0.001, root_code=None):
+        self.interval = interval
+        self.root_code = root_code
+        self.stacks = Counter()
+        self.stopped = threading.Event()
+        self.thread = None
+        self.target = None
+
+    def start(self):
+        self.target = threading.get_ident()
+        self.thread = threading.Thread(target=self.run, name='profiler', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        self.thread.join()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.target)
+            if frame is not None:
+                self.stacks[self.collapse(frame)] += 1
+
+    def collapse(self, frame):
+        names = []
+        while frame is not None:
+            names.append(frame_name(frame))
+            if frame.f_code is self.root_code:
+                break
+            frame = frame.f_back
+        return ';'.join(reversed(names))
+
+    @property
+    def samples(self):
+        return sum(self.stacks.values())
+
+    def breakdown(self):
+        """Proporción de muestras en ORM, plantillas y el resto del código"""
+        totals = Counter()
+        for stack, count in self.stacks.items():
+            totals[classify(stack.split(';'))] += count
+        samples = self.samples or 1
+        return {category: round(totals[category] / samples, 3) for category in ('orm', 'templates', 'python')}
+
+
+def safe_name(value):
+    return re.sub(r'[^A-Za-z0-9_.-]+', '_', value).strip('_') or '-'
+
+
+class ProfilingMiddleware:
+    """
+    Perfila una fracción de las requests (PROFILING_SAMPLE_RATE) y las que
+    traen la cabecera PROFILING_HEADER de un usuario staff del tenant.
+    Cada perfil se guarda en PROFILING_DIR como pila colapsada (.collapsed)
+    más un .json con tenant, vista, duración y el reparto ORM/plantillas/
+    Python. Sin muestreo ni cabecera el costo es una comparación.
+
+    Va después de AuthenticationMiddleware para poder validar al usuario.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sample_rate = getattr(settings, 'PROFILING_SAMPLE_RATE', 0.0)
+        header = getattr(settings, 'PROFILING_HEADER', 'X-Profile')
+        self.header = 'HTTP_' + header.upper().replace('-', '_') if header else None
+        self.interval = getattr(settings, 'PROFILING_INTERVAL', 0.001)
+        self.directory = str(getattr(settings, 'PROFILING_DIR', os.path.join(settings.BASE_DIR, 'profiles')))
+        self.max_files = getattr(settings, 'PROFILING_MAX_FILES', 500)
+        # Pocas requests perfiladas a la vez: el muestreo compite por el GIL
+        self.slots = threading.BoundedSemaphore(getattr(settings, 'PROFILING_MAX_CONCURRENT', 2))
+
+    def __call__(self, request):
+        requested = self.header is not None and self.header in request.META
+        if not requested and not (self.sample_rate and random.random() < self.sample_rate):
+            return self.get_response(request)
+        if requested and not self.is_allowed(request):
+            return self.get_response(request)
+        if not self.slots.acquire(blocking=False):
+            return self.get_response(request)
+        try:
+            return self.profile(request, requested)
+        finally:
+            self.slots.release()
+
+    def is_allowed(self, request):
+        user = request.user
+        if not (user.is_authenticated and user.is_staff):
+            return False
+        tenant = getattr(request, 'tenant', None)
+        return user.is_superuser or (tenant is not None and is_member(user, tenant, request))
+
+    def profile(self, request, requested):
+        sampler = StackSampler(self.interval, root_code=self.__call__.__func__.__code__)
+        started = time.perf_counter()
+        sampler.start()
+        try:
+            response = self.get_response(request)
+        finally:
+            sampler.stop()
+        duration = time.perf_counter() - started
+
+        tenant = getattr(request, 'tenant', None)
+        match = getattr(request, 'resolver_match', None)
+        meta = {
+            'tenant': tenant.subdomain if tenant else '-',
+            'view': match.view_name if match else '(sin ruta)',
+            'method': request.method,
+            'path': request.get_full_path(),
+            'status': response.status_code,
+            'duration_ms': round(duration * 1000, 1),
+            'samples': sampler.samples,
+            'interval_ms': self.interval * 1000,
+            'trigger': 'header' if requested else 'sample',
+            'breakdown': sampler.breakdown(),
+        }
+        name = self.write(sampler, meta)
+        if requested:
+            response['X-Profile-Id'] = name
+        return response
+
+    def write(self, sampler, meta):
+        os.makedirs(self.directory, exist_ok=True)
+        name = '-'.join([
+            time.strftime('%Y%m%d-%H%M%S'),
+            safe_name(meta['tenant']),
+            safe_name(meta['view']),
+            f"{meta['duration_ms']:.0f}ms",
+            f'{random.getrandbits(32):08x}',
+        ])
+        base = os.path.join(self.directory, name)
+        with open(base + '.collapsed', 'w', encoding='utf-8') as handle:
+            for stack, count in sampler.stacks.most_common():
+                handle.write(f'{stack} {count}\n')
+        with open(base + '.json', 'w', encoding='utf-8') as handle:
+            json.dump(meta, handle, indent=2, ensure_ascii=False)
+        self.prune()
+        return name
+
+    def prune(self):
+        """Conserva sólo los PROFILING_MAX_FILES perfiles más recientes"""
+        names = sorted(entry for entry in os.listdir(self.directory) if entry.endswith('.json'))
+        for entry in names[:max(0, len(names) - self.max_files)]:
+            base = os.path.join(self.directory, entry[:-len('.json')])
+            for extension in ('.json', '.collapsed'):
+                try:
+                    os.remove(base + extension)
+                except FileNotFoundError:
+                    pass
@@ -0,0 +1,88 @@
+
+import math
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.http import JsonResponse
+
+from cms_project.tenants.cache import tenant_cache
+
+
+def client_ip(request):
+    if getattr(settings, 'RATE_LIMIT_TRUST_X_FORWARDED_FOR', False):
+        forwarded = request.META.get('HTTP_X_FORWARDED_FOR', '')
+        if forwarded:
+            return forwarded.split(',')[0].strip()
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def tenant_limits(tenant):
+    """(solicitudes por minuto, ráfaga) del tenant o los valores por defecto"""
+    per_minute = tenant.contact_rate_per_minute or getattr(settings, 'CONTACT_RATE_PER_MINUTE', 6)
+    burst = tenant.contact_rate_burst or getattr(settings, 'CONTACT_RATE_BURST', 10)
+    return per_minute, burst
+
+
+# Cerrojo del bucket: intentos, espera entre ellos y vencimiento (por si
+# el proceso que lo tomó muere antes de soltarlo)
+LOCK_ATTEMPTS = 20
+LOCK_DELAY = 0.005
+LOCK_TIMEOUT = 1
+
+
+def take_token(key, per_minute, burst, now=None):
+    """
+    Token bucket guardado en la caché compartida como (tokens, instante).
+    Devuelve 0 si se aceptó la solicitud o los segundos que faltan para el
+    próximo token. La lectura y la escritura del bucket van bajo un
+    cerrojo tomado con cache.add (atómico en Redis, Memcached y la caché
+    de BD), así que las solicitudes en paralelo no gastan la misma ficha.
+    Entre workers sólo limita si la caché es compartida (ver tenants.W001).
+    """
+    cache = tenant_cache.shared
+    lock = f'{key}:lock'
+    for _ in range(LOCK_ATTEMPTS):
+        if cache.add(lock, 1, LOCK_TIMEOUT):
+            break
+        time.sleep(LOCK_DELAY)
+    else:
+        # Demasiadas solicitudes simultáneas del mismo cliente
+        return LOCK_TIMEOUT
+    try:
+        now = time.time() if now is None else now
+        rate = per_minute / 60
+        tokens, updated_at = cache.get(key) or (burst, now)
+        tokens = min(burst, tokens + (now - updated_at) * rate)
+        if tokens < 1:
+            return (1 - tokens) / rate
+        # Pasado el tiempo de recarga completa la clave puede desaparecer
+        cache.set(key, (tokens - 1, now), math.ceil(burst / rate) + 1)
+        return 0
+    finally:
+        cache.delete(lock)
+
+
+def rate_limit(scope):
+    """
+    Limita la vista por tenant e IP del cliente. Responde 429 usando sólo
+    request.tenant (ya resuelto desde la caché) y la caché, sin el ORM.
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            tenant = getattr(request, 'tenant', None)
+            if tenant is not None:
+                per_minute, burst = tenant_limits(tenant)
+                key = f'ratelimit:{scope}:{tenant.pk}:{client_ip(request)}'
+                retry_after = take_token(key, per_minute, burst)
+                if retry_after:
+                    response = JsonResponse({
+                        'success': False,
+                        'error': 'Demasiadas solicitudes. Intenta nuevamente en unos minutos.'
+                    }, status=429)
+                    response['Retry-After'] = str(math.ceil(retry_after))
+                    return response
+            return view_func(request, *args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,139 @@
+
+import random
+import sqlite3
+import time
+from contextlib import closing, contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+from cms_project.tenants.cache import last_bump
+
+from .sqlite import retry_on_locked
+
+
+# Estado de la request en curso: réplica elegida (None: primaria) y si ya escribió
+_state = ContextVar('replica_routing', default=None)
+
+
+class RoutingState:
+    def __init__(self, replica=None):
+        self.replica = replica
+        self.wrote = False
+
+
+def replica_aliases():
+    return getattr(settings, 'DATABASE_REPLICAS', [])
+
+
+def mark_write():
+    """Lo que se lea después en esta request ya debe ver la escritura"""
+    state = _state.get()
+    if state is not None:
+        state.wrote = True
+
+
+@contextmanager
+def primary_reads_after_bump(namespace, tenant_id):
+    """
+    Para llenar una caché del tenant: si `namespace` se invalidó hace menos
+    de REPLICA_PIN_SECONDS, las lecturas del bloque van a la primaria. Una
+    réplica atrasada dejaría guardado el contenido anterior durante todo el
+    timeout de la entrada.
+    """
+    state = _state.get()
+    replica = state.replica if state is not None else None
+    bumped = last_bump(namespace, tenant_id) if replica else None
+    if bumped is None or time.time() - bumped >= getattr(settings, 'REPLICA_PIN_SECONDS', 10):
+        yield
+        return
+    state.replica = None
+    try:
+        yield
+    finally:
+        state.replica = replica
+
+
+class ReplicaRouter:
+    """
+    Envía las lecturas a una réplica sólo cuando ReplicaMiddleware lo
+    habilitó para la request (vistas públicas, GET anónimo y sin la cookie
+    de lectura de la primaria). Todo lo demás (admin, escrituras, comandos,
+    hilos en segundo plano) usa la primaria.
+    """
+
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if state is not None and state.replica and not state.wrote:
+            return state.replica
+        return None
+
+    def db_for_write(self, model, **hints):
+        mark_write()
+        instance = hints.get('instance')
+        if instance is not None and instance._state.db in replica_aliases():
+            # Un objeto leído de una réplica se guarda en la primaria
+            return DEFAULT_DB_ALIAS
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *replica_aliases()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Las réplicas son copias de la primaria: no se migran aparte
+        if db in replica_aliases():
+            return False
+        return None
+
+
+class ReplicaMiddleware:
+    """
+    Habilita las réplicas para los GET/HEAD anónimos de las vistas públicas
+    (REPLICA_NAMESPACES). Después de un POST, o de cualquier escritura, el
+    visitante recibe la cookie REPLICA_PIN_COOKIE y durante
+    REPLICA_PIN_SECONDS lee de la primaria: así ve lo que acaba de escribir
+    aunque la réplica vaya atrasada.
+
+    Va después de AuthenticationMiddleware.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.namespaces = set(getattr(settings, 'REPLICA_NAMESPACES', ['main']))
+        self.cookie = getattr(settings, 'REPLICA_PIN_COOKIE', 'db_pin')
+        self.pin_seconds = getattr(settings, 'REPLICA_PIN_SECONDS', 10)
+
+    def __call__(self, request):
+        state = RoutingState()
+        token = _state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _state.reset(token)
+        if state.wrote or request.method not in ('GET', 'HEAD', 'OPTIONS', 'TRACE'):
+            response.set_cookie(self.cookie, str(int(time.time())), max_age=self.pin_seconds,
+                                httponly=True, samesite='Lax')
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        replicas = replica_aliases()
+        state = _state.get()
+        if (state is not None and replicas
+                and request.method in ('GET', 'HEAD')
+                and request.resolver_match.namespace in self.namespaces
+                and self.cookie not in request.COOKIES
+                and not request.user.is_authenticated):
+            state.replica = random.choice(replicas)
+        return None
+
+
+def copy_sqlite_database(source, target):
+    """Copia consistente de una base SQLite a otra con la API de backup"""
+    def copy():
+        with closing(sqlite3.connect(source)) as origin, closing(sqlite3.connect(target)) as destination:
+            origin.backup(destination)
+    retry_on_locked(copy)
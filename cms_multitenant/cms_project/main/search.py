@@ -0,0 +1,150 @@
+
+import re
+
+from django.db import connections, models
+from django.db.models import F, FloatField, Func, Lookup, Q, Value
+from django.db.models.expressions import RawSQL
+
+
+# Tabla FTS5 de contenido externo sobre main_property. La tokenización
+# unicode61 con remove_diacritics hace que "jardin" encuentre "jardín".
+# tenant_id también se indexa para que MATCH sólo recorra los términos
+# del tenant buscado.
+PROPERTY_FTS_TABLE = 'main_property_fts'
+PROPERTY_FTS_COLUMNS = ['title', 'description', 'address', 'city']
+
+# Pesos de bm25 por columna (el título pesa más que la descripción;
+# tenant_id no cuenta para la relevancia)
+PROPERTY_FTS_WEIGHTS = [10.0, 1.0, 2.0, 4.0, 0.0]
+
+PROPERTY_FTS_SQL = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {PROPERTY_FTS_TABLE} USING fts5(
+        title, description, address, city, tenant_id,
+        content='main_property', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {PROPERTY_FTS_TABLE}_ai AFTER INSERT ON main_property BEGIN
+        INSERT INTO {PROPERTY_FTS_TABLE}(rowid, title, description, address, city, tenant_id)
+        VALUES (new.id, new.title, new.description, new.address, new.city, new.tenant_id);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {PROPERTY_FTS_TABLE}_ad AFTER DELETE ON main_property BEGIN
+        INSERT INTO {PROPERTY_FTS_TABLE}({PROPERTY_FTS_TABLE}, rowid, title, description, address, city, tenant_id)
+        VALUES ('delete', old.id, old.title, old.description, old.address, old.city, old.tenant_id);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {PROPERTY_FTS_TABLE}_au
+    AFTER UPDATE OF title, description, address, city, tenant_id ON main_property BEGIN
+        INSERT INTO {PROPERTY_FTS_TABLE}({PROPERTY_FTS_TABLE}, rowid, title, description, address, city, tenant_id)
+        VALUES ('delete', old.id, old.title, old.description, old.address, old.city, old.tenant_id);
+        INSERT INTO {PROPERTY_FTS_TABLE}(rowid, title, description, address, city, tenant_id)
+        VALUES (new.id, new.title, new.description, new.address, new.city, new.tenant_id);
+    END
+    """,
+]
+
+PROPERTY_FTS_TRIGGERS = [f'{PROPERTY_FTS_TABLE}_ai', f'{PROPERTY_FTS_TABLE}_ad', f'{PROPERTY_FTS_TABLE}_au']
+
+
+def uses_fts(using='default'):
+    """El índice FTS5 sólo existe en SQLite; otros motores usan icontains"""
+    return connections[using].vendor == 'sqlite'
+
+
+def ensure_property_fts(connection):
+    """
+    Crea la tabla FTS5 y sus triggers si faltan. SQLite elimina los triggers
+    cuando una migración reconstruye main_property, así que si faltaba
+    alguno se reconstruye el índice completo.
+    """
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'trigger' AND name IN (%s, %s, %s)",
+            PROPERTY_FTS_TRIGGERS,
+        )
+        missing = len(PROPERTY_FTS_TRIGGERS) - len(cursor.fetchall())
+        if not missing:
+            return
+        for sql in PROPERTY_FTS_SQL:
+            cursor.execute(sql)
+        cursor.execute(f"INSERT INTO {PROPERTY_FTS_TABLE}({PROPERTY_FTS_TABLE}) VALUES ('rebuild')")
+
+
+def drop_property_fts(connection):
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for trigger in PROPERTY_FTS_TRIGGERS:
+            cursor.execute(f'DROP TRIGGER IF EXISTS {trigger}')
+        cursor.execute(f'DROP TABLE IF EXISTS {PROPERTY_FTS_TABLE}')
+
+
+class FTSDocumentField(models.TextField):
+    """
+    Columna oculta de una tabla FTS5 (se llama como la tabla). Admite el
+    lookup `match` y es el primer argumento de bm25().
+    """
+
+    def deconstruct(self):
+        # Para las migraciones es un TextField: la tabla la crea su SQL y el
+        # estado del modelo no depende de esta clase
+        name, path, args, kwargs = super().deconstruct()
+        return name, 'django.db.models.TextField', args, kwargs
+
+
+@FTSDocumentField.register_lookup
+class Match(Lookup):
+    lookup_name = 'match'
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f'{lhs} MATCH {rhs}', [*lhs_params, *rhs_params]
+
+
+def build_match_query(text, tenant_id=None):
+    """
+    Convierte el texto del usuario en una consulta FTS5 segura: cada palabra
+    entre comillas y como prefijo, todas obligatorias y sólo en las columnas
+    de texto. Con `tenant_id` la consulta se limita a ese tenant.
+    """
+    words = re.findall(r'\w+', text or '')
+    if not words:
+        return ''
+    match = '{%s} : (%s)' % (' '.join(PROPERTY_FTS_COLUMNS), ' '.join(f'"{word}"*' for word in words))
+    if tenant_id is not None:
+        match = f'tenant_id : "{int(tenant_id)}" AND {match}'
+    return match
+
+
+def search_properties(queryset, text, tenant=None, using='default'):
+    """
+    Filtra `queryset` por el texto buscado y anota `search_rank` (bm25,
+    menor es más relevante). La tabla FTS se une una sola vez a la
+    consulta. Con `tenant` el MATCH sólo recorre las filas de ese tenant.
+    Devuelve el queryset sin cambios si no hay palabras que buscar.
+    """
+    match = build_match_query(text, tenant.pk if tenant is not None else None)
+    if not match:
+        return queryset
+    if not uses_fts(using):
+        words = re.findall(r'\w+', text)
+        for word in words:
+            condition = Q()
+            for column in PROPERTY_FTS_COLUMNS:
+                condition |= Q(**{f'{column}__icontains': word})
+            queryset = queryset.filter(condition)
+        return queryset.annotate(search_rank=RawSQL('0', [], output_field=FloatField()))
+
+    rank = Func(
+        F('search_index__document'), *[Value(weight) for weight in PROPERTY_FTS_WEIGHTS],
+        function='bm25', output_field=FloatField(),
+    )
+    return queryset.filter(search_index__document__match=match).annotate(search_rank=rank)
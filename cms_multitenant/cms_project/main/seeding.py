@@ -0,0 +1,351 @@
+
+import io
+import random
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import IntegrityError, connections
+from django.utils import timezone
+from django.utils.text import slugify
+
+from cms_project.media_files.quotas import adjust_usage
+from cms_project.tenants.models import Tenant, TenantUser
+from .facets import invalidate_facets
+from .models import ContactSubmission, Page, Property, PropertyImage, Section
+from .bulk import explicit_timestamps
+from .page_cache import invalidate_pages
+from .sqlite import retry_on_locked, write_atomic
+
+
+# Los tres primeros tenants son los de ejemplo de siempre
+SAMPLE_TENANTS = [
+    {
+        'name': 'Inmobiliaria del Valle',
+        'subdomain': 'valle',
+        'contact_email': 'info@inmobiliariavalle.com',
+        'contact_phone': '+34-911-123456',
+        'address': 'Calle Principal 123, Madrid, España',
+    },
+    {
+        'name': 'Costa Propiedades',
+        'subdomain': 'costa',
+        'contact_email': 'contacto@costapropiedades.com',
+        'contact_phone': '+34-922-654321',
+        'address': 'Avenida del Mar 456, Valencia, España',
+    },
+    {
+        'name': 'Metro Homes',
+        'subdomain': 'metro',
+        'contact_email': 'ventas@metrohomes.com',
+        'contact_phone': '+34-933-789012',
+        'address': 'Plaza Central 789, Barcelona, España',
+    },
+]
+
+CITIES_BY_TENANT = {
+    'valle': ['Madrid', 'Alcalá de Henares', 'Getafe', 'Leganés'],
+    'costa': ['Valencia', 'Alicante', 'Castellón', 'Gandía'],
+    'metro': ['Barcelona', 'Hospitalet', 'Badalona', 'Sabadell'],
+}
+
+# Ciudades para los tenants generados (cada uno usa un subconjunto)
+CITIES = [
+    'Madrid', 'Barcelona', 'Valencia', 'Sevilla', 'Zaragoza', 'Málaga', 'Murcia', 'Palma',
+    'Bilbao', 'Alicante', 'Córdoba', 'Valladolid', 'Vigo', 'Gijón', 'Granada', 'Oviedo',
+]
+
+STATES = ['Madrid', 'Valencia', 'Cataluña', 'Andalucía', 'Aragón', 'Galicia']
+
+STREET_TYPES = ['Calle', 'Avenida', 'Plaza', 'Paseo']
+STREET_NAMES = ['Los Olivos', 'Las Flores', 'San Juan', 'La Paz', 'Mayor', 'del Sol', 'Real', 'Nueva']
+
+SAMPLE_PROPERTIES = [
+    {
+        'title': 'Casa moderna con jardín',
+        'description': 'Hermosa casa moderna de dos plantas con amplio jardín, perfecta para familias. Cuenta con acabados de primera calidad y una excelente ubicación cerca de colegios y centros comerciales.',
+        'bedrooms': 4,
+        'bathrooms': 3,
+        'area': Decimal('180.50'),
+        'parking_spaces': 2,
+    },
+    {
+        'title': 'Apartamento céntrico reformado',
+        'description': 'Apartamento completamente reformado en el centro de la ciudad. Ideal para parejas o profesionales que buscan comodidad y ubicación privilegiada.',
+        'bedrooms': 2,
+        'bathrooms': 2,
+        'area': Decimal('85.30'),
+        'parking_spaces': 1,
+    },
+    {
+        'title': 'Chalet con piscina',
+        'description': 'Espectacular chalet independiente con piscina privada y barbacoa. Perfecto para disfrutar en familia con todas las comodidades.',
+        'bedrooms': 5,
+        'bathrooms': 4,
+        'area': Decimal('250.00'),
+        'parking_spaces': 3,
+    },
+    {
+        'title': 'Piso luminoso con terraza',
+        'description': 'Piso muy luminoso con amplia terraza y vistas despejadas. Excelente oportunidad de inversión en zona en crecimiento.',
+        'bedrooms': 3,
+        'bathrooms': 2,
+        'area': Decimal('95.75'),
+        'parking_spaces': 1,
+    },
+    {
+        'title': 'Casa adosada en urbanización',
+        'description': 'Casa adosada en urbanización privada con zonas comunes, piscina comunitaria y parque infantil. Perfecta para familias.',
+        'bedrooms': 3,
+        'bathrooms': 2,
+        'area': Decimal('120.25'),
+        'parking_spaces': 1,
+    },
+    {
+        'title': 'Ático con vistas panorámicas',
+        'description': 'Exclusivo ático con vistas panorámicas a la ciudad. Acabados de lujo y ubicación premium en el mejor barrio.',
+        'bedrooms': 4,
+        'bathrooms': 3,
+        'area': Decimal('160.00'),
+        'parking_spaces': 2,
+    },
+]
+
+PROPERTY_TYPES = ['house', 'apartment', 'condo', 'townhouse']
+SALE_TYPES = ['sale', 'rent', 'both']
+
+FIRST_NAMES = ['Ana', 'Luis', 'María', 'Jorge', 'Lucía', 'Pablo', 'Elena', 'Diego', 'Sara', 'Hugo']
+LAST_NAMES = ['García', 'López', 'Martín', 'Sánchez', 'Pérez', 'Gómez', 'Ruiz', 'Díaz']
+
+OWNER_PASSWORD = 'password123'
+
+# Imágenes de relleno compartidas por todas las propiedades generadas
+PLACEHOLDER_COUNT = 8
+PLACEHOLDER_PATH = 'properties/seed/placeholder-{}.jpg'
+
+
+def tenant_data(index):
+    """Datos del tenant número `index` (desde 0)"""
+    if index < len(SAMPLE_TENANTS):
+        return dict(SAMPLE_TENANTS[index])
+    number = f'{index + 1:04d}'
+    return {
+        'name': f'Inmobiliaria {number}',
+        'subdomain': f'tenant{number}',
+        'contact_email': f'info@tenant{number}.example.com',
+        'contact_phone': f'+34-900-{index + 1:06d}',
+        'address': f'Calle Principal {index + 1}, Madrid, España',
+    }
+
+
+def placeholder_images():
+    """
+    Crea (una sola vez) las imágenes de relleno y devuelve [(nombre, bytes)].
+    Los colores son fijos para que los archivos también sean reproducibles.
+    """
+    from PIL import Image
+
+    images = []
+    for number in range(PLACEHOLDER_COUNT):
+        name = PLACEHOLDER_PATH.format(number)
+        if not default_storage.exists(name):
+            color = (40 + number * 25, 120 + number * 10, 200 - number * 20)
+            buffer = io.BytesIO()
+            Image.new('RGB', (800, 600), color).save(buffer, 'JPEG', quality=70)
+            default_storage.save(name, ContentFile(buffer.getvalue()))
+        images.append((name, default_storage.size(name)))
+    return images
+
+
+class TenantSeeder:
+    """
+    Genera un tenant con su dueño, páginas, propiedades, imágenes y
+    contactos usando bulk_create por lotes. El generador aleatorio se
+    siembra con (seed, índice del tenant), así que el contenido no
+    depende del orden ni de la cantidad de procesos.
+    """
+
+    def __init__(self, index, properties=6, images=0, contacts=0, pages=0, batch_size=1000, seed=0,
+                 owner_password=None):
+        self.index = index
+        self.properties = properties
+        self.images = images
+        self.contacts = contacts
+        self.pages = pages
+        self.batch_size = batch_size
+        self.random = random.Random(f'{seed}:{index}')
+        self.owner_password = owner_password or make_password(OWNER_PASSWORD)
+        self.counts = {'properties': 0, 'images': 0, 'contacts': 0, 'pages': 0}
+
+    def run(self):
+        """Devuelve los conteos, o None si el tenant ya existía"""
+        data = tenant_data(self.index)
+        tenant = retry_on_locked(lambda: self.create_tenant(data))
+        if tenant is None:
+            return None
+        self.create_pages(tenant)
+        property_ids = self.create_properties(tenant, CITIES_BY_TENANT.get(tenant.subdomain))
+        if self.images:
+            self.create_images(tenant, property_ids)
+        if self.contacts:
+            self.create_contacts(tenant, property_ids)
+        # Las escrituras masivas no disparan señales
+        invalidate_facets(tenant.pk)
+        invalidate_pages(tenant.pk)
+        return self.counts
+
+    def create_tenant(self, data):
+        # Se escribe primero: en SQLite una transacción que lee y después
+        # escribe falla al instante si otro proceso está escribiendo
+        try:
+            with write_atomic():
+                tenant = Tenant.objects.create(**data)
+                self.create_owner(tenant)
+        except IntegrityError:
+            return None
+        return tenant
+
+    def create_owner(self, tenant):
+        owner, _ = User.objects.get_or_create(
+            username=f'owner_{tenant.subdomain}',
+            defaults={
+                'email': tenant.contact_email,
+                'first_name': f'Dueño {tenant.name}',
+                'is_staff': True,
+                'password': self.owner_password,
+            },
+        )
+        TenantUser.objects.create(user=owner, tenant=tenant, is_owner=True)
+
+    def create_pages(self, tenant):
+        from .views import create_default_homepage
+
+        def write():
+            with write_atomic():
+                create_default_homepage(tenant)
+                pages = [Page(
+                    tenant=tenant,
+                    title='Nuestras Propiedades',
+                    slug='propiedades',
+                    page_type='properties',
+                    meta_description=f'Descubre todas las propiedades disponibles en {tenant.name}',
+                )]
+                pages += [Page(
+                    tenant=tenant,
+                    title=f'Página {number}',
+                    slug=f'pagina-{number}',
+                    page_type='custom',
+                ) for number in range(1, self.pages + 1)]
+                pages = Page.objects.bulk_create(pages)
+                Section.objects.bulk_create([Section(
+                    page=page,
+                    section_type='text_content',
+                    title=page.title,
+                    content=' '.join(self.random.choice(SAMPLE_PROPERTIES)['description'] for _ in range(3)),
+                    order=1,
+                ) for page in pages[1:]])
+
+        retry_on_locked(write)
+        self.counts['pages'] = self.pages + 2
+
+    def build_property(self, tenant, number, cities):
+        sample = self.random.choice(SAMPLE_PROPERTIES)
+        city = self.random.choice(cities)
+        sale_type = self.random.choice(SALE_TYPES)
+        if sale_type == 'rent':
+            price = self.random.randint(800, 2500)
+        else:
+            price = self.random.randint(150000, 800000)
+        return Property(
+            tenant=tenant,
+            external_ref=f'seed-{number:07d}',
+            title=f"{sample['title']} - {city}",
+            description=sample['description'],
+            property_type=self.random.choice(PROPERTY_TYPES),
+            sale_type=sale_type,
+            price=Decimal(price),
+            address=f'{self.random.choice(STREET_TYPES)} {self.random.choice(STREET_NAMES)} {self.random.randint(1, 200)}',
+            city=city,
+            state=self.random.choice(STATES),
+            country='España',
+            zip_code=str(self.random.randint(10000, 50000)),
+            bedrooms=sample['bedrooms'],
+            bathrooms=sample['bathrooms'],
+            area=sample['area'] if self.random.random() > 0.05 else None,
+            parking_spaces=sample['parking_spaces'],
+            # Como antes, las tres primeras destacadas; después ~5%
+            is_featured=number < 3 or self.random.random() < 0.05,
+            is_available=number < 3 or self.random.random() < 0.9,
+        )
+
+    def create_properties(self, tenant, cities=None):
+        """Crea las propiedades por lotes y devuelve sus ids"""
+        cities = cities or self.random.sample(CITIES, 4)
+        # Fechas repartidas en el último año para que los órdenes sean realistas
+        now = timezone.now()
+        ids = []
+        for start in range(0, self.properties, self.batch_size):
+            batch = [self.build_property(tenant, number, cities)
+                     for number in range(start, min(start + self.batch_size, self.properties))]
+            for prop in batch:
+                prop.created_at = prop.updated_at = now - timedelta(minutes=self.random.randint(0, 525600))
+
+            def write():
+                with write_atomic(), explicit_timestamps(Property):
+                    return [prop.pk for prop in Property.objects.bulk_create(batch)]
+
+            ids += retry_on_locked(write)
+        self.counts['properties'] = len(ids)
+        return ids
+
+    def create_images(self, tenant, property_ids):
+        placeholders = placeholder_images()
+        stored_bytes = 0
+        # Lotes de unas `batch_size` imágenes
+        step = max(1, self.batch_size // self.images)
+        for start in range(0, len(property_ids), step):
+            rows = []
+            for property_id in property_ids[start:start + step]:
+                for order in range(self.images):
+                    name, size = self.random.choice(placeholders)
+                    stored_bytes += size
+                    rows.append(PropertyImage(property_id=property_id, image=name, is_main=order == 0, order=order))
+
+            def write():
+                with write_atomic():
+                    PropertyImage.objects.bulk_create(rows)
+                    Property.objects.filter(pk__in={row.property_id for row in rows}).refresh_main_images()
+
+            retry_on_locked(write)
+            self.counts['images'] += len(rows)
+        # Cada fila cuenta su archivo, igual que reconcile_storage
+        retry_on_locked(lambda: adjust_usage(tenant.pk, stored_bytes))
+
+    def create_contacts(self, tenant, property_ids):
+        for start in range(0, self.contacts, self.batch_size):
+            rows = []
+            for _ in range(start, min(start + self.batch_size, self.contacts)):
+                first, last = self.random.choice(FIRST_NAMES), self.random.choice(LAST_NAMES)
+                rows.append(ContactSubmission(
+                    tenant=tenant,
+                    name=f'{first} {last}',
+                    email=f'{slugify(first)}.{slugify(last)}{self.random.randint(1, 999)}@example.com',
+                    phone=f'+34-6{self.random.randint(10000000, 99999999)}',
+                    subject='Consulta',
+                    message='Me interesa la propiedad, ¿podemos coordinar una visita?',
+                    property_interest_id=self.random.choice(property_ids) if property_ids else None,
+                    is_read=self.random.random() < 0.5,
+                ))
+            retry_on_locked(lambda: ContactSubmission.objects.bulk_create(rows))
+            self.counts['contacts'] += len(rows)
+
+
+def seed_tenant(index, options):
+    """Punto de entrada de cada proceso del pool"""
+    try:
+        return index, TenantSeeder(index, **options).run()
+    finally:
+        connections.close_all()
@@ -0,0 +1,409 @@
+
+import hashlib
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.apps import apps
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, IntegrityError, connections
+from django.http import HttpResponse
+
+from cms_project.tenants.cache import tenant_cache
+from cms_project.tenants.models import Tenant, TenantPlacement
+from .facets import invalidate_facets
+from .page_cache import invalidate_pages
+from .bulk import explicit_timestamps
+from .replicas import mark_write
+from .sqlite import write_atomic
+
+
+# Modelos con datos de un tenant y el lookup que los filtra, en el orden
+# en que move_tenant los copia (los padres antes que los hijos)
+SHARDED_MODELS = [
+    ('main.Page', 'tenant_id'),
+    ('main.Section', 'page__tenant_id'),
+    ('main.Property', 'tenant_id'),
+    ('main.PropertyImage', 'property__tenant_id'),
+    ('main.ContactSubmission', 'tenant_id'),
+    ('media_files.MediaBlob', 'tenant_id'),
+    ('media_files.MediaFile', 'tenant_id'),
+]
+
+SHARDED_LABELS = {label.lower() for label, _ in SHARDED_MODELS}
+
+# Tenant de la request o del bloque use_tenant() en curso (id)
+_tenant = ContextVar('shard_tenant', default=None)
+
+
+class TenantMovingError(DatabaseError):
+    """Escritura de un tenant mientras move_tenant lo cambia de base"""
+
+
+def shard_aliases():
+    return getattr(settings, 'SHARD_DATABASES', [DEFAULT_DB_ALIAS])
+
+
+def is_sharded(model):
+    return model._meta.label_lower in SHARDED_LABELS
+
+
+def placement_key(tenant_id):
+    return f'placement:{tenant_id}'
+
+
+def placement_timeout():
+    """Segundos de una ubicación en la caché compartida (cortos: acotan cuánto dura una vieja)"""
+    return getattr(settings, 'SHARD_PLACEMENT_CACHE_TIMEOUT', 30)
+
+
+def settle_seconds():
+    """
+    Tiempo hasta que todos los procesos leen una ubicación nueva: el LRU
+    local más la caché compartida. Cubre también una carga que leyó la fila
+    vieja y la guardó en la caché justo después de invalidarla.
+    """
+    return getattr(settings, 'TENANT_CACHE_LOCAL_TTL', 30) + placement_timeout()
+
+
+def load_placement(tenant_id):
+    # Siempre de la primaria: una réplica atrasada no puede decidir dónde escribir
+    return TenantPlacement.objects.using(DEFAULT_DB_ALIAS).filter(pk=tenant_id).values_list(
+        'database', 'state'
+    ).first()
+
+
+def get_placement(tenant_id):
+    """(base, estado) del tenant, cacheado como la resolución de hosts"""
+    placement = tenant_cache.get(placement_key(tenant_id), lambda: load_placement(tenant_id),
+                                 timeout=placement_timeout())
+    return placement or (DEFAULT_DB_ALIAS, TenantPlacement.ACTIVE)
+
+
+def invalidate_placement(tenant_id):
+    tenant_cache.invalidate(placement_key(tenant_id))
+
+
+def tenant_database(tenant_id, for_write=False):
+    """
+    Alias de la base del tenant; para escribir falla si se está moviendo.
+    La ubicación sale de la caché también al escribir: TenantMover la
+    invalida al empezar y al terminar y espera settle_seconds() a que
+    venza en todos los procesos, y antes de borrar el origen verifica que
+    nadie haya escrito ahí con una ubicación vieja.
+    """
+    database, state = get_placement(tenant_id)
+    if for_write and state == TenantPlacement.MOVING:
+        raise TenantMovingError(f'El tenant {tenant_id} se está moviendo de base de datos')
+    return database
+
+
+@contextmanager
+def use_tenant(tenant):
+    """Enruta los modelos del tenant (instancia o id) a su base dentro del bloque"""
+    token = _tenant.set(getattr(tenant, 'pk', tenant))
+    try:
+        yield
+    finally:
+        _tenant.reset(token)
+
+
+def tenant_atomic(tenant):
+    """transaction.atomic() de escritura en la base del tenant"""
+    return write_atomic(using=tenant_database(getattr(tenant, 'pk', tenant), for_write=True))
+
+
+class ShardRouter:
+    """
+    Envía los modelos de SHARDED_MODELS a la base del tenant según
+    TenantPlacement. El tenant sale del objeto de los hints (su tenant_id,
+    o el mismo Tenant en los related managers) o del contexto que fija
+    TenantShardMiddleware con request.tenant. Sin tenant se usa la base
+    por defecto. Las lecturas en la base por defecto se dejan a
+    ReplicaRouter, que va después en DATABASE_ROUTERS.
+
+    No hay consultas entre shards: los changelists sin filtrar de un
+    superusuario muestran sólo la base del tenant del host por el que
+    entró. Los tenants de otro shard se administran desde uno de sus hosts.
+    """
+
+    def db_for_read(self, model, **hints):
+        if not self.is_active(model):
+            return None
+        instance = hints.get('instance')
+        if instance is not None and is_sharded(type(instance)) and instance._state.db:
+            # Relaciones de un objeto ya leído: misma base
+            return instance._state.db
+        tenant_id = self.tenant_id(hints)
+        if tenant_id is None:
+            return None
+        database = tenant_database(tenant_id)
+        return None if database == DEFAULT_DB_ALIAS else database
+
+    def db_for_write(self, model, **hints):
+        if not self.is_active(model):
+            return None
+        tenant_id = self.tenant_id(hints)
+        if tenant_id is None:
+            return None
+        mark_write()
+        return tenant_database(tenant_id, for_write=True)
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # La fila del tenant se copia a su shard, así que las FK a Tenant valen en todos
+        if isinstance(obj1, Tenant) and is_sharded(type(obj2)) or isinstance(obj2, Tenant) and is_sharded(type(obj1)):
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Todos los shards tienen el esquema completo
+        return None
+
+    @staticmethod
+    def is_active(model):
+        return len(shard_aliases()) > 1 and is_sharded(model)
+
+    @staticmethod
+    def tenant_id(hints):
+        instance = hints.get('instance')
+        if isinstance(instance, Tenant):
+            return instance.pk
+        tenant_id = getattr(instance, 'tenant_id', None)
+        return tenant_id if tenant_id is not None else _tenant.get()
+
+
+class TenantShardMiddleware:
+    """
+    Enruta las consultas de la request a la base de request.tenant y
+    responde 503 a las escrituras de un tenant que se está moviendo.
+    Va después de TenantMiddleware.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with use_tenant(getattr(request, 'tenant', None)):
+            return self.get_response(request)
+
+    def process_exception(self, request, exception):
+        if not isinstance(exception, TenantMovingError):
+            return None
+        response = HttpResponse(
+            'Estamos trasladando los datos de este sitio. Vuelve a intentarlo en unos segundos.',
+            status=503,
+            content_type='text/plain; charset=utf-8',
+        )
+        response['Retry-After'] = str(settle_seconds())
+        return response
+
+
+def mirror_tenant(tenant, database):
+    """Copia la fila del tenant a un shard: las FK de sus datos apuntan a ella"""
+    values = {field.attname: getattr(tenant, field.attname) for field in Tenant._meta.concrete_fields}
+    queryset = Tenant._base_manager.using(database)
+    if not queryset.filter(pk=tenant.pk).update(**values):
+        queryset.bulk_create([Tenant(**values)])
+
+
+def reserve_id_range(database, databases):
+    """
+    Las filas movidas conservan su id (y sus URLs), pero SQLite asigna
+    max(secuencia, mayor id de la tabla) + 1: una base que recibe filas de
+    otro bloque seguiría asignando ids dentro de ese bloque y chocaría con
+    su dueño. Antes de copiar, `database` pasa a un bloque nuevo de
+    SHARD_ID_BLOCK por encima de todos los ids y secuencias de `databases`,
+    así cada bloque tiene una sola base que lo asigna. También vale para
+    la base por defecto. Sólo SQLite; los movimientos van de a uno.
+    """
+    connection = connections[database]
+    if connection.vendor != 'sqlite':
+        return
+    block = getattr(settings, 'SHARD_ID_BLOCK', 10 ** 12)
+    models = sharded_models()
+    highest = 0
+    for alias in {database, *databases}:
+        with connections[alias].cursor() as cursor:
+            for model in models:
+                table = model._meta.db_table
+                cursor.execute(
+                    f'SELECT MAX({connection.ops.quote_name(model._meta.pk.column)}) '
+                    f'FROM {connection.ops.quote_name(table)}'
+                )
+                highest = max(highest, cursor.fetchone()[0] or 0)
+                cursor.execute('SELECT seq FROM sqlite_sequence WHERE name = %s', [table])
+                row = cursor.fetchone()
+                highest = max(highest, row[0] if row else 0)
+    start = (highest // block + 1) * block
+    with connection.cursor() as cursor:
+        for model in models:
+            table = model._meta.db_table
+            cursor.execute('UPDATE sqlite_sequence SET seq = %s WHERE name = %s', [start, table])
+            if not cursor.rowcount:
+                cursor.execute('INSERT INTO sqlite_sequence (name, seq) VALUES (%s, %s)', [table, start])
+
+
+def sharded_models():
+    return [apps.get_model(label) for label, _ in SHARDED_MODELS]
+
+
+def used_databases():
+    """La base por defecto más los shards que tienen algún tenant"""
+    placed = set(TenantPlacement.objects.using(DEFAULT_DB_ALIAS).values_list('database', flat=True))
+    return [alias for alias in shard_aliases() if alias == DEFAULT_DB_ALIAS or alias in placed]
+
+
+class MoveAbortedError(RuntimeError):
+    """El origen cambió después de la última copia: no se borra nada"""
+
+
+class TenantMover:
+    """
+    Mueve los datos de un tenant a otra base sin cortar el servicio:
+
+    1. Copia todo al destino mientras el tenant sigue leyendo y escribiendo.
+    2. Marca la ubicación como 'moving' (las escrituras del tenant fallan
+       con TenantMovingError, las lecturas siguen) y espera `settle`
+       segundos a que terminen las escrituras en curso.
+    3. Copia las diferencias, verifica las FK, toma una huella del origen
+       y cambia la ubicación.
+    4. Espera otra vez (las lecturas cacheadas pasan al destino) y borra
+       los datos del origen, salvo que su huella haya cambiado: en ese
+       caso MoveAbortedError y el origen queda intacto para revisarlo.
+
+    Las filas se copian con sus ids; las FK se verifican al final, igual
+    que loaddata.
+    """
+
+    def __init__(self, tenant, target, batch_size=1000, settle=None, log=None):
+        self.tenant = tenant
+        self.target = target
+        self.batch_size = batch_size
+        self.settle = settle_seconds() if settle is None else settle
+        self.log = log or (lambda message: None)
+        self.counts = {}
+
+    def run(self):
+        source = tenant_database(self.tenant.pk)
+        if self.target not in shard_aliases():
+            raise ValueError(f"'{self.target}' no está en SHARD_DATABASES")
+        if source == self.target:
+            raise ValueError(f'El tenant ya está en {self.target}')
+
+        reserve_id_range(self.target, [source, *used_databases()])
+        mirror_tenant(self.tenant, self.target)
+        self.log(f'Copiando de {source} a {self.target}...')
+        self.copy(source)
+
+        self.place(source, TenantPlacement.MOVING)
+        try:
+            self.log('Escrituras bloqueadas; copiando las diferencias...')
+            self.copy(source)
+            connections[self.target].check_constraints(
+                table_names=[model._meta.db_table for model in sharded_models()]
+            )
+            fingerprint = self.fingerprint(source)
+        except Exception:
+            self.place(source, TenantPlacement.ACTIVE)
+            raise
+        self.place(self.target, TenantPlacement.ACTIVE)
+        # Cambios del tenant guardados durante el movimiento
+        mirror_tenant(Tenant.objects.using(DEFAULT_DB_ALIAS).get(pk=self.tenant.pk), self.target)
+        invalidate_facets(self.tenant.pk)
+        invalidate_pages(self.tenant.pk)
+
+        if self.fingerprint(source) != fingerprint:
+            raise MoveAbortedError(
+                f'{source} cambió después de la última copia; el tenant ya está en {self.target} '
+                f'pero sus datos en {source} no se borraron'
+            )
+        self.log(f'Borrando los datos de {source}...')
+        self.purge(source)
+        return self.counts
+
+    def place(self, database, state):
+        TenantPlacement.objects.using(DEFAULT_DB_ALIAS).update_or_create(
+            tenant=self.tenant, defaults={'database': database, 'state': state}
+        )
+        invalidate_placement(self.tenant.pk)
+        # Los demás procesos ven el cambio cuando vence su LRU local
+        time.sleep(self.settle)
+
+    def fingerprint(self, database):
+        """Resumen de todas las filas del tenant en `database`"""
+        digest = hashlib.sha256()
+        for label, lookup in SHARDED_MODELS:
+            fields, queryset = self.rows(apps.get_model(label), lookup, database)
+            digest.update(label.encode())
+            for row in queryset.values_list(*fields).iterator(chunk_size=self.batch_size):
+                digest.update(repr(row).encode())
+        return digest.hexdigest()
+
+    def rows(self, model, lookup, database):
+        fields = [field.attname for field in model._meta.concrete_fields]
+        return fields, model._base_manager.using(database).filter(**{lookup: self.tenant.pk}).order_by('pk')
+
+    def copy(self, source):
+        """Deja en el destino lo mismo que en el origen: inserta, actualiza y borra"""
+        connection = connections[self.target]
+        with connection.constraint_checks_disabled():
+            leftovers = []
+            for label, lookup in SHARDED_MODELS:
+                leftovers.append(self.copy_model(apps.get_model(label), lookup, source))
+            # Los borrados al final y de hijos a padres
+            for (label, lookup), pks in reversed(list(zip(SHARDED_MODELS, leftovers))):
+                model = apps.get_model(label)
+                for start in range(0, len(pks), self.batch_size):
+                    with write_atomic(using=self.target):
+                        # Sin señales: el archivo sigue en uso por la fila del origen
+                        model._base_manager.using(self.target).filter(
+                            pk__in=pks[start:start + self.batch_size]
+                        )._raw_delete(self.target)
+
+    def copy_model(self, model, lookup, source):
+        """Copia un modelo y devuelve los pks que sobran en el destino"""
+        fields, queryset = self.rows(model, lookup, source)
+        pk_index = fields.index(model._meta.pk.attname)
+        _, existing = self.rows(model, lookup, self.target)
+        existing = {row[pk_index]: row for row in existing.values_list(*fields).iterator()}
+
+        inserts, updates = [], []
+        for row in queryset.values_list(*fields).iterator(chunk_size=self.batch_size):
+            current = existing.pop(row[pk_index], None)
+            if current is None:
+                inserts.append(model(**dict(zip(fields, row))))
+            elif current != row:
+                updates.append((row[pk_index], {name: value for name, value, old in zip(fields, row, current)
+                                                if value != old}))
+            if len(inserts) + len(updates) >= self.batch_size:
+                self.write(model, inserts, updates)
+                inserts, updates = [], []
+        self.write(model, inserts, updates)
+        return list(existing)
+
+    def write(self, model, inserts, updates):
+        if not inserts and not updates:
+            return
+        manager = model._base_manager.db_manager(self.target)
+        try:
+            with write_atomic(using=self.target), explicit_timestamps(model):
+                manager.bulk_create(inserts)
+                for pk, changed in updates:
+                    manager.filter(pk=pk).update(**changed)
+        except IntegrityError as error:
+            raise IntegrityError(
+                f'No se pudo copiar {model._meta.label} a {self.target} (¿ids en uso por otro tenant?): {error}'
+            ) from error
+        counts = self.counts.setdefault(model._meta.label, {'inserted': 0, 'updated': 0})
+        counts['inserted'] += len(inserts)
+        counts['updated'] += len(updates)
+
+    def purge(self, source):
+        """Borra los datos del tenant del origen sin señales (los archivos siguen en uso)"""
+        connection = connections[source]
+        with connection.constraint_checks_disabled(), write_atomic(using=source):
+            for label, lookup in reversed(SHARDED_MODELS):
+                model = apps.get_model(label)
+                model._base_manager.using(source).filter(**{lookup: self.tenant.pk})._raw_delete(source)
+            if source != DEFAULT_DB_ALIAS:
+                Tenant._base_manager.using(source).filter(pk=self.tenant.pk)._raw_delete(source)
@@ -0,0 +1,168 @@
+
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.models import Q
+from django.db.models.functions import Now
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete
+from django.dispatch import receiver
+from cms_project.tenants.models import Tenant
+from cms_project.media_files.quotas import track_file_change, apply_file_change, release_file
+from cms_project.media_files.renditions import schedule_renditions, delete_renditions, renditions_ready
+from .models import Property, PropertyImage, Page, Section
+from .search import ensure_property_fts
+from .sharding import invalidate_placement, mirror_tenant, tenant_database, use_tenant
+from .facets import invalidate_facets
+from .page_cache import invalidate_pages
+
+
+@receiver(post_save, sender=PropertyImage)
+def refresh_main_image_on_save(sender, instance, **kwargs):
+    """Actualiza la imagen principal de la propiedad (y de la anterior si cambió)"""
+    Property.objects.filter(
+        Q(pk=instance.property_id) | Q(main_image=instance)
+    ).refresh_main_images()
+
+
+@receiver(post_delete, sender=PropertyImage)
+def refresh_main_image_on_delete(sender, instance, origin=None, **kwargs):
+    # Si se borra la propiedad completa no hay nada que recalcular
+    if isinstance(origin, Property):
+        return
+    Property.objects.filter(pk=instance.property_id).refresh_main_images()
+
+
+@receiver(post_save, sender=Property)
+@receiver(post_delete, sender=Property)
+def invalidate_property_facets(sender, instance, **kwargs):
+    """Los conteos del catálogo del tenant dejan de ser válidos"""
+    invalidate_facets(instance.tenant_id)
+
+
+@receiver(post_save, sender=Property)
+@receiver(post_delete, sender=Property)
+@receiver(post_save, sender=Page)
+@receiver(post_delete, sender=Page)
+def invalidate_tenant_pages(sender, instance, **kwargs):
+    """Descarta las páginas cacheadas del tenant afectado"""
+    invalidate_pages(instance.tenant_id)
+
+
+@receiver(post_save, sender=PropertyImage)
+@receiver(post_delete, sender=PropertyImage)
+def invalidate_property_image_pages(sender, instance, origin=None, **kwargs):
+    if isinstance(origin, Property):
+        return
+    invalidate_pages(instance.property.tenant_id)
+
+
+@receiver(post_save, sender=Section)
+@receiver(post_delete, sender=Section)
+def invalidate_section_pages(sender, instance, origin=None, **kwargs):
+    if isinstance(origin, Page):
+        return
+    invalidate_pages(instance.page.tenant_id)
+
+
+@receiver(post_save, sender=Tenant)
+def invalidate_tenant_settings_pages(sender, instance, **kwargs):
+    """Nombre, contacto y dirección del tenant aparecen en todas sus páginas"""
+    invalidate_pages(instance.pk)
+
+
+@receiver(post_save, sender=PropertyImage)
+def schedule_property_image_renditions(sender, instance, **kwargs):
+    schedule_renditions(instance, 'image', 'renditions')
+
+
+@receiver(post_save, sender=Section)
+def schedule_section_renditions(sender, instance, **kwargs):
+    schedule_renditions(instance, 'background_image', 'background_renditions')
+
+
+@receiver(post_delete, sender=PropertyImage)
+def delete_property_image_renditions(sender, instance, **kwargs):
+    delete_renditions(instance.renditions)
+
+
+@receiver(post_delete, sender=Section)
+def delete_section_renditions(sender, instance, **kwargs):
+    delete_renditions(instance.background_renditions)
+
+
+@receiver(renditions_ready, sender=PropertyImage)
+def property_image_renditions_ready(sender, pk, using=None, **kwargs):
+    """Las páginas pasan a usar las variantes en lugar del original"""
+    image = PropertyImage.objects.using(using).select_related('property').filter(pk=pk).first()
+    if image:
+        Property.objects.using(using).filter(pk=image.property_id).update(updated_at=Now())
+        invalidate_pages(image.property.tenant_id)
+
+
+@receiver(renditions_ready, sender=Section)
+def section_renditions_ready(sender, pk, using=None, **kwargs):
+    section = Section.objects.using(using).select_related('page').filter(pk=pk).first()
+    if section:
+        Section.objects.using(using).filter(pk=pk).update(updated_at=Now())
+        invalidate_pages(section.page.tenant_id)
+
+
+@receiver(pre_save, sender=PropertyImage)
+def track_property_image_size(sender, instance, **kwargs):
+    track_file_change(instance, 'image', lambda: instance.property.tenant)
+
+
+@receiver(post_save, sender=PropertyImage)
+def charge_property_image(sender, instance, **kwargs):
+    apply_file_change(instance, 'image', lambda: instance.property.tenant_id)
+
+
+@receiver(post_delete, sender=PropertyImage)
+def release_property_image(sender, instance, origin=None, **kwargs):
+    tenant_id = origin.tenant_id if isinstance(origin, Property) else instance.property.tenant_id
+    release_file(instance.image, tenant_id)
+
+
+@receiver(pre_save, sender=Section)
+def track_section_background_size(sender, instance, **kwargs):
+    track_file_change(instance, 'background_image', lambda: instance.page.tenant)
+
+
+@receiver(post_save, sender=Section)
+def charge_section_background(sender, instance, **kwargs):
+    apply_file_change(instance, 'background_image', lambda: instance.page.tenant_id)
+
+
+@receiver(post_delete, sender=Section)
+def release_section_background(sender, instance, origin=None, **kwargs):
+    if instance.background_image:
+        tenant_id = origin.tenant_id if isinstance(origin, Page) else instance.page.tenant_id
+        release_file(instance.background_image, tenant_id)
+
+
+@receiver(post_save, sender=Tenant)
+def mirror_tenant_to_shard(sender, instance, using, raw=False, **kwargs):
+    """La copia del tenant en su shard se mantiene al día (nombre, contacto...)"""
+    if raw or using != DEFAULT_DB_ALIAS:
+        return
+    database = tenant_database(instance.pk)
+    if database != DEFAULT_DB_ALIAS:
+        mirror_tenant(instance, database)
+
+
+@receiver(pre_delete, sender=Tenant)
+def delete_tenant_shard_data(sender, instance, using, **kwargs):
+    """
+    El borrado en cascada sólo alcanza a la base por defecto: en el shard se
+    borra aparte, con señales, para liberar archivos y cachés
+    """
+    if using != DEFAULT_DB_ALIAS:
+        return
+    database = tenant_database(instance.pk)
+    if database != DEFAULT_DB_ALIAS:
+        with use_tenant(instance):
+            Tenant._base_manager.using(database).filter(pk=instance.pk).delete()
+    invalidate_placement(instance.pk)
+
+
+def ensure_search_index(sender, using='default', **kwargs):
+    """Recrea los triggers FTS5 si una migración reconstruyó main_property"""
+    ensure_property_fts(connections[using])
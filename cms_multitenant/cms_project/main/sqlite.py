@@ -0,0 +1,232 @@
+
+import random
+import sqlite3
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import OperationalError, connections, transaction
+
+
+# Mensajes de SQLite cuando otra conexión tiene el bloqueo
+LOCKED_MESSAGES = ('database is locked', 'database table is locked', 'database is busy')
+
+
+def is_locked(error):
+    return any(message in str(error).lower() for message in LOCKED_MESSAGES)
+
+
+def backoff(attempt, base=0.05):
+    """Espera exponencial con jitter para no reintentar todos a la vez"""
+    return base * 2 ** attempt * (0.5 + random.random())
+
+
+def retry_on_locked(func, attempts=5):
+    """
+    Ejecuta `func` (normalmente una transacción completa) y la repite si
+    la base sigue bloqueada después del busy timeout
+    """
+    for attempt in range(1, attempts + 1):
+        try:
+            return func()
+        except (OperationalError, sqlite3.OperationalError) as error:
+            if not is_locked(error) or attempt == attempts:
+                raise
+            time.sleep(backoff(attempt))
+
+
+class LockedRetry:
+    """
+    execute_wrapper que repite una sentencia bloqueada cuando la conexión
+    está en autocommit. Dentro de una transacción no se reintenta: habría
+    que repetir la transacción entera (ver retry_on_locked).
+    """
+
+    def __init__(self, retries=3):
+        self.retries = retries
+
+    def __call__(self, execute, sql, params, many, context):
+        connection = context['connection']
+        attempt = 0
+        while True:
+            try:
+                return execute(sql, params, many, context)
+            except OperationalError as error:
+                if connection.in_atomic_block or not is_locked(error) or attempt >= self.retries:
+                    raise
+                attempt += 1
+                time.sleep(backoff(attempt))
+
+
+def install_locked_retry(sender, connection, **kwargs):
+    """Receptor de connection_created: agrega el reintento una sola vez por conexión"""
+    if connection.vendor != 'sqlite':
+        return
+    if not any(isinstance(wrapper, LockedRetry) for wrapper in connection.execute_wrappers):
+        # Al principio: execute_wrapper() quita siempre el último de la lista,
+        # y la conexión puede abrirse dentro de uno (p. ej. las métricas)
+        connection.execute_wrappers.insert(0, LockedRetry(getattr(settings, 'SQLITE_WRITE_RETRIES', 3)))
+
+
+# ¿Las transacciones SQLite en curso empiezan con BEGIN IMMEDIATE?
+_immediate = ContextVar('sqlite_immediate', default=False)
+
+
+def apply_transaction_mode(connection):
+    """IMMEDIATE dentro de write_transactions(); fuera, el modo de OPTIONS (DEFERRED)"""
+    if connection.vendor != 'sqlite':
+        return
+    configured = connection.settings_dict.get('OPTIONS', {}).get('transaction_mode')
+    connection.transaction_mode = 'IMMEDIATE' if _immediate.get() else (configured or '').upper() or None
+
+
+def set_transaction_mode(sender, connection, **kwargs):
+    """Receptor de connection_created: la conexión nueva toma el modo del contexto"""
+    apply_transaction_mode(connection)
+
+
+@contextmanager
+def write_transactions():
+    """
+    En el bloque, las transacciones SQLite empiezan con BEGIN IMMEDIATE:
+    toman el bloqueo de escritura al empezar y esperan el busy timeout en
+    lugar de fallar al pasar de leer a escribir. Fuera de los caminos de
+    escritura siguen DEFERRED, así una transacción que sólo lee no espera
+    ni frena a los escritores.
+    """
+    token = _immediate.set(True)
+    try:
+        for connection in connections.all(initialized_only=True):
+            apply_transaction_mode(connection)
+        yield
+    finally:
+        _immediate.reset(token)
+        for connection in connections.all(initialized_only=True):
+            apply_transaction_mode(connection)
+
+
+@contextmanager
+def write_atomic(using=None):
+    """transaction.atomic() de un camino de escritura (BEGIN IMMEDIATE en SQLite)"""
+    with write_transactions(), transaction.atomic(using=using):
+        yield
+
+
+class WriteTransactionsMiddleware:
+    """
+    Las requests que escriben (POST, PUT, PATCH, DELETE) corren dentro de
+    write_transactions(): el admin guarda en transaction.atomic() después
+    de leer el objeto. Los GET quedan con transacciones DEFERRED.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if request.method in ('GET', 'HEAD', 'OPTIONS', 'TRACE'):
+            return self.get_response(request)
+        with write_transactions():
+            return self.get_response(request)
+
+
+def connection_pragmas(connection):
+    """Valores efectivos de los pragmas configurados (para verificar el perfil)"""
+    names = getattr(settings, 'SQLITE_PRAGMAS', {})
+    with connection.cursor() as cursor:
+        values = {}
+        for name in names:
+            cursor.execute(f'PRAGMA {name}')
+            row = cursor.fetchone()
+            # Algunos (mmap_size) no devuelven nada en una base en memoria
+            values[name] = row[0] if row else None
+    return values
+
+
+# Benchmark de concurrencia (sqlite3 directo, en procesos separados). Los
+# perfiles son dicts: init_command, timeout, begin (modo de transacción) y retries.
+
+BENCH_TENANTS = 20
+
+BENCH_SCHEMA = [
+    'CREATE TABLE bench_property (id INTEGER PRIMARY KEY, tenant_id INTEGER, title TEXT, '
+    'price INTEGER, created_at REAL)',
+    'CREATE INDEX bench_property_tenant ON bench_property (tenant_id, created_at DESC)',
+    'CREATE TABLE bench_contact (id INTEGER PRIMARY KEY, tenant_id INTEGER, email TEXT, '
+    'message TEXT, created_at REAL)',
+]
+
+
+def bench_connect(path, profile):
+    connection = sqlite3.connect(path, timeout=profile['timeout'], isolation_level=None)
+    for command in profile['init_command'].split(';'):
+        if command.strip():
+            connection.execute(command)
+    return connection
+
+
+def bench_setup(path, profile, rows):
+    connection = bench_connect(path, profile)
+    for statement in BENCH_SCHEMA:
+        connection.execute(statement)
+    rng = random.Random(0)
+    connection.execute('BEGIN')
+    connection.executemany(
+        'INSERT INTO bench_property (tenant_id, title, price, created_at) VALUES (?, ?, ?, ?)',
+        [(rng.randint(1, BENCH_TENANTS), f'Propiedad {number}', rng.randint(800, 900000), time.time() - number)
+         for number in range(rows)],
+    )
+    connection.execute('COMMIT')
+    connection.close()
+
+
+def bench_reader(path, profile, duration, results):
+    """Catálogo: las 24 propiedades más recientes de un tenant al azar"""
+    connection = bench_connect(path, profile)
+    rng = random.Random()
+    latencies, errors = [], 0
+    deadline = time.monotonic() + duration
+    while time.monotonic() < deadline:
+        started = time.perf_counter()
+        try:
+            connection.execute(
+                'SELECT id, title, price FROM bench_property WHERE tenant_id = ? ORDER BY created_at DESC LIMIT 24',
+                (rng.randint(1, BENCH_TENANTS),),
+            ).fetchall()
+        except sqlite3.OperationalError:
+            errors += 1
+            continue
+        latencies.append(time.perf_counter() - started)
+    results.put(('read', latencies, errors))
+
+
+def bench_writer(path, profile, duration, results):
+    """Edición del admin más un contacto: lee, actualiza e inserta en una transacción"""
+    connection = bench_connect(path, profile)
+    rng = random.Random()
+    latencies, errors = [], 0
+    deadline = time.monotonic() + duration
+    while time.monotonic() < deadline:
+        started = time.perf_counter()
+        for attempt in range(profile['retries'] + 1):
+            try:
+                connection.execute(f"BEGIN {profile['begin']}")
+                property_id, tenant_id = connection.execute(
+                    'SELECT id, tenant_id FROM bench_property WHERE id = ?', (rng.randint(1, 1000),)
+                ).fetchone()
+                connection.execute('UPDATE bench_property SET price = price + 1 WHERE id = ?', (property_id,))
+                connection.execute(
+                    'INSERT INTO bench_contact (tenant_id, email, message, created_at) VALUES (?, ?, ?, ?)',
+                    (tenant_id, 'cliente@example.com', 'Consulta', time.time()),
+                )
+                connection.execute('COMMIT')
+                latencies.append(time.perf_counter() - started)
+                break
+            except sqlite3.OperationalError as error:
+                if connection.in_transaction:
+                    connection.execute('ROLLBACK')
+                if not is_locked(error) or attempt == profile['retries']:
+                    errors += 1
+                    break
+                time.sleep(backoff(attempt))
+    results.put(('write', latencies, errors))
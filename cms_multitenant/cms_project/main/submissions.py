@@ -0,0 +1,213 @@
+
+import atexit
+import json
+import logging
+import queue
+import threading
+import time
+
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections
+from django.utils import timezone
+
+from .models import ContactSubmission
+from .sharding import TenantMovingError, use_tenant
+
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+def dead_letter_fields(submission):
+    """Columnas del contacto (sin id ni fecha) para guardarlo y reintentarlo después"""
+    return {
+        field.attname: getattr(submission, field.attname)
+        for field in ContactSubmission._meta.concrete_fields
+        if not field.primary_key and field.name != 'created_at'
+    }
+
+
+def write_dead_letters(path, submissions, error):
+    """Agrega los contactos que no se pudieron escribir al archivo JSONL `path`"""
+    failed_at = timezone.now().isoformat()
+    with open(path, 'a', encoding='utf-8') as handle:
+        for submission in submissions:
+            entry = {'fields': dead_letter_fields(submission), 'error': str(error), 'failed_at': failed_at}
+            handle.write(json.dumps(entry, default=str) + '\n')
+
+
+class SubmissionWriter:
+    """
+    Escribe los contactos en segundo plano con bulk_create, en lotes de
+    hasta `batch_size` filas o cada `interval` segundos, lo que ocurra
+    primero. La request sólo encola; al cerrar el proceso se vacía la cola.
+
+    Los contactos de un tenant que está cambiando de shard esperan sin
+    bloquear al resto y se reintentan cada `interval` segundos hasta
+    `move_timeout`. Los que no se pueden escribir (o siguen esperando al
+    cerrar) van al archivo `dead_letter_path`; retry_contacts los reintenta.
+    """
+
+    def __init__(self, batch_size=50, interval=0.5, retries=3, move_timeout=300, dead_letter_path=None):
+        self.batch_size = batch_size
+        self.interval = interval
+        self.retries = retries
+        self.move_timeout = move_timeout
+        self.dead_letter_path = dead_letter_path
+        self.queue = queue.Queue()
+        # Reintentos pendientes (vence, contacto) y plazo de cada contacto;
+        # sólo los usa el hilo escritor
+        self.waiting = []
+        self.deadlines = {}
+        self.thread = None
+        self.lock = threading.Lock()
+
+    def start(self):
+        with self.lock:
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self.run, name='contact-writer', daemon=True)
+                self.thread.start()
+
+    def submit(self, submission):
+        self.start()
+        self.queue.put(submission)
+
+    def flush(self):
+        """Bloquea hasta que todo lo encolado quede escrito (o descartado al archivo)"""
+        self.queue.join()
+
+    def close(self):
+        if self.thread is not None and self.thread.is_alive():
+            self.queue.put(_STOP)
+            self.thread.join()
+
+    def next_batch(self):
+        """
+        Espera el primer elemento, sin pasar del próximo reintento pendiente,
+        y junta los que lleguen dentro del intervalo
+        """
+        timeout = None
+        if self.waiting:
+            timeout = max(0, min(due for due, _ in self.waiting) - time.monotonic())
+        try:
+            batch = [self.queue.get(timeout=timeout)]
+        except queue.Empty:
+            return []
+        deadline = time.monotonic() + self.interval
+        while batch[-1] is not _STOP and len(batch) < self.batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(self.queue.get(timeout=timeout))
+            except queue.Empty:
+                break
+        return batch
+
+    def take_retries(self, everything=False):
+        now = time.monotonic()
+        due = [submission for when, submission in self.waiting if everything or when <= now]
+        self.waiting = [(when, submission) for when, submission in self.waiting
+                        if not everything and when > now]
+        return due
+
+    def run(self):
+        while True:
+            batch = self.next_batch()
+            stop = bool(batch) and batch[-1] is _STOP
+            # Al cerrar se intenta una última vez con todo lo que esperaba
+            retried = self.take_retries(everything=stop)
+            submissions = [item for item in batch if item is not _STOP] + retried
+            try:
+                if submissions:
+                    self.write(submissions)
+            except Exception:
+                # El hilo no debe morir: se registra el lote perdido y se sigue
+                logger.exception('No se pudo escribir un lote de %d contactos', len(submissions))
+            finally:
+                close_old_connections()
+                if stop and self.waiting:
+                    self.dead_letter(self.take_retries(everything=True), 'El tenant seguía cambiando de shard')
+                pending = {id(submission) for _, submission in self.waiting}
+                for item in batch + retried:
+                    if id(item) not in pending:
+                        self.deadlines.pop(id(item), None)
+                        self.queue.task_done()
+            if stop:
+                return
+
+    def write(self, submissions):
+        # Un bulk_create por tenant: cada uno va a la base (shard) de su tenant
+        by_tenant = {}
+        for submission in submissions:
+            by_tenant.setdefault(submission.tenant_id, []).append(submission)
+        for tenant_id, group in by_tenant.items():
+            with use_tenant(tenant_id):
+                self.write_tenant(group)
+
+    def write_tenant(self, submissions):
+        for attempt in range(1, self.retries + 1):
+            try:
+                ContactSubmission.objects.bulk_create(submissions)
+                return
+            except TenantMovingError:
+                self.requeue(submissions)
+                return
+            except DatabaseError:
+                # SQLite bloqueada por otra escritura: reintentar con espera
+                if attempt == self.retries:
+                    break
+                time.sleep(0.1 * 2 ** attempt)
+        # Último recurso: de a una, para no perder el lote por una fila
+        moving = []
+        for submission in submissions:
+            try:
+                submission.save()
+            except TenantMovingError:
+                moving.append(submission)
+            except DatabaseError as error:
+                logger.exception('No se pudo guardar el contacto de %s', submission.email)
+                self.dead_letter([submission], error)
+        if moving:
+            self.requeue(moving)
+
+    def requeue(self, submissions):
+        """
+        El tenant está cambiando de shard: los contactos se reintentan en
+        `interval` segundos sin frenar al hilo, hasta `move_timeout`
+        """
+        now = time.monotonic()
+        expired = []
+        for submission in submissions:
+            deadline = self.deadlines.setdefault(id(submission), now + self.move_timeout)
+            if now >= deadline:
+                expired.append(submission)
+            else:
+                self.waiting.append((now + self.interval, submission))
+        if expired:
+            self.dead_letter(expired, 'El tenant seguía cambiando de shard')
+
+    def dead_letter(self, submissions, error):
+        if not submissions:
+            return
+        if self.dead_letter_path is None:
+            logger.error('Se perdieron %d contactos: %s', len(submissions), error)
+            return
+        try:
+            write_dead_letters(self.dead_letter_path, submissions, error)
+        except OSError:
+            logger.exception('No se pudieron guardar %d contactos en %s', len(submissions), self.dead_letter_path)
+        else:
+            logger.error('%d contactos guardados en %s: %s', len(submissions), self.dead_letter_path, error)
+
+
+submission_writer = SubmissionWriter(
+    batch_size=getattr(settings, 'CONTACT_WRITER_BATCH_SIZE', 50),
+    interval=getattr(settings, 'CONTACT_WRITER_INTERVAL', 0.5),
+    move_timeout=getattr(settings, 'CONTACT_WRITER_MOVE_TIMEOUT', 300),
+    dead_letter_path=getattr(settings, 'CONTACT_DEAD_LETTER_PATH', None),
+)
+
+# Apagado ordenado: escribir lo pendiente antes de salir
+atexit.register(submission_writer.close)
@@ -1,3 +1,1422 @@
-from django.test import TestCase
+import csv
+import io
+import json
+import os
+import random
+import re
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import OperationalError, connection
+from django.test import Client, RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from cms_project.tenants.cache import tenant_cache
+from cms_project.tenants.models import Tenant, TenantPlacement, TenantUser
+from .benchmark import SCENARIOS as BENCHMARK_SCENARIOS, compare, percentile, run_benchmark, summarize
+from .facets import invalidate_facets
+from .models import Property, PropertyImage, Page, ContactSubmission
+from .importer import PropertyImporter, read_rows
+from .instrumentation import Histogram, RequestMetrics, registry as metrics_registry
+from .page_cache import invalidate_pages
+from .profiling import StackSampler, classify
+from .ratelimit import take_token
+from .search import search_properties
+from .replicas import ReplicaRouter
+from .sharding import (
+    MoveAbortedError, TenantMover, TenantMovingError, invalidate_placement, mirror_tenant, tenant_database,
+    use_tenant,
+)
+from .sqlite import LockedRetry, WriteTransactionsMiddleware, connection_pragmas, retry_on_locked, write_atomic
+from .submissions import SubmissionWriter, submission_writer
+from .views import create_default_homepage, PROPERTY_SORTS
+
+
+# Tamaño del dataset sembrado; subir con QUERY_PLAN_ROWS para pruebas largas
+QUERY_PLAN_ROWS = int(os.environ.get('QUERY_PLAN_ROWS', 20000))
+
+
+def clear_caches():
+    """Las pks se reutilizan entre tests, así que se vacían las cachés"""
+    cache.clear()
+    tenant_cache.clear()
+
+
+def seed_properties(tenants, total, seed=0):
+    """Crea `total` propiedades repartidas entre los tenants usando bulk_create"""
+    rng = random.Random(seed)
+    cities = ['Madrid', 'Valencia', 'Barcelona', 'Sevilla', 'Bilbao', 'Málaga']
+    types = [key for key, _ in Property.PROPERTY_TYPES]
+    sale_types = [key for key, _ in Property.SALE_TYPES]
+    batch = []
+    for i in range(total):
+        batch.append(Property(
+            tenant=tenants[i % len(tenants)],
+            title=f'Propiedad {i}',
+            description='Descripción de prueba',
+            property_type=rng.choice(types),
+            sale_type=rng.choice(sale_types),
+            price=Decimal(rng.randint(800, 900000)),
+            area=Decimal(rng.randint(30, 400)),
+            address=f'Calle {i}',
+            city=rng.choice(cities),
+            state='Estado',
+            country='España',
+            is_featured=rng.random() < 0.05,
+            is_available=rng.random() < 0.9,
+        ))
+        if len(batch) == 5000:
+            Property.objects.bulk_create(batch)
+            batch = []
+    Property.objects.bulk_create(batch)
+
+
+class PropertyQueryPlanTests(TestCase):
+    """
+    Ejecuta las vistas públicas sobre un dataset grande y revisa con
+    EXPLAIN QUERY PLAN que ninguna consulta sobre Property haga un scan
+    completo o un ordenamiento con B-tree temporal.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.tenant = Tenant.objects.create(name='Plan', subdomain='plan')
+        other = Tenant.objects.create(name='Otro', subdomain='otro')
+        seed_properties([cls.tenant, other], QUERY_PLAN_ROWS)
+        create_default_homepage(cls.tenant)
+        Page.objects.create(tenant=cls.tenant, title='Propiedades', slug='catalogo', page_type='properties')
+        cls.property = Property.objects.filter(tenant=cls.tenant, is_available=True).first()
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def setUp(self):
+        clear_caches()
+        self.client = Client(HTTP_HOST='plan.example.com')
+
+    def get_plans(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        plans = []
+        with connection.cursor() as cursor:
+            for query in ctx.captured_queries:
+                sql = query['sql']
+                if not sql.startswith('SELECT') or 'FROM "main_property"' not in sql:
+                    continue
+                cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+                plans.append((sql, [row[-1] for row in cursor.fetchall()]))
+        self.assertTrue(plans, f'{url} no consultó Property')
+        return plans
+
+    def assertIndexedPlans(self, url):
+        for sql, details in self.get_plans(url):
+            for detail in details:
+                self.assertFalse(
+                    re.match(r'SCAN main_property\b', detail)
+                    or ('TEMP B-TREE' in detail and 'GROUP BY' not in detail),
+                    f'{url}: plan "{detail}" para\n{sql}',
+                )
+
+    def test_home_featured_properties(self):
+        self.assertIndexedPlans('/')
+
+    def test_properties_page(self):
+        self.assertIndexedPlans('/catalogo/')
+
+    def test_properties_view(self):
+        self.assertIndexedPlans('/propiedades/')
+
+    def test_properties_view_filters(self):
+        self.assertIndexedPlans('/propiedades/?type=house')
+        self.assertIndexedPlans('/propiedades/?sale=rent')
+        self.assertIndexedPlans('/propiedades/?type=apartment&sale=sale')
+        self.assertIndexedPlans('/propiedades/?city=Madrid')
+
+    def test_facets_use_covering_index(self):
+        plans = self.get_plans('/propiedades/?type=house')
+        facet_plans = [details for sql, details in plans if 'GROUP BY' in sql]
+        self.assertEqual(len(facet_plans), 1)
+        self.assertIn('USING COVERING INDEX prop_avail_facets_idx', facet_plans[0][0])
+
+    def test_sorted_pages(self):
+        for sort in PROPERTY_SORTS:
+            url = f'/propiedades/?sort={sort}'
+            self.assertIndexedPlans(url)
+            next_query = self.client.get(url).context['next_query']
+            self.assertIndexedPlans(f'/propiedades/?{next_query}')
+
+    def test_property_detail_similar(self):
+        self.assertIndexedPlans(f'/propiedad/{self.property.id}/')
+
+
+@override_settings(PROPERTIES_PER_PAGE=7)
+class KeysetPaginationTests(TestCase):
+    """Recorrido completo del catálogo por cursor en ambos sentidos"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.tenant = Tenant.objects.create(name='Páginas', subdomain='paginas')
+        seed_properties([cls.tenant], 40, seed=1)
+        # Empates en el campo de orden para ejercitar el desempate por id
+        Property.objects.filter(id__lte=Property.objects.order_by('id')[10].id).update(price=Decimal('5000'))
+
+    def setUp(self):
+        clear_caches()
+        self.client = Client(HTTP_HOST='paginas.example.com')
+
+    def walk(self, sort):
+        pages = []
+        query = f'sort={sort}'
+        while query:
+            response = self.client.get(f'/propiedades/?{query}')
+            pages.append((query, [p.id for p in response.context['properties']]))
+            query = response.context['next_query']
+        return pages
+
+    def test_walk_forward_and_back(self):
+        for sort, (ordering, _) in PROPERTY_SORTS.items():
+            field = ordering.lstrip('-')
+            expected = Property.objects.filter(tenant=self.tenant, is_available=True)
+            if field == 'area':
+                expected = expected.filter(area__isnull=False)
+            prefix = '-' if ordering.startswith('-') else ''
+            expected = list(expected.order_by(ordering, f'{prefix}id').values_list('id', flat=True))
+
+            pages = self.walk(sort)
+            self.assertEqual([pk for _, ids in pages for pk in ids], expected, sort)
+
+            # Volver desde la última página con los enlaces "anterior"
+            query, ids = pages[-1]
+            for previous_query, previous_ids in reversed(pages[:-1]):
+                response = self.client.get(f'/propiedades/?{query}')
+                query = response.context['previous_query']
+                response = self.client.get(f'/propiedades/?{query}')
+                self.assertEqual([p.id for p in response.context['properties']], previous_ids, sort)
+            self.assertIsNone(response.context['previous_query'])
+
+    def test_links_stable_when_properties_are_added(self):
+        first = self.client.get('/propiedades/')
+        second_ids = [p.id for p in self.client.get(f"/propiedades/?{first.context['next_query']}").context['properties']]
+        seed_properties([self.tenant], 5, seed=2)
+        again = [p.id for p in self.client.get(f"/propiedades/?{first.context['next_query']}").context['properties']]
+        self.assertEqual(second_ids, again)
+
+    def test_invalid_cursor_falls_back_to_first_page(self):
+        response = self.client.get('/propiedades/?after=basura')
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(response.context['previous_query'])
+
+
+class FacetTests(TestCase):
+    """Conteos del catálogo en una consulta, cacheados por tenant"""
+
+    def setUp(self):
+        clear_caches()
+        self.tenant = Tenant.objects.create(name='Facets', subdomain='facets')
+        self.client = Client(HTTP_HOST='facets.example.com')
+        for property_type, sale_type, city, price in [
+            ('house', 'sale', 'Madrid', 200000),
+            ('house', 'rent', 'Madrid', 900),
+            ('apartment', 'sale', 'Valencia', 150000),
+            ('apartment', 'sale', 'Madrid', 1200000),
+        ]:
+            Property.objects.create(
+                tenant=self.tenant, title='Propiedad', description='Descripción', property_type=property_type,
+                sale_type=sale_type, price=Decimal(price), address='Calle 1', city=city, state='Estado',
+                country='España',
+            )
+
+    def facets(self, **params):
+        return self.client.get('/propiedades/', params).context['facets']
+
+    def counts(self, facet):
+        return {key: total for key, _, total in facet}
+
+    def test_counts_exclude_own_filter(self):
+        facets = self.facets(type='house')
+        self.assertEqual(self.counts(facets['property_type'])['house'], 2)
+        self.assertEqual(self.counts(facets['property_type'])['apartment'], 2)
+        self.assertEqual(self.counts(facets['city']), {'Madrid': 2})
+        self.assertEqual(self.counts(facets['sale_type']), {'sale': 1, 'rent': 1, 'both': 0})
+        self.assertEqual(self.counts(facets['price'])['100000-250000'], 1)
+        self.assertEqual(self.counts(facets['price'])['0-1000'], 1)
+
+    def test_price_facet_excludes_price_filter(self):
+        facets = self.facets(min_price=100000, max_price=250000)
+        # Los demás facets sí se limitan al rango elegido
+        self.assertEqual(self.counts(facets['city']), {'Madrid': 1, 'Valencia': 1})
+        self.assertEqual(self.counts(facets['property_type'])['apartment'], 1)
+        # Los rangos de precio muestran lo que hay en cada uno
+        prices = self.counts(facets['price'])
+        self.assertEqual((prices['0-1000'], prices['100000-250000'], prices['1000000-']), (1, 2, 1))
+
+        facets = self.facets(min_price=100000, max_price=250000, city='Madrid')
+        self.assertEqual(self.counts(facets['price'])['1000000-'], 1)
+        types = self.counts(facets['property_type'])
+        self.assertEqual((types['house'], types['apartment']), (1, 0))
+
+    def test_cached_until_tenant_properties_change(self):
+        self.client.get('/propiedades/')
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get('/propiedades/', {'city': 'Valencia'})
+        self.assertFalse([q for q in ctx.captured_queries if 'GROUP BY' in q['sql']])
+
+        Property.objects.filter(city='Valencia').first().delete()
+        self.assertNotIn('Valencia', self.counts(self.facets()['city']))
+
+
+class PageCacheTests(TestCase):
+    """Caché de páginas completas por tenant"""
+
+    def setUp(self):
+        clear_caches()
+        self.tenant = Tenant.objects.create(name='Caché', subdomain='cache')
+        self.other = Tenant.objects.create(name='Otro', subdomain='otro')
+        create_default_homepage(self.tenant)
+        create_default_homepage(self.other)
+        self.client = Client(HTTP_HOST='cache.example.com')
+        self.other_client = Client(HTTP_HOST='otro.example.com')
+
+    def create_property(self, tenant, title):
+        return Property.objects.create(
+            tenant=tenant, title=title, description='Descripción', property_type='house', is_featured=True,
+            price=Decimal('1000'), address='Calle 1', city='Madrid', state='Madrid', country='España',
+        )
+
+    def test_second_hit_is_served_without_queries(self):
+        self.assertEqual(self.client.get('/')['X-Page-Cache'], 'MISS')
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get('/')
+        self.assertEqual(response['X-Page-Cache'], 'HIT')
+        self.assertEqual(len(ctx), 0)
+        self.assertEqual(self.client.get('/?utm=1')['X-Page-Cache'], 'MISS')
+
+    def test_edits_purge_only_the_affected_tenant(self):
+        self.client.get('/')
+        self.other_client.get('/')
+        self.create_property(self.tenant, 'Casa nueva')
+        response = self.client.get('/')
+        self.assertEqual(response['X-Page-Cache'], 'MISS')
+        self.assertContains(response, 'Casa nueva')
+        self.assertEqual(self.other_client.get('/')['X-Page-Cache'], 'HIT')
+
+        section = Page.objects.get(tenant=self.tenant, is_homepage=True).section_set.first()
+        section.title = 'Título editado'
+        section.save()
+        self.assertContains(self.client.get('/'), 'Título editado')
+
+    def test_authenticated_users_bypass_and_stats(self):
+        from django.contrib.auth.models import User
+        from .page_cache import page_cache_stats
+        User.objects.create_user('agente', password='clave')
+        self.client.get('/')
+        self.client.get('/')
+        self.client.login(username='agente', password='clave')
+        self.assertNotIn('X-Page-Cache', self.client.get('/'))
+        self.assertEqual(page_cache_stats(), {'hits': 1, 'misses': 1, 'bypass': 1})
+
+
+class ConditionalGetTests(TestCase):
+    """ETag / Last-Modified y respuestas 304 sin renderizar la plantilla"""
+
+    def setUp(self):
+        clear_caches()
+        self.tenant = Tenant.objects.create(name='Validadores', subdomain='etag')
+        self.homepage = create_default_homepage(self.tenant)
+        self.property = Property.objects.create(
+            tenant=self.tenant, title='Casa', description='Descripción', property_type='house',
+            price=Decimal('1000'), address='Calle 1', city='Madrid', state='Madrid', country='España',
+        )
+        self.client = Client(HTTP_HOST='etag.example.com')
+
+    def revalidate(self, url, response):
+        return self.client.get(
+            url,
+            HTTP_IF_NONE_MATCH=response['ETag'],
+            HTTP_IF_MODIFIED_SINCE=response['Last-Modified'],
+        )
+
+    def test_not_modified_without_rendering(self):
+        for url in ['/', '/inicio/', f'/propiedad/{self.property.id}/']:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            # Desde la caché de páginas
+            self.assertEqual(self.revalidate(url, response).status_code, 304)
+            # Sin caché de páginas: el validador se calcula antes de la vista
+            cache.clear()
+            revalidated = self.revalidate(url, response)
+            self.assertEqual(revalidated.status_code, 304, url)
+            self.assertEqual(revalidated.templates, [])
+
+    def test_section_and_property_edits_change_validators(self):
+        response = self.client.get('/')
+        section = self.homepage.section_set.first()
+        section.title = 'Nuevo título'
+        section.save()
+        self.assertEqual(self.revalidate('/', response).status_code, 200)
+
+        url = f'/propiedad/{self.property.id}/'
+        response = self.client.get(url)
+        PropertyImage.objects.create(property=self.property, image='properties/nueva.jpg')
+        self.assertEqual(self.revalidate(url, response).status_code, 200)
+
+    def test_property_detail_validator_ignores_unrelated_listings(self):
+        url = f'/propiedad/{self.property.id}/'
+        other = dict(description='D', price=Decimal('10'), address='Calle', city='Madrid', state='M', country='E')
+        response = self.client.get(url)
+        with CaptureQueriesContext(connection) as queries:
+            Property.objects.create(tenant=self.tenant, title='Local', property_type='commercial', **other)
+            self.assertEqual(self.revalidate(url, response).status_code, 304)
+        self.assertFalse([q for q in queries.captured_queries if 'COUNT(' in q['sql']])
+
+        # Una similar nueva entra en el corte que muestra la ficha
+        Property.objects.create(tenant=self.tenant, title='Chalet', property_type='house', **other)
+        self.assertEqual(self.revalidate(url, response).status_code, 200)
+
+
+class PropertySearchTests(TestCase):
+    """Búsqueda FTS5 del catálogo y del admin"""
+
+    def setUp(self):
+        clear_caches()
+        self.tenant = Tenant.objects.create(name='Buscar', subdomain='buscar')
+        self.other = Tenant.objects.create(name='Otro', subdomain='otro')
+        self.client = Client(HTTP_HOST='buscar.example.com')
+
+    def create_property(self, title, tenant=None, **kwargs):
+        data = dict(
+            tenant=tenant or self.tenant, title=title, description='Vivienda en venta', property_type='house',
+            price=Decimal('1000'), address='Calle Mayor 1', city='Madrid', state='Madrid', country='España',
+        )
+        data.update(kwargs)
+        return Property.objects.create(**data)
+
+    def search(self, text, **params):
+        response = self.client.get('/propiedades/', {'q': text, **params})
+        return [p.title for p in response.context['properties']]
+
+    def test_accent_insensitive_prefix_search(self):
+        self.create_property('Ático con jardín')
+        self.create_property('Piso céntrico')
+        self.assertEqual(self.search('atico jardin'), ['Ático con jardín'])
+        self.assertEqual(self.search('CENTR'), ['Piso céntrico'])
+        self.assertEqual(self.search('"; DROP TABLE'), [])
+
+    def test_results_are_scoped_to_tenant_and_ranked(self):
+        self.create_property('Casa en Sevilla', description='Sevilla centro')
+        self.create_property('Terraza', city='Sevilla')
+        self.create_property('Casa en Sevilla', tenant=self.other)
+        self.assertEqual(self.search('sevilla'), ['Casa en Sevilla', 'Terraza'])
+
+    def test_match_is_joined_once_and_scoped_to_tenant(self):
+        self.create_property('Casa en Sevilla', address='Calle Mayor')
+        self.create_property('Casa en Sevilla', address='Calle Mayor', tenant=self.other)
+        # El MATCH mismo filtra por tenant, aunque el queryset no lo haga
+        found = search_properties(Property.objects.all(), 'sevilla', self.other)
+        self.assertEqual([p.tenant_id for p in found], [self.other.pk])
+        sql = str(found.query)
+        self.assertEqual(sql.count('MATCH'), 1)
+        self.assertNotIn('SELECT bm25', sql)
+        # El id del tenant no se busca como texto
+        self.assertEqual(search_properties(Property.objects.all(), str(self.tenant.pk), self.tenant).count(), 0)
+
+    def test_index_follows_updates_and_deletes(self):
+        property_obj = self.create_property('Chalet')
+        property_obj.title = 'Dúplex'
+        property_obj.save()
+        self.assertEqual(self.search('chalet'), [])
+        self.assertEqual(self.search('duplex'), ['Dúplex'])
+        Property.objects.filter(pk=property_obj.pk).update(city='Bilbao')
+        self.assertEqual(self.search('bilbao'), ['Dúplex'])
+        property_obj.delete()
+        self.assertEqual(self.search('duplex'), [])
+
+    def test_admin_changelist_search(self):
+        from django.contrib.auth.models import User
+        User.objects.create_superuser('admin', 'admin@example.com', 'clave')
+        self.client.login(username='admin', password='clave')
+        self.create_property('Loft industrial')
+        self.create_property('Casa de campo')
+        response = self.client.get('/admin/main/property/', {'q': 'loft'})
+        self.assertContains(response, 'Loft industrial')
+        self.assertNotContains(response, 'Casa de campo')
+
+
+class MainImageTests(TestCase):
+    """La imagen principal desnormalizada y el costo constante de las tarjetas"""
+
+    def setUp(self):
+        clear_caches()
+        self.tenant = Tenant.objects.create(name='Imágenes', subdomain='img')
+        self.client = Client(HTTP_HOST='img.example.com')
+
+    def create_property(self, images=2):
+        property_obj = Property.objects.create(
+            tenant=self.tenant, title='Casa', description='Casa', property_type='house',
+            price=Decimal('1000'), address='Calle 1', city='Madrid', state='Madrid', country='España',
+        )
+        for order in range(images):
+            PropertyImage.objects.create(property=property_obj, image=f'properties/{order}.jpg', order=order)
+        return property_obj
+
+    def test_main_image_follows_is_main_then_order(self):
+        property_obj = self.create_property(images=0)
+        second = PropertyImage.objects.create(property=property_obj, image='properties/b.jpg', order=2)
+        first = PropertyImage.objects.create(property=property_obj, image='properties/a.jpg', order=1)
+        property_obj.refresh_from_db()
+        self.assertEqual(property_obj.main_image, first)
+
+        second.is_main = True
+        second.save()
+        property_obj.refresh_from_db()
+        self.assertEqual(property_obj.main_image, second)
+
+        second.delete()
+        property_obj.refresh_from_db()
+        self.assertEqual(property_obj.main_image, first)
+
+        first.delete()
+        property_obj.refresh_from_db()
+        self.assertIsNone(property_obj.main_image)
+
+    def test_card_rendering_cost_is_constant(self):
+        self.create_property()
+        self.client.get('/propiedades/')  # calienta la caché de tenants
+        with CaptureQueriesContext(connection) as few:
+            self.client.get('/propiedades/')
+        for _ in range(10):
+            self.create_property()
+        self.client.get('/propiedades/')  # recalcula los facets invalidados
+        with CaptureQueriesContext(connection) as many:
+            response = self.client.get('/propiedades/')
+        self.assertContains(response, 'properties/0.jpg')
+        self.assertEqual(len(few), len(many))
+
+
+class ContactSubmissionWriterTests(TransactionTestCase):
+    def setUp(self):
+        clear_caches()
+        self.tenant = Tenant.objects.create(name='Uno', subdomain='uno')
+        self.other = Tenant.objects.create(name='Dos', subdomain='dos')
+        self.property = Property.objects.create(
+            tenant=self.tenant, title='Casa', description='Casa', property_type='casa',
+            sale_type='venta', price=Decimal('1000'), address='Calle 1', city='Santiago'
+        )
+        self.foreign = Property.objects.create(
+            tenant=self.other, title='Casa', description='Casa', property_type='casa',
+            sale_type='venta', price=Decimal('1000'), address='Calle 1', city='Santiago'
+        )
+        self.client = Client(HTTP_HOST='uno.example.com')
+
+    def post(self, **data):
+        payload = {'name': 'Ana', 'email': 'ana@example.com', 'message': 'Hola', **data}
+        return self.client.post('/contacto/', json.dumps(payload), content_type='application/json').json()
+
+    def test_submissions_are_written_in_batches(self):
+        with CaptureQueriesContext(connection) as queries:
+            for _ in range(5):
+                self.assertTrue(self.post(property_id=self.property.pk)['success'])
+        # La request sólo lee la propiedad; no escribe
+        self.assertFalse([q for q in queries.captured_queries if q['sql'].startswith('INSERT')])
+
+        submission_writer.flush()
+        contacts = ContactSubmission.objects.filter(tenant=self.tenant)
+        self.assertEqual(contacts.count(), 5)
+        self.assertEqual(set(contacts.values_list('property_interest', flat=True)), {self.property.pk})
+
+    def test_validation_and_foreign_property(self):
+        response = self.post(email='no-es-un-email')
+        self.assertFalse(response['success'])
+        self.assertIn('email', response['error'])
+
+        self.assertTrue(self.post(property_id=self.foreign.pk)['success'])
+        submission_writer.flush()
+        self.assertIsNone(ContactSubmission.objects.get().property_interest_id)
+
+    def test_close_flushes_pending(self):
+        writer = SubmissionWriter(batch_size=100, interval=60)
+        for i in range(3):
+            writer.submit(ContactSubmission(tenant=self.tenant, name=f'n{i}', email='a@b.cl', message='m'))
+        writer.close()
+        self.assertEqual(ContactSubmission.objects.count(), 3)
+
+    def test_unexpected_error_does_not_stop_the_writer(self):
+        writer = SubmissionWriter(batch_size=100, interval=0.01)
+        write = writer.write
+        calls = []
+
+        def failing_once(submissions):
+            calls.append(len(submissions))
+            if len(calls) == 1:
+                raise RuntimeError('inesperado')
+            write(submissions)
+
+        with mock.patch.object(writer, 'write', failing_once), \
+                self.assertLogs('cms_project.main.submissions', 'ERROR'):
+            writer.submit(ContactSubmission(tenant=self.tenant, name='perdido', email='a@b.cl', message='m'))
+            writer.flush()
+            writer.submit(ContactSubmission(tenant=self.tenant, name='escrito', email='a@b.cl', message='m'))
+            writer.flush()
+        self.assertTrue(writer.thread.is_alive())
+        writer.close()
+        self.assertEqual(list(ContactSubmission.objects.values_list('name', flat=True)), ['escrito'])
+
+    def test_row_fallback_requeues_moving_tenant(self):
+        writer = SubmissionWriter(batch_size=100, interval=0.01, retries=1)
+        save = ContactSubmission.save
+        attempts = []
+
+        def moving_once(instance, *args, **kwargs):
+            attempts.append(instance.name)
+            if len(attempts) == 1:
+                raise TenantMovingError('moviendo')
+            return save(instance, *args, **kwargs)
+
+        with mock.patch.object(ContactSubmission.objects, 'bulk_create', side_effect=OperationalError('bloqueada')), \
+                mock.patch.object(ContactSubmission, 'save', moving_once):
+            writer.submit(ContactSubmission(tenant=self.tenant, name='n', email='a@b.cl', message='m'))
+            writer.flush()
+        writer.close()
+        self.assertEqual(attempts, ['n', 'n'])
+        self.assertEqual(ContactSubmission.objects.count(), 1)
+
+    def test_moving_tenant_waits_without_blocking_others(self):
+        writer = SubmissionWriter(batch_size=100, interval=0.05, move_timeout=60)
+        bulk_create = ContactSubmission.objects.bulk_create
+        moving = threading.Event()
+        moving.set()
+
+        def blocked_for_one_tenant(submissions, *args, **kwargs):
+            if moving.is_set() and submissions[0].tenant_id == self.tenant.pk:
+                raise TenantMovingError('moviendo')
+            return bulk_create(submissions, *args, **kwargs)
+
+        with mock.patch.object(ContactSubmission.objects, 'bulk_create', blocked_for_one_tenant):
+            writer.submit(ContactSubmission(tenant=self.tenant, name='espera', email='a@b.cl', message='m'))
+            time.sleep(0.1)
+            writer.submit(ContactSubmission(tenant=self.other, name='pasa', email='a@b.cl', message='m'))
+            for _ in range(100):
+                if ContactSubmission.objects.filter(name='pasa').exists():
+                    break
+                time.sleep(0.01)
+            self.assertTrue(ContactSubmission.objects.filter(name='pasa').exists())
+            self.assertFalse(ContactSubmission.objects.filter(name='espera').exists())
+            moving.clear()
+            writer.flush()
+        writer.close()
+        self.assertEqual(ContactSubmission.objects.count(), 2)
+
+    def test_failed_rows_go_to_dead_letters(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        path = os.path.join(directory, 'contactos.jsonl')
+        writer = SubmissionWriter(batch_size=100, interval=0.01, retries=1, move_timeout=0.05,
+                                  dead_letter_path=path)
+        save = ContactSubmission.save
+
+        def failing(instance, *args, **kwargs):
+            if instance.name == 'moviendo':
+                raise TenantMovingError('moviendo')
+            if instance.name == 'falla':
+                raise OperationalError('disco lleno')
+            return save(instance, *args, **kwargs)
+
+        with mock.patch.object(ContactSubmission.objects, 'bulk_create', side_effect=OperationalError('bloqueada')), \
+                mock.patch.object(ContactSubmission, 'save', failing), \
+                self.assertLogs('cms_project.main.submissions', 'ERROR'):
+            for name in ('falla', 'moviendo', 'bien'):
+                writer.submit(ContactSubmission(tenant=self.tenant, name=name, email='a@b.cl', message='m',
+                                                property_interest=self.property))
+            writer.flush()
+        writer.close()
+        self.assertEqual(list(ContactSubmission.objects.values_list('name', flat=True)), ['bien'])
+        with open(path, encoding='utf-8') as handle:
+            entries = [json.loads(line) for line in handle]
+        self.assertEqual([entry['fields']['name'] for entry in entries], ['falla', 'moviendo'])
+        self.assertEqual(entries[0]['error'], 'disco lleno')
+
+        out = io.StringIO()
+        with override_settings(CONTACT_DEAD_LETTER_PATH=path):
+            call_command('retry_contacts', stdout=out)
+        self.assertIn('2 contactos guardados, 0 pendientes', out.getvalue())
+        self.assertEqual(ContactSubmission.objects.filter(property_interest=self.property).count(), 3)
+        with open(path, encoding='utf-8') as handle:
+            self.assertEqual(handle.read(), '')
+
+
+class ContactRateLimitTests(TestCase):
+    def setUp(self):
+        clear_caches()
+        self.tenant = Tenant.objects.create(
+            name='Uno', subdomain='uno', contact_rate_per_minute=1, contact_rate_burst=2
+        )
+        Tenant.objects.create(name='Dos', subdomain='dos', contact_rate_per_minute=1, contact_rate_burst=2)
+        # La escritura en segundo plano se prueba en ContactSubmissionWriterTests
+        patcher = mock.patch.object(submission_writer, 'submit')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def post(self, host='uno.example.com', ip='10.0.0.1'):
+        return Client(HTTP_HOST=host, REMOTE_ADDR=ip).post(
+            '/contacto/', json.dumps({'name': 'Ana', 'email': 'ana@example.com', 'message': 'Hola'}),
+            content_type='application/json'
+        )
+
+    def test_rejects_after_burst_without_queries(self):
+        self.assertEqual(self.post().status_code, 200)
+        self.assertEqual(self.post().status_code, 200)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.post()
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '60')
+        self.assertEqual(len(queries), 0)
+
+        # Otra IP y otro tenant tienen su propio bucket
+        self.assertEqual(self.post(ip='10.0.0.2').status_code, 200)
+        self.assertEqual(self.post(host='dos.example.com').status_code, 200)
+
+    def test_tokens_refill_over_time(self):
+        key = 'ratelimit:test'
+        self.assertEqual(take_token(key, 60, 1, now=100), 0)
+        self.assertAlmostEqual(take_token(key, 60, 1, now=100.5), 0.5)
+        self.assertEqual(take_token(key, 60, 1, now=101), 0)
+
+    def test_parallel_requests_share_the_bucket(self):
+        barrier = threading.Barrier(20)
+
+        def take():
+            barrier.wait()
+            return take_token('ratelimit:parallel', 1, 5)
+
+        with ThreadPoolExecutor(max_workers=20) as pool:
+            results = list(pool.map(lambda _: take(), range(20)))
+        self.assertEqual(results.count(0), 5)
+
+    def test_get_does_not_spend_tokens(self):
+        client = Client(HTTP_HOST='uno.example.com', REMOTE_ADDR='10.0.0.1')
+        for _ in range(3):
+            self.assertEqual(client.get('/contacto/').status_code, 405)
+        self.assertEqual(self.post().status_code, 200)
+
+
+@override_settings(ADMIN_ESTIMATED_COUNT_THRESHOLD=100)
+class AdminChangelistTests(TestCase):
+    def setUp(self):
+        clear_caches()
+        self.tenant = Tenant.objects.create(name='Uno', subdomain='uno')
+        seed_properties([self.tenant], 50)
+        properties = list(Property.objects.all())
+        ContactSubmission.objects.bulk_create([
+            ContactSubmission(
+                tenant=self.tenant, name=f'Contacto {i}', email='a@example.com', message='Hola',
+                property_interest=properties[i % len(properties)]
+            ) for i in range(300)
+        ])
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        self.client = Client(HTTP_HOST='uno.example.com')
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'clave'))
+
+    def test_contact_changelist_is_cheap(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/admin/main/contactsubmission/')
+        self.assertEqual(response.status_code, 200)
+        sqls = [q['sql'] for q in queries.captured_queries]
+        # Sin COUNT(*) sobre toda la tabla ni una consulta por fila o por opción de filtro
+        self.assertFalse([sql for sql in sqls if 'COUNT(*)' in sql and 'main_contactsubmission' in sql])
+        self.assertFalse([sql for sql in sqls if 'FROM "main_property"' in sql])
+        self.assertLess(len(sqls), 15)
+        self.assertContains(response, 'Contacto 299')
+
+    def test_filtered_changelist_caps_the_count(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/admin/main/contactsubmission/', {'tenant__id__exact': self.tenant.pk})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['cl'].result_count, 100)
+        counts = [q['sql'] for q in queries.captured_queries if 'COUNT(*)' in q['sql']]
+        self.assertTrue(counts)
+        self.assertTrue(all('LIMIT 100' in sql for sql in counts))
+
+        # Por debajo del umbral el conteo es exacto
+        ContactSubmission.objects.filter(pk__in=ContactSubmission.objects.values('pk')[:250]).update(is_read=True)
+        response = self.client.get('/admin/main/contactsubmission/', {'is_read__exact': '0'})
+        self.assertEqual(response.context['cl'].result_count, 50)
+
+
+class AdminActionTests(TestCase):
+    def setUp(self):
+        clear_caches()
+        self.tenant = Tenant.objects.create(name='Uno', subdomain='uno')
+        seed_properties([self.tenant], 30)
+        ContactSubmission.objects.bulk_create([
+            ContactSubmission(tenant=self.tenant, name=f'Contacto {i}', email='a@example.com', message='Hola, "qué tal"')
+            for i in range(25)
+        ])
+        self.client = Client(HTTP_HOST='uno.example.com')
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'clave'))
+
+    def run_action(self, url, action):
+        return self.client.post(url, {'action': action, 'select_across': '1', 'index': '0', '_selected_action': ['0']})
+
+    def test_streaming_exports(self):
+        response = self.run_action('/admin/main/contactsubmission/', 'export_csv')
+        self.assertTrue(response.streaming)
+        rows = list(csv.reader(io.StringIO(b''.join(response.streaming_content).decode())))
+        self.assertEqual(rows[0][:3], ['id', 'tenant__subdomain', 'name'])
+        self.assertEqual(len(rows), 26)
+        self.assertEqual(rows[1][6], 'Hola, "qué tal"')
+
+        response = self.run_action('/admin/main/property/', 'export_jsonl')
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 30)
+        self.assertEqual(json.loads(lines[0])['tenant__subdomain'], 'uno')
+
+    def test_bulk_flags_invalidate_once(self):
+        ids = list(Property.objects.values_list('pk', flat=True)[:10])
+        with mock.patch('cms_project.main.admin.invalidate_pages') as invalidate, \
+                CaptureQueriesContext(connection) as queries:
+            self.client.post('/admin/main/property/', {'action': 'mark_featured', '_selected_action': ids})
+        invalidate.assert_called_once_with(self.tenant.pk)
+        self.assertEqual(len([q for q in queries.captured_queries if q['sql'].startswith('UPDATE "main_property"')]), 1)
+        self.assertEqual(Property.objects.filter(is_featured=True, pk__in=ids).count(), 10)
+
+        self.run_action('/admin/main/contactsubmission/', 'mark_read')
+        self.assertFalse(ContactSubmission.objects.filter(is_read=False).exists())
+
+
+class PropertyImportTests(TestCase):
+    CSV = (
+        'external_ref,title,description,property_type,sale_type,price,address,city,state,country,is_featured,images\n'
+        'A-1,Casa uno,Desc,house,sale,1000,Calle 1,Madrid,Madrid,España,sí,uno.jpg;dos.jpg\n'
+        'A-2,Depto,Desc,apartment,rent,abc,Calle 2,Madrid,Madrid,España,,\n'
+        ',Sin ref,Desc,house,sale,10,Calle 3,Madrid,Madrid,España,,\n'
+        'A-3,Terreno,Desc,land,sale,500,Calle 4,Sevilla,Sevilla,España,no,falta.jpg\n'
+    )
+
+    def setUp(self):
+        clear_caches()
+        self.tenant = Tenant.objects.create(name='Uno', subdomain='uno')
+        self.media_root = tempfile.mkdtemp()
+        self.images_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        self.addCleanup(shutil.rmtree, self.images_dir, ignore_errors=True)
+        for name in ('uno.jpg', 'dos.jpg'):
+            with open(os.path.join(self.images_dir, name), 'wb') as handle:
+                handle.write(b'\xff\xd8\xff' + name.encode())
+
+    def test_import_command_creates_updates_and_reports(self):
+        feed = os.path.join(self.images_dir, 'feed.csv')
+        errors = os.path.join(self.images_dir, 'errores.csv')
+        with open(feed, 'w', encoding='utf-8') as handle:
+            handle.write(self.CSV)
+        with override_settings(MEDIA_ROOT=self.media_root):
+            call_command('import_properties', 'uno', feed, images_dir=self.images_dir, errors=errors,
+                         batch_size=2, stdout=io.StringIO())
+
+        self.assertEqual(set(Property.objects.values_list('external_ref', flat=True)), {'A-1', 'A-3'})
+        casa = Property.objects.get(external_ref='A-1')
+        self.assertTrue(casa.is_featured)
+        self.assertEqual(casa.propertyimage_set.count(), 2)
+        self.assertIsNotNone(casa.main_image_id)
+        with open(errors, encoding='utf-8') as handle:
+            report = list(csv.DictReader(handle))
+        self.assertEqual([row['line'] for row in report], ['3', '4', '5'])
+        self.assertIn('price', report[0]['error'])
+
+        # Segunda pasada por JSONL: actualiza por external_ref sin duplicar
+        rows = [{'external_ref': 'A-3', 'title': 'Terreno grande', 'description': 'D', 'property_type': 'land',
+                 'price': 900, 'address': 'Calle 4', 'city': 'Sevilla', 'state': 'S', 'country': 'E'}]
+        report = PropertyImporter(self.tenant).run(
+            read_rows(io.StringIO('\n'.join(json.dumps(row) for row in rows)), 'jsonl')
+        )
+        self.assertEqual((report.created, report.updated, report.errors), (0, 1, []))
+        self.assertEqual(Property.objects.get(external_ref='A-3').title, 'Terreno grande')
+        self.assertEqual(Property.objects.count(), 2)
+
+    def test_image_paths_outside_images_dir_are_rejected(self):
+        secret = os.path.join(self.media_root, 'secreto.txt')
+        with open(secret, 'w') as handle:
+            handle.write('clave')
+        rows = [
+            {'external_ref': 'B-1', 'images': 'uno.jpg;../' + os.path.relpath(secret, os.path.dirname(self.images_dir))},
+            {'external_ref': 'B-2', 'images': secret},
+            {'external_ref': 'B-3', 'images': 'dos.jpg'},
+        ]
+        common = {'title': 'Casa', 'description': 'D', 'property_type': 'house', 'price': 10,
+                  'address': 'Calle', 'city': 'Madrid', 'state': 'M', 'country': 'E'}
+        with override_settings(MEDIA_ROOT=self.media_root):
+            report = PropertyImporter(self.tenant, images_dir=self.images_dir).run(
+                (line, {**common, **row}) for line, row in enumerate(rows, start=1)
+            )
+        self.assertEqual([error['external_ref'] for error in report.errors], ['B-1', 'B-2'])
+        self.assertIn('fuera del directorio', report.errors[0]['error'])
+        self.assertEqual(list(Property.objects.values_list('external_ref', flat=True)), ['B-3'])
+        self.assertEqual(report.images, 1)
+        self.assertFalse(PropertyImage.objects.filter(image__contains='secreto').exists())
+
+    def test_images_without_images_dir_are_reported(self):
+        common = {'title': 'Casa', 'description': 'D', 'property_type': 'house', 'price': 10,
+                  'address': 'Calle', 'city': 'Madrid', 'state': 'M', 'country': 'E'}
+        rows = [{'external_ref': 'C-1', 'images': 'uno.jpg'}, {'external_ref': 'C-2'}]
+        report = PropertyImporter(self.tenant).run(
+            (line, {**common, **row}) for line, row in enumerate(rows, start=1)
+        )
+        self.assertEqual([(error['line'], error['external_ref']) for error in report.errors], [(1, 'C-1')])
+        self.assertIn('directorio de imágenes', report.errors[0]['error'])
+        self.assertEqual(list(Property.objects.values_list('external_ref', flat=True)), ['C-2'])
+
+    def test_imported_images_get_renditions(self):
+        common = {'title': 'Casa', 'description': 'D', 'property_type': 'house', 'price': 10,
+                  'address': 'Calle', 'city': 'Madrid', 'state': 'M', 'country': 'E'}
+        with override_settings(MEDIA_ROOT=self.media_root), \
+                mock.patch('cms_project.main.importer.schedule_renditions') as schedule:
+            report = PropertyImporter(self.tenant, images_dir=self.images_dir).run(
+                [(1, {**common, 'external_ref': 'D-1', 'images': 'uno.jpg;dos.jpg'})]
+            )
+        self.assertEqual(report.images, 2)
+        scheduled = [call.args[0] for call in schedule.call_args_list]
+        self.assertEqual({image.pk for image in scheduled}, set(PropertyImage.objects.values_list('pk', flat=True)))
+        self.assertTrue(all(call.args[1:] == ('image', 'renditions') for call in schedule.call_args_list))
+
+    def test_admin_upload_view(self):
+        client = Client(HTTP_HOST='uno.example.com')
+        client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'clave'))
+        self.assertEqual(client.get('/admin/main/property/import/').status_code, 200)
+        valid = '\n'.join(self.CSV.splitlines()[:2]).replace('uno.jpg;dos.jpg', '')
+        response = client.post('/admin/main/property/import/', {
+            'file': SimpleUploadedFile('feed.csv', valid.encode()), 'file_format': 'csv', 'tenant': self.tenant.pk,
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(Property.objects.filter(tenant=self.tenant, external_ref='A-1').exists())
+
+
+class SeedDataTests(TestCase):
+    def setUp(self):
+        clear_caches()
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+
+    def seed(self, **options):
+        with override_settings(MEDIA_ROOT=self.media_root):
+            call_command('seed_data', batch_size=4, stdout=io.StringIO(), **options)
+
+    def snapshot(self):
+        return list(Property.objects.order_by('tenant__subdomain', 'external_ref').values_list(
+            'tenant__subdomain', 'title', 'price', 'city', 'is_available', 'is_featured'
+        ))
+
+    def test_seed_is_bulk_and_reproducible(self):
+        self.seed(tenants=4, properties=10, images=2, contacts=5, pages=1, seed=7)
+        self.assertEqual(Tenant.objects.count(), 4)
+        self.assertEqual(Property.objects.count(), 40)
+        self.assertEqual(PropertyImage.objects.count(), 80)
+        self.assertEqual(ContactSubmission.objects.count(), 20)
+        self.assertEqual(Page.objects.filter(tenant__subdomain='tenant0004').count(), 3)
+        self.assertFalse(Property.objects.filter(main_image__isnull=True).exists())
+        self.assertTrue(User.objects.get(username='owner_valle').check_password('password123'))
+
+        # Re-ejecutar no duplica los tenants existentes
+        self.seed(tenants=4, properties=10, seed=7)
+        self.assertEqual(Property.objects.count(), 40)
+
+        # Misma semilla, mismo contenido (salvo las fechas, relativas al momento de la carga)
+        first = self.snapshot()
+        Tenant.objects.all().delete()
+        self.seed(tenants=4, properties=10, images=2, contacts=5, pages=1, seed=7)
+        self.assertEqual(self.snapshot(), first)
+
+
+class BenchmarkTests(TestCase):
+    def test_percentiles_and_regressions(self):
+        self.assertEqual(percentile(list(range(1, 101)), 95), 95)
+        self.assertEqual(percentile([7], 99), 7)
+        metrics = summarize([0.01, 0.02, 0.03], [2, 2, 3], [0.001, 0.001, 0.001], 0)
+        self.assertEqual((metrics['p50_ms'], metrics['max_queries'], metrics['sql_ms']), (20.0, 3, 1.0))
+
+        baseline = {'home': {'p50_ms': 10, 'p95_ms': 10, 'queries': 5, 'errors': 0}}
+        faster = {'home': {'p50_ms': 9, 'p95_ms': 12, 'queries': 5, 'errors': 0}}
+        slower = {'home': {'p50_ms': 9, 'p95_ms': 13, 'queries': 6, 'errors': 1}}
+        self.assertEqual(compare(faster, baseline, tolerance=0.25), [])
+        self.assertEqual(len(compare(slower, baseline, tolerance=0.25)), 3)
+
+    @mock.patch.object(submission_writer, 'submit')
+    def test_runs_every_scenario(self, submit):
+        clear_caches()
+        tenant = Tenant.objects.create(name='Bench', subdomain='bench')
+        create_default_homepage(tenant)
+        Page.objects.create(tenant=tenant, title='Nosotros', slug='nosotros', page_type='about')
+        seed_properties([tenant], 30)
+        results = run_benchmark(requests=3, warmup=1)
+        self.assertEqual(set(results), set(BENCHMARK_SCENARIOS))
+        for name, metrics in results.items():
+            self.assertEqual(metrics['errors'], 0, name)
+            self.assertEqual(metrics['requests'], 3)
+            self.assertGreater(metrics['queries'], 0, name)
+        self.assertEqual(submit.call_count, 4)
+
+
+class RequestMetricsTests(TestCase):
+    def setUp(self):
+        clear_caches()
+        metrics_registry.reset()
+        self.tenant = Tenant.objects.create(name='Uno', subdomain='uno')
+        self.other = Tenant.objects.create(name='Dos', subdomain='dos')
+        create_default_homepage(self.tenant)
+        seed_properties([self.tenant], 10)
+
+    def test_server_timing_and_histograms(self):
+        prop = Property.objects.filter(is_available=True).first()
+        response = Client(HTTP_HOST='uno.example.com').get(f'/propiedad/{prop.pk}/')
+        timing = response['Server-Timing']
+        self.assertRegex(timing, r'db;dur=[\d.]+;desc="\d+ consultas", tpl;dur=[\d.]+;desc="plantillas", total;dur=[\d.]+')
+
+        Client(HTTP_HOST='dos.example.com').get('/no-existe/')
+        views = {row['name']: row for row in metrics_registry.summary('view')}
+        detail = views['main:property_detail']
+        self.assertEqual(detail['count'], 1)
+        self.assertGreater(detail['queries'], 0)
+        self.assertGreater(detail['template_ms'], 0)
+        self.assertEqual({row['name'] for row in metrics_registry.summary('tenant')}, {'uno', 'dos'})
+        self.assertEqual([row['name'] for row in metrics_registry.summary('both', tenant='dos')], ['dos · main:page_detail'])
+
+    def test_histogram_percentiles(self):
+        histogram = Histogram()
+        for total in [0.001] * 90 + [0.2] * 10:
+            metrics = RequestMetrics()
+            metrics.total = total
+            histogram.add(metrics)
+        self.assertEqual(histogram.percentile(50), 5)
+        self.assertEqual(histogram.percentile(95), 200)
+        self.assertEqual(histogram.as_dict()['count'], 100)
+
+    def test_staff_page_is_scoped_to_tenant(self):
+        Client(HTTP_HOST='uno.example.com').get('/')
+        Client(HTTP_HOST='dos.example.com').get('/')
+
+        owner = User.objects.create_user('owner', password='clave', is_staff=True)
+        TenantUser.objects.create(user=owner, tenant=self.tenant)
+        client = Client(HTTP_HOST='uno.example.com')
+        client.force_login(owner)
+        data = client.get('/admin/request_metrics/', {'format': 'json'}).json()
+        self.assertEqual(data['tenants'], [])
+        self.assertTrue(all(row['name'].startswith('uno ·') for row in data['pairs']))
+
+        client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'clave'))
+        self.assertContains(client.get('/admin/request_metrics/', {'order': 'p95_ms'}), 'main:home')
+        data = client.get('/admin/request_metrics/', {'format': 'json'}).json()
+        self.assertEqual({row['name'] for row in data['tenants']}, {'uno', 'dos'})
+        client.post('/admin/request_metrics/')
+        self.assertEqual(metrics_registry.summary('view', tenant='dos'), [])
+
+
+class ProfilingTests(TestCase):
+    def setUp(self):
+        clear_caches()
+        self.tenant = Tenant.objects.create(name='Uno', subdomain='uno')
+        create_default_homepage(self.tenant)
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+
+    def profiles(self):
+        return sorted(os.listdir(self.directory))
+
+    def test_sampler_collapses_stacks(self):
+        def busy():
+            deadline = time.perf_counter() + 0.05
+            while time.perf_counter() < deadline:
+                pass
+
+        sampler = StackSampler(interval=0.001)
+        sampler.start()
+        busy()
+        sampler.stop()
+        self.assertGreater(sampler.samples, 5)
+        self.assertTrue(any(stack.endswith('ProfilingTests.test_sampler_collapses_stacks.<locals>.busy')
+                            for stack in sampler.stacks))
+        self.assertEqual(sampler.breakdown()['python'], 1.0)
+        self.assertEqual(classify(['app:view', 'django.template.base:Template.render', 'django.db.models.query:QuerySet.__iter__']), 'orm')
+
+    def test_header_requires_tenant_staff(self):
+        with override_settings(PROFILING_DIR=self.directory):
+            client = Client(HTTP_HOST='uno.example.com')
+            response = client.get('/', HTTP_X_PROFILE='1')
+            self.assertNotIn('X-Profile-Id', response)
+            self.assertEqual(self.profiles(), [])
+
+            staff = User.objects.create_user('staff', password='clave', is_staff=True)
+            client.force_login(staff)
+            self.assertNotIn('X-Profile-Id', client.get('/', HTTP_X_PROFILE='1'))
+            TenantUser.objects.create(user=staff, tenant=self.tenant)
+            response = client.get('/', HTTP_X_PROFILE='1')
+
+        name = response['X-Profile-Id']
+        self.assertEqual(self.profiles(), [f'{name}.collapsed', f'{name}.json'])
+        with open(os.path.join(self.directory, f'{name}.json'), encoding='utf-8') as handle:
+            meta = json.load(handle)
+        self.assertEqual((meta['tenant'], meta['view'], meta['trigger']), ('uno', 'main:home', 'header'))
+        self.assertEqual(set(meta['breakdown']), {'orm', 'templates', 'python'})
+        with open(os.path.join(self.directory, f'{name}.collapsed'), encoding='utf-8') as handle:
+            for line in handle:
+                self.assertRegex(line, r'^cms_project\.main\.profiling:ProfilingMiddleware\.__call__;\S+ \d+$')
+
+    def test_sample_rate_and_retention(self):
+        with override_settings(PROFILING_DIR=self.directory, PROFILING_SAMPLE_RATE=1.0, PROFILING_MAX_FILES=2):
+            client = Client(HTTP_HOST='uno.example.com')
+            for _ in range(3):
+                self.assertNotIn('X-Profile-Id', client.get('/'))
+        self.assertEqual(len(self.profiles()), 4)
+
+
+class SQLiteProfileTests(TestCase):
+    def test_pragmas_applied(self):
+        pragmas = connection_pragmas(connection)
+        # La base de pruebas está en memoria: ahí journal_mode queda en 'memory'
+        self.assertEqual(pragmas['synchronous'], 1)
+        self.assertEqual(pragmas['cache_size'], -65536)
+        self.assertEqual(pragmas['temp_store'], 2)
+        self.assertEqual(sum(isinstance(wrapper, LockedRetry) for wrapper in connection.execute_wrappers), 1)
+
+    def locked_execute(self, failures):
+        calls = []
+
+        def execute(sql, params, many, context):
+            calls.append(sql)
+            if len(calls) <= failures:
+                raise OperationalError('database is locked')
+            return 'ok'
+        return execute, calls
+
+    def test_locked_retry_only_in_autocommit(self):
+        wrapper = LockedRetry(retries=2)
+        context = {'connection': mock.Mock(in_atomic_block=False)}
+        with mock.patch('cms_project.main.sqlite.time.sleep'):
+            execute, calls = self.locked_execute(2)
+            self.assertEqual(wrapper(execute, 'UPDATE', (), False, context), 'ok')
+            self.assertEqual(len(calls), 3)
+
+            execute, calls = self.locked_execute(3)
+            with self.assertRaises(OperationalError):
+                wrapper(execute, 'UPDATE', (), False, context)
+            self.assertEqual(len(calls), 3)
+
+            # Dentro de una transacción el reintento es de la transacción completa
+            context['connection'].in_atomic_block = True
+            execute, calls = self.locked_execute(1)
+            with self.assertRaises(OperationalError):
+                wrapper(execute, 'UPDATE', (), False, context)
+            self.assertEqual(len(calls), 1)
+
+    def test_retry_on_locked(self):
+        attempts = []
+
+        def write():
+            attempts.append(1)
+            if len(attempts) < 3:
+                raise OperationalError('database is locked')
+            return 'escrito'
+
+        with mock.patch('cms_project.main.sqlite.time.sleep'):
+            self.assertEqual(retry_on_locked(write), 'escrito')
+            self.assertEqual(len(attempts), 3)
+            with self.assertRaises(OperationalError):
+                retry_on_locked(mock.Mock(side_effect=OperationalError('no such table: x')))
+
+    def test_immediate_only_on_write_paths(self):
+        self.assertIsNone(connection.transaction_mode)
+        with write_atomic():
+            self.assertEqual(connection.transaction_mode, 'IMMEDIATE')
+        self.assertIsNone(connection.transaction_mode)
+
+        modes = []
+        middleware = WriteTransactionsMiddleware(lambda request: modes.append(connection.transaction_mode))
+        factory = RequestFactory()
+        middleware(factory.get('/'))
+        middleware(factory.post('/contacto/'))
+        self.assertEqual(modes, [None, 'IMMEDIATE'])
+        self.assertIsNone(connection.transaction_mode)
+
+
+@override_settings(DATABASE_REPLICAS=['default'])
+class ReplicaRoutingTests(TestCase):
+    """
+    La réplica configurada es la misma base de pruebas: lo que se verifica
+    es la decisión del router (alias de réplica o None para la primaria)
+    """
+
+    def setUp(self):
+        clear_caches()
+        self.tenant = Tenant.objects.create(name='Uno', subdomain='uno')
+        create_default_homepage(self.tenant)
+        seed_properties([self.tenant], 5)
+        # La siembra invalida las cachés: se parte como si la réplica ya la tuviera
+        clear_caches()
+        self.client = Client(HTTP_HOST='uno.example.com')
+
+    def reads(self, method, path, **kwargs):
+        decisions = []
+        original = ReplicaRouter.db_for_read
+
+        def spy(router, model, **hints):
+            alias = original(router, model, **hints)
+            decisions.append(alias)
+            return alias
+
+        with mock.patch.object(ReplicaRouter, 'db_for_read', spy):
+            response = getattr(self.client, method)(path, **kwargs)
+        return response, set(decisions)
+
+    def test_anonymous_public_reads_use_replica(self):
+        response, decisions = self.reads('get', '/propiedades/')
+        self.assertEqual(response.status_code, 200)
+        # Antes de la vista (resolución del tenant) se lee de la primaria
+        self.assertIn('default', decisions)
+        self.assertNotIn('db_pin', response.cookies)
+
+    def test_post_pins_visitor_to_primary(self):
+        with mock.patch('cms_project.main.views.submission_writer'):
+            response, decisions = self.reads('post', '/contacto/', data={
+                'name': 'Ana', 'email': 'ana@example.com', 'message': 'Hola'})
+        self.assertNotIn('default', decisions)
+        self.assertIn('db_pin', response.cookies)
+
+        response, decisions = self.reads('get', '/propiedades/')
+        self.assertNotIn('default', decisions)
+
+    def test_staff_and_admin_use_primary(self):
+        user = User.objects.create_user('staff', password='clave', is_staff=True)
+        TenantUser.objects.create(user=user, tenant=self.tenant)
+        self.client.force_login(user)
+        _, decisions = self.reads('get', '/propiedades/')
+        self.assertNotIn('default', decisions)
+        self.client.logout()
+        _, decisions = self.reads('get', '/admin/login/')
+        self.assertNotIn('default', decisions)
+
+    def test_write_during_request_switches_to_primary(self):
+        Page.objects.filter(tenant=self.tenant).delete()
+        clear_caches()
+        # La portada se crea en el primer GET: después se lee de la primaria
+        response, decisions = self.reads('get', '/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('default', decisions)
+        self.assertIn(None, decisions)
+        self.assertIn('db_pin', response.cookies)
+
+    def test_cache_fill_after_bump_reads_primary(self):
+        path = f'/propiedad/{Property.objects.filter(is_available=True).first().pk}/'
+        invalidate_pages(self.tenant.pk)
+        # Recién invalidado: la réplica podría no tener el cambio todavía
+        response, decisions = self.reads('get', path)
+        self.assertEqual(response['X-Page-Cache'], 'MISS')
+        self.assertNotIn('default', decisions)
+
+        invalidate_pages(self.tenant.pk)
+        later = time.time() + settings.REPLICA_PIN_SECONDS
+        with mock.patch('cms_project.main.replicas.time.time', return_value=later):
+            response, decisions = self.reads('get', path)
+        self.assertEqual(response['X-Page-Cache'], 'MISS')
+        self.assertIn('default', decisions)
+
+    def test_facets_fill_after_bump_reads_primary(self):
+        routed = []
+
+        def facet_rows(properties, price_filter=None):
+            routed.append(ReplicaRouter().db_for_read(Property))
+            return []
+
+        invalidate_facets(self.tenant.pk)
+        with mock.patch('cms_project.main.facets.facet_rows', facet_rows):
+            self.reads('get', '/propiedades/')
+            invalidate_facets(self.tenant.pk)
+            later = time.time() + settings.REPLICA_PIN_SECONDS
+            with mock.patch('cms_project.main.replicas.time.time', return_value=later):
+                self.reads('get', '/propiedades/')
+        self.assertEqual(routed, [None, 'default'])
+
+    def test_router_rules(self):
+        router = ReplicaRouter()
+        self.assertIsNone(router.db_for_read(Property))
+        prop = Property.objects.first()
+        prop._state.db = 'default'
+        self.assertEqual(router.db_for_write(Property, instance=prop), 'default')
+        self.assertFalse(router.allow_migrate('default', 'main'))
+        with override_settings(DATABASE_REPLICAS=['replica1']):
+            self.assertIsNone(router.allow_migrate('default', 'main'))
+            self.assertFalse(router.allow_migrate('replica1', 'main'))
+
+
+@override_settings(SHARD_DATABASES=['default', 'shard1'])
+class ShardingTests(TestCase):
+    databases = {'default', 'shard1'}
+
+    def setUp(self):
+        clear_caches()
+        self.tenant = Tenant.objects.create(name='Uno', subdomain='uno')
+        self.other = Tenant.objects.create(name='Dos', subdomain='dos')
+        create_default_homepage(self.tenant)
+        seed_properties([self.tenant, self.other], 20)
+        self.property = Property.objects.filter(tenant=self.tenant, is_available=True).first()
+        PropertyImage.objects.create(property=self.property, image='properties/uno.jpg', is_main=True)
+        self.client = Client(HTTP_HOST='uno.example.com')
+
+    def tearDown(self):
+        # Las ubicaciones cacheadas no deben llegar a otros tests (las pks se reutilizan)
+        clear_caches()
+
+    def move(self, database):
+        return TenantMover(self.tenant, database, batch_size=4, settle=0).run()
+
+    def test_move_routes_tenant_to_shard(self):
+        counts = self.move('shard1')
+        self.assertEqual(counts['main.Property'], {'inserted': 10, 'updated': 0})
+        self.assertEqual(tenant_database(self.tenant.pk), 'shard1')
+        self.assertFalse(Property.objects.using('default').filter(tenant=self.tenant).exists())
+        self.assertEqual(Property.objects.using('default').filter(tenant=self.other).count(), 10)
+
+        moved = Property.objects.using('shard1').get(pk=self.property.pk)
+        self.assertEqual(moved.main_image.image.name, 'properties/uno.jpg')
+        self.assertEqual(self.client.get(f'/propiedad/{self.property.pk}/').status_code, 200)
+        response = self.client.get('/propiedades/')
+        self.assertContains(response, f'/propiedad/{self.property.pk}/')
+        self.assertEqual(Client(HTTP_HOST='dos.example.com').get('/propiedades/').status_code, 200)
+
+        # Lo nuevo se crea en el shard, en su propio rango de ids
+        with use_tenant(self.tenant):
+            page = Page.objects.create(tenant=self.tenant, title='Nueva', slug='nueva')
+        self.assertEqual(page._state.db, 'shard1')
+        self.assertGreaterEqual(page.pk, 10 ** 12)
+
+        self.move('default')
+        self.assertEqual(Property.objects.using('default').filter(tenant=self.tenant).count(), 10)
+        self.assertTrue(Page.objects.using('default').filter(pk=page.pk).exists())
+        self.assertFalse(Tenant.objects.using('shard1').exists())
+
+    def test_round_trip_keeps_id_blocks_apart(self):
+        self.move('shard1')
+        with use_tenant(self.tenant):
+            on_shard = Page.objects.create(tenant=self.tenant, title='En el shard', slug='shard')
+        self.move('default')
+        # Con filas del bloque del shard, la base por defecto ya no asigna ahí
+        with use_tenant(self.tenant):
+            on_default = Page.objects.create(tenant=self.tenant, title='Tras volver', slug='vuelta')
+        other_page = Page.objects.create(tenant=self.other, title='Otro', slug='otro')
+
+        self.move('shard1')
+        with use_tenant(self.tenant):
+            again = Page.objects.create(tenant=self.tenant, title='Otra vez', slug='otra')
+        ids = [on_shard.pk, on_default.pk, other_page.pk, again.pk]
+        self.assertEqual(len(set(ids)), 4)
+        self.assertLess(on_shard.pk, on_default.pk)
+        self.assertLess(other_page.pk, again.pk)
+
+        # El otro tenant se mueve al mismo shard sin chocar con los ids del primero
+        TenantMover(self.other, 'shard1', batch_size=4, settle=0).run()
+        self.assertEqual(Page.objects.using('shard1').filter(pk__in=ids).count(), 4)
+
+    def test_final_copy_applies_changes(self):
+        mirror_tenant(self.tenant, 'shard1')
+        mover = TenantMover(self.tenant, 'shard1', settle=0)
+        mover.copy('default')
+        Property.objects.filter(pk=self.property.pk).update(title='Editada')
+        deleted = Property.objects.filter(tenant=self.tenant).exclude(pk=self.property.pk).first()
+        deleted.delete()
+        mover.copy('default')
+        shard = Property.objects.using('shard1').filter(tenant=self.tenant)
+        self.assertEqual(shard.count(), 9)
+        self.assertEqual(shard.get(pk=self.property.pk).title, 'Editada')
+        self.assertFalse(shard.filter(pk=deleted.pk).exists())
+
+    def test_writes_blocked_while_moving(self):
+        Page.objects.filter(tenant=self.tenant).delete()
+        queued = ContactSubmission(tenant=self.tenant, name='Ana', email='a@b.cl', message='m')
+        self.assertEqual(tenant_database(self.tenant.pk), 'default')
+        TenantPlacement.objects.create(tenant=self.tenant, database='default', state=TenantPlacement.MOVING)
+        # Lo que hace TenantMover.place() al empezar el movimiento
+        invalidate_placement(self.tenant.pk)
+        with self.assertRaises(TenantMovingError):
+            tenant_database(self.tenant.pk, for_write=True)
+        # La portada se crea al visitarla: esa escritura espera al fin del movimiento
+        response = self.client.get('/')
+        self.assertEqual(response.status_code, 503)
+        self.assertIn('Retry-After', response)
+
+        writer = SubmissionWriter()
+        writer.write([queued])
+        self.assertEqual([submission for _, submission in writer.waiting], [queued])
+        self.assertFalse(ContactSubmission.objects.exists())
+
+    def test_source_changes_after_final_copy_abort_purge(self):
+        mover = TenantMover(self.tenant, 'shard1', batch_size=4, settle=0)
+        place = mover.place
+
+        def late_write(database, state):
+            place(database, state)
+            if database == 'shard1':
+                # Un worker que todavía escribía en el origen
+                Property.objects.using('default').filter(pk=self.property.pk).update(title='Tarde')
+
+        with mock.patch.object(mover, 'place', late_write), self.assertRaises(MoveAbortedError):
+            mover.run()
+        self.assertEqual(Property.objects.using('default').filter(tenant=self.tenant).count(), 10)
+        self.assertEqual(Property.objects.using('default').get(pk=self.property.pk).title, 'Tarde')
+
+    def test_admin_export_streams_from_the_shard(self):
+        self.move('shard1')
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'clave'))
+        response = self.client.post('/admin/main/property/', {
+            'action': 'export_csv', 'select_across': '1', 'index': '0', '_selected_action': ['0'],
+        })
+        rows = list(csv.reader(io.StringIO(b''.join(response.streaming_content).decode())))
+        self.assertEqual(len(rows), 11)
+        self.assertEqual({row[1] for row in rows[1:]}, {'uno'})
+
+    def test_writes_use_the_cached_placement(self):
+        def placement_queries():
+            with CaptureQueriesContext(connection) as queries, use_tenant(self.tenant):
+                for slug in ('a', 'b'):
+                    Page.objects.create(tenant=self.tenant, title=slug, slug=f'{slug}-{random.random()}')
+            return [q for q in queries.captured_queries if 'tenants_tenantplacement' in q['sql']]
+
+        clear_caches()
+        self.assertEqual(len(placement_queries()), 1)
+        self.assertEqual(len(placement_queries()), 0)
+        # Sin shards configurados (el valor por defecto) el router no interviene
+        clear_caches()
+        with override_settings(SHARD_DATABASES=['default']):
+            self.assertEqual(placement_queries(), [])
+
+    def test_move_command_requires_shared_cache(self):
+        with self.assertRaisesMessage(CommandError, 'compartida'):
+            call_command('move_tenant', 'uno', 'shard1', stdout=io.StringIO())
+        self.assertEqual(tenant_database(self.tenant.pk), 'default')
+
+    def test_writer_and_tenant_changes_follow_placement(self):
+        self.move('shard1')
+        writer = SubmissionWriter()
+        writer.write([
+            ContactSubmission(tenant=self.tenant, name='Ana', email='a@b.cl', message='m'),
+            ContactSubmission(tenant=self.other, name='Luis', email='l@b.cl', message='m'),
+        ])
+        self.assertEqual(ContactSubmission.objects.using('shard1').get().name, 'Ana')
+        self.assertEqual(ContactSubmission.objects.using('default').get().name, 'Luis')
+
+        self.tenant.name = 'Uno Renombrado'
+        self.tenant.save()
+        self.assertEqual(Tenant.objects.using('shard1').get().name, 'Uno Renombrado')
+
+        tenant_id = self.tenant.pk
+        self.tenant.delete()
+        self.assertFalse(Tenant.objects.using('shard1').exists())
+        self.assertFalse(Property.objects.using('shard1').exists())
+        self.assertEqual(tenant_database(tenant_id), 'default')
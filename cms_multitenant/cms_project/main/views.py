@@ -4,10 +4,37 @@ from django.http import JsonResponse, Http404
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_POST
 from django.contrib import messages
+from django.conf import settings
+from django.db.models import Q
+from django.core.exceptions import ValidationError
 import json
 from .models import Page, Property, ContactSubmission
+from .pagination import KeysetPaginator, InvalidCursor
+from .search import search_properties
+from .facets import get_facets, PRICE_BUCKETS
+from .page_cache import tenant_cache_page
+from .ratelimit import rate_limit
+from .submissions import submission_writer
+from .conditional import (
+    content_validator, home_validator, page_detail_validator, property_detail_validator,
+)
 
 
+# Ordenamientos del catálogo, cada uno respaldado por un índice de Property
+PROPERTY_SORTS = {
+    'recent': ('-created_at', 'Más recientes'),
+    'price_asc': ('price', 'Precio: menor a mayor'),
+    'price_desc': ('-price', 'Precio: mayor a menor'),
+    'area_asc': ('area', 'Área: menor a mayor'),
+    'area_desc': ('-area', 'Área: mayor a menor'),
+}
+
+# Orden por relevancia, sólo disponible cuando hay texto de búsqueda
+RELEVANCE_SORT = ('search_rank', 'Relevancia')
+
+
+@tenant_cache_page
+@content_validator(home_validator)
 def home_view(request):
     """
     Vista principal que muestra la página de inicio del tenant
@@ -30,7 +57,7 @@ def home_view(request):
         tenant=request.tenant,
         is_featured=True,
         is_available=True
-    )[:6]
+    ).with_main_image()[:6]
     
     context = {
         'page': homepage,
@@ -42,6 +69,8 @@ def home_view(request):
     return render(request, 'main/home.html', context)
 
 
+@tenant_cache_page
+@content_validator(page_detail_validator)
 def page_detail_view(request, slug):
     """
     Vista para mostrar páginas específicas por slug
@@ -60,12 +89,12 @@ def page_detail_view(request, slug):
     }
     
     if page.page_type == 'properties':
-        # Para páginas de propiedades, incluir todas las propiedades del tenant
+        # Para páginas de propiedades, incluir las propiedades del tenant paginadas
         properties = Property.objects.filter(
             tenant=request.tenant,
             is_available=True
-        ).order_by('-created_at')
-        context['properties'] = properties
+        ).with_main_image()
+        context.update(paginate_properties(request, properties))
     
     return render(request, f'main/{page.page_type}.html', context)
 
@@ -80,45 +109,67 @@ def properties_view(request):
     properties = Property.objects.filter(
         tenant=request.tenant,
         is_available=True
-    ).order_by('-created_at')
+    ).with_main_image()
     
     # Filtros
+    query = request.GET.get('q', '').strip()
     property_type = request.GET.get('type')
     sale_type = request.GET.get('sale')
     city = request.GET.get('city')
     min_price = request.GET.get('min_price')
     max_price = request.GET.get('max_price')
     
-    if property_type:
-        properties = properties.filter(property_type=property_type)
-    if sale_type:
-        properties = properties.filter(sale_type=sale_type)
-    if city:
-        properties = properties.filter(city__icontains=city)
+    # La búsqueda se resuelve en SQL antes de calcular los facets
+    if query:
+        properties = search_properties(properties, query, request.tenant)
+    price_filter = Q()
     if min_price:
         try:
-            properties = properties.filter(price__gte=float(min_price))
+            price_filter &= Q(price__gte=float(min_price))
         except ValueError:
             pass
     if max_price:
         try:
-            properties = properties.filter(price__lte=float(max_price))
+            price_filter &= Q(price__lte=float(max_price))
         except ValueError:
             pass
     
-    # Obtener valores únicos para filtros
-    cities = Property.objects.filter(
-        tenant=request.tenant,
-        is_available=True
-    ).values_list('city', flat=True).distinct()
+    # Conteos por tipo, operación, ciudad y precio (una consulta, cacheada)
+    facets = get_facets(
+        request.tenant,
+        properties,
+        signature={'q': query, 'min_price': min_price, 'max_price': max_price},
+        selected={'property_type': property_type, 'sale_type': sale_type, 'city': city},
+        price_filter=price_filter,
+    )
+    
+    if price_filter:
+        properties = properties.filter(price_filter)
+    if property_type:
+        properties = properties.filter(property_type=property_type)
+    if sale_type:
+        properties = properties.filter(sale_type=sale_type)
+    if city:
+        properties = properties.filter(city__icontains=city)
+    
+    # Enlaces de rango de precio conservando los demás filtros
+    price_ranges = []
+    for (key, label, total), (_, _, low, high) in zip(facets['price'], PRICE_BUCKETS):
+        params = request.GET.copy()
+        for param in ('after', 'before', 'min_price', 'max_price'):
+            params.pop(param, None)
+        if low is not None:
+            params['min_price'] = low
+        if high is not None:
+            params['max_price'] = high
+        price_ranges.append((params.urlencode(), label, total))
     
     context = {
-        'properties': properties,
-        'cities': cities,
-        'property_types': Property.PROPERTY_TYPES,
-        'sale_types': Property.SALE_TYPES,
+        'facets': facets,
+        'price_ranges': price_ranges,
         'tenant': request.tenant,
         'filters': {
+            'q': query,
             'property_type': property_type,
             'sale_type': sale_type,
             'city': city,
@@ -126,10 +177,61 @@ def properties_view(request):
             'max_price': max_price,
         }
     }
+    context.update(paginate_properties(request, properties))
     
     return render(request, 'main/properties.html', context)
 
 
+def paginate_properties(request, properties):
+    """
+    Ordena y pagina por cursor un queryset de propiedades según los
+    parámetros `sort`, `after` y `before` de la request
+    """
+    sorts = dict(PROPERTY_SORTS)
+    if 'search_rank' in properties.query.annotations:
+        sorts = {'relevance': RELEVANCE_SORT, **sorts}
+    sort = request.GET.get('sort')
+    if sort not in sorts:
+        sort = next(iter(sorts))
+    ordering = sorts[sort][0]
+    if ordering.lstrip('-') == 'area':
+        # Las propiedades sin área no se pueden ordenar por área
+        properties = properties.filter(area__isnull=False)
+    
+    paginator = KeysetPaginator(
+        properties,
+        ordering,
+        per_page=getattr(settings, 'PROPERTIES_PER_PAGE', 24)
+    )
+    try:
+        page = paginator.page(after=request.GET.get('after'), before=request.GET.get('before'))
+    except InvalidCursor:
+        page = paginator.page()
+    
+    # Enlaces conservando filtros y orden
+    params = request.GET.copy()
+    params.pop('after', None)
+    params.pop('before', None)
+    next_query = previous_query = None
+    if page.has_next:
+        params['after'] = page.next_cursor
+        next_query = params.urlencode()
+        params.pop('after')
+    if page.has_previous:
+        params['before'] = page.previous_cursor
+        previous_query = params.urlencode()
+    
+    return {
+        'properties': page,
+        'sort': sort,
+        'sort_options': [(key, label) for key, (_, label) in sorts.items()],
+        'next_query': next_query,
+        'previous_query': previous_query,
+    }
+
+
+@tenant_cache_page
+@content_validator(property_detail_validator)
 def property_detail_view(request, property_id):
     """
     Vista para mostrar detalle de una propiedad específica
@@ -148,14 +250,7 @@ def property_detail_view(request, property_id):
     images = property_obj.propertyimage_set.all().order_by('order')
     
     # Propiedades similares
-    similar_properties = Property.objects.filter(
-        tenant=request.tenant,
-        property_type=property_obj.property_type,
-        is_available=True
-    ).exclude(id=property_obj.id)[:4]
-
-    print(request.tenant)
-    print(property_obj.property_type)
+    similar_properties = Property.objects.with_main_image().similar_to(property_obj)
     
     context = {
         'property': property_obj,
@@ -169,6 +264,7 @@ def property_detail_view(request, property_id):
 
 @csrf_exempt
 @require_POST
+@rate_limit('contact')
 def contact_form_view(request):
     """
     Vista para procesar formularios de contacto
@@ -191,8 +287,8 @@ def contact_form_view(request):
                 'error': f'El campo {field} es obligatorio'
             })
     
-    # Crear el registro de contacto
-    contact = ContactSubmission.objects.create(
+    # Crear el registro de contacto (se valida aquí, se escribe después)
+    contact = ContactSubmission(
         tenant=request.tenant,
         name=data.get('name'),
         email=data.get('email'),
@@ -200,19 +296,22 @@ def contact_form_view(request):
         subject=data.get('subject', ''),
         message=data.get('message'),
     )
+    try:
+        contact.full_clean(exclude=['tenant', 'page', 'property_interest'])
+    except ValidationError as error:
+        field, errors = next(iter(error.message_dict.items()))
+        return JsonResponse({'success': False, 'error': f'{field}: {errors[0]}'})
     
-    # Si se especifica una propiedad de interés
+    # Si se especifica una propiedad de interés (sólo lectura, sin bloquear)
     property_id = data.get('property_id')
-    if property_id:
-        try:
-            property_obj = Property.objects.get(
-                id=property_id, 
-                tenant=request.tenant
-            )
-            contact.property_interest = property_obj
-            contact.save()
-        except Property.DoesNotExist:
-            pass
+    if property_id and str(property_id).isdigit():
+        contact.property_interest_id = Property.objects.filter(
+            id=property_id,
+            tenant=request.tenant
+        ).values_list('id', flat=True).first()
+    
+    # El registro se escribe en lote en segundo plano
+    submission_writer.submit(contact)
     
     # Respuesta según tipo de request
     if request.content_type == 'application/json':
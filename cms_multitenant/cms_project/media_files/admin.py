@@ -1,18 +1,40 @@
+from django import forms
 from django.contrib import admin
 from unfold.admin import ModelAdmin
+from unfold.contrib.filters.admin import AutocompleteSelectFilter
 from .models import MediaFile
+from .blobs import store_upload, release_blob
+from .quotas import StorageQuotaFormMixin
+from .renditions import delete_renditions
+from cms_project.tenants.admin_paginator import EstimatedCountPaginator
 from cms_project.tenants.custom_admin import tenant_admin_site
 
 
+class MediaFileForm(StorageQuotaFormMixin, forms.ModelForm):
+    quota_file_fields = ('file',)
+
+    class Meta:
+        model = MediaFile
+        fields = '__all__'
+
+    def get_quota_tenant(self):
+        return self.cleaned_data.get('tenant') or self.tenant
+
+
 class MediaFileAdmin(ModelAdmin):
+    form = MediaFileForm
     list_display = ['original_name', 'media_type', 'file_size', 'tenant', 'created_at']
-    list_filter = ['media_type', 'tenant', 'created_at']
+    list_filter = ['media_type', ('tenant', AutocompleteSelectFilter), 'created_at']
+    list_filter_submit = True
+    list_select_related = ['tenant']
+    show_full_result_count = False
+    paginator = EstimatedCountPaginator
     search_fields = ['original_name', 'description', 'alt_text']
-    readonly_fields = ['created_at', 'updated_at', 'file_size']
+    readonly_fields = ['created_at', 'updated_at', 'file_size', 'content_type', 'content_hash']
 
     fieldsets = (
         ('Archivo', {
-            'fields': ('tenant', 'file', 'original_name', 'media_type', 'file_size')
+            'fields': ('tenant', 'file', 'original_name', 'media_type', 'file_size', 'content_type', 'content_hash')
         }),
         ('Información adicional', {
             'fields': ('alt_text', 'description')
@@ -23,12 +45,28 @@ class MediaFileAdmin(ModelAdmin):
         }),
     )
 
+    def get_form(self, request, obj=None, **kwargs):
+        form = super().get_form(request, obj, **kwargs)
+        form.tenant = getattr(request, 'tenant', None)
+        return form
+
     def save_model(self, request, obj, form, change):
-        if obj.file:
-            obj.file_size = obj.file.size
         if not change and hasattr(request, 'tenant'):
             obj.tenant = request.tenant
+        previous = None
+        if obj.file and not obj.file._committed:
+            # Archivo nuevo: se guarda una sola vez por contenido
+            if change:
+                previous = MediaFile.objects.filter(pk=obj.pk).values_list('blob_id', 'renditions').first()
+            blob = store_upload(obj.tenant, obj.file)
+            obj.file = blob.file.name
+            obj.blob = blob
+            obj.file_size = blob.size
+            obj.content_hash = blob.sha256
+            obj.content_type = blob.content_type
         super().save_model(request, obj, form, change)
+        if previous and previous[0] and release_blob(previous[0]):
+            delete_renditions(previous[1])
 
     def get_queryset(self, request):
         qs = super().get_queryset(request)
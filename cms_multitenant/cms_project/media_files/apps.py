@@ -6,3 +6,6 @@ class MediaFilesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'cms_project.media_files'
     verbose_name = 'Archivos Multimedia'
+
+    def ready(self):
+        from . import signals  # noqa: F401
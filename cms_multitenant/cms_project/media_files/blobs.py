@@ -0,0 +1,135 @@
+
+import hashlib
+import mimetypes
+import os
+import tempfile
+
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import IntegrityError, router
+from django.db.models import F
+
+from cms_project.main.sqlite import write_atomic
+from .models import MediaBlob
+from .quotas import reserve_usage
+
+
+# Firmas de los formatos más comunes (desplazamiento, bytes, tipo MIME)
+SIGNATURES = [
+    (0, b'\xff\xd8\xff', 'image/jpeg'),
+    (0, b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (0, b'GIF87a', 'image/gif'),
+    (0, b'GIF89a', 'image/gif'),
+    (8, b'WEBP', 'image/webp'),
+    (0, b'%PDF', 'application/pdf'),
+    (4, b'ftyp', 'video/mp4'),
+    (0, b'\x1a\x45\xdf\xa3', 'video/webm'),
+]
+
+
+def sniff_content_type(head, name):
+    for offset, signature, content_type in SIGNATURES:
+        if head[offset:offset + len(signature)] == signature:
+            return content_type
+    return mimetypes.guess_type(name)[0] or 'application/octet-stream'
+
+
+def blob_name(tenant_id, digest, original_name):
+    extension = os.path.splitext(original_name)[1].lower()
+    return f'media_files/{tenant_id}/{digest[:2]}/{digest}{extension}'
+
+
+def spool_upload(upload):
+    """
+    Recorre el archivo una sola vez: calcula el SHA-256, el tamaño y el
+    tipo MIME mientras copia los bloques a un temporal.
+    """
+    sha256 = hashlib.sha256()
+    size = 0
+    head = b''
+    try:
+        directory = default_storage.path('media_files/tmp')
+        os.makedirs(directory, exist_ok=True)
+    except NotImplementedError:
+        directory = None
+    temp = tempfile.NamedTemporaryFile(dir=directory, delete=False)
+    with temp:
+        for chunk in upload.chunks():
+            if len(head) < 16:
+                head += chunk[:16]
+            sha256.update(chunk)
+            size += len(chunk)
+            temp.write(chunk)
+    return temp.name, sha256.hexdigest(), size, sniff_content_type(head, upload.name)
+
+
+def move_into_storage(temp_path, name):
+    """Renombra el temporal (mismo disco) o lo sube si el storage no es local"""
+    try:
+        target = default_storage.path(name)
+    except NotImplementedError:
+        with open(temp_path, 'rb') as handle:
+            default_storage.save(name, File(handle))
+        os.remove(temp_path)
+        return
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    os.replace(temp_path, target)
+
+
+def acquire_blob(tenant, digest, defaults):
+    # En la base del tenant (su shard), donde se escribe el blob
+    with write_atomic(using=router.db_for_write(MediaBlob, instance=tenant)):
+        blob, created = MediaBlob.objects.get_or_create(
+            tenant=tenant, sha256=digest, defaults={**defaults, 'ref_count': 1}
+        )
+        if created:
+            # Con deduplicación el espacio se cuenta por blob, no por archivo.
+            # Si no cabe, QuotaExceeded deshace la creación del blob.
+            reserve_usage(tenant, blob.size)
+        else:
+            MediaBlob.objects.filter(pk=blob.pk).update(ref_count=F('ref_count') + 1)
+    return blob, created
+
+
+def store_upload(tenant, upload):
+    """
+    Guarda el archivo subido direccionado por contenido: si el tenant ya
+    tiene esos mismos bytes se reutiliza el blob y se suma una referencia.
+    """
+    temp_path, digest, size, content_type = spool_upload(upload)
+    try:
+        defaults = {
+            'file': blob_name(tenant.pk, digest, upload.name),
+            'size': size,
+            'content_type': content_type,
+        }
+        try:
+            blob, created = acquire_blob(tenant, digest, defaults)
+        except IntegrityError:
+            # Otra request creó el mismo blob al mismo tiempo
+            blob, created = acquire_blob(tenant, digest, defaults)
+        if created or not default_storage.exists(blob.file.name):
+            try:
+                move_into_storage(temp_path, blob.file.name)
+            except Exception:
+                if created:
+                    # Borrar el blob también devuelve su espacio reservado
+                    blob.delete()
+                raise
+        return blob
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+def release_blob(blob_id):
+    """
+    Resta una referencia y borra el blob cuando nadie más lo usa. Devuelve
+    True si el archivo dejó de usarse (también para archivos sin blob).
+    """
+    if blob_id is None:
+        return True
+    with write_atomic(using=router.db_for_write(MediaBlob)):
+        MediaBlob.objects.filter(pk=blob_id).update(ref_count=F('ref_count') - 1)
+        deleted, _ = MediaBlob.objects.filter(pk=blob_id, ref_count__lte=0).delete()
+    return bool(deleted)
@@ -0,0 +1,70 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from itertools import islice
+
+from django.apps import apps
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from cms_project.main.sharding import used_databases
+from cms_project.media_files.renditions import get_rendition_sizes, render_image, store_renditions
+
+
+# (modelo, campo del archivo, campo de variantes)
+RENDITION_TARGETS = [
+    ('main.PropertyImage', 'image', 'renditions'),
+    ('main.Section', 'background_image', 'background_renditions'),
+    ('media_files.MediaFile', 'file', 'renditions'),
+]
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.gif', '.webp')
+
+
+class Command(BaseCommand):
+    help = 'Genera en paralelo las variantes de las imágenes que aún no las tienen'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=getattr(settings, 'RENDITION_WORKERS', 2),
+                            help='Procesos de codificación')
+        parser.add_argument('--batch-size', type=int, default=200,
+                            help='Imágenes enviadas al pool por tanda')
+        parser.add_argument('--force', action='store_true',
+                            help='Regenerar también las que ya tienen variantes')
+
+    def pending(self, force):
+        """(base, trabajo) de cada imagen sin variantes, en todos los shards en uso"""
+        for using in used_databases():
+            for label, field_name, renditions_field in RENDITION_TARGETS:
+                model = apps.get_model(label)
+                rows = model.objects.using(using).exclude(**{field_name: ''}).values_list(
+                    'pk', field_name, renditions_field
+                )
+                for pk, source_name, renditions in rows.iterator():
+                    if not source_name.lower().endswith(IMAGE_EXTENSIONS):
+                        continue
+                    if not force and (renditions or {}).get('source') == source_name:
+                        continue
+                    yield using, (label, pk, field_name, renditions_field, source_name)
+
+    def handle(self, *args, **options):
+        media_root = str(settings.MEDIA_ROOT)
+        sizes = get_rendition_sizes()
+        jobs = self.pending(options['force'])
+        done = failed = 0
+        with ProcessPoolExecutor(max_workers=options['workers'],
+                                 mp_context=multiprocessing.get_context('spawn')) as pool:
+            while batch := list(islice(jobs, options['batch_size'])):
+                futures = {
+                    pool.submit(render_image, media_root, job[-1], sizes): (using, job)
+                    for using, job in batch
+                }
+                for future in as_completed(futures):
+                    using, job = futures[future]
+                    try:
+                        store_renditions(*job, future.result(), using)
+                        done += 1
+                    except Exception as exc:
+                        failed += 1
+                        self.stderr.write(f'{job[0]} #{job[1]} ({job[-1]}): {exc}')
+
+        self.stdout.write(self.style.SUCCESS(f'Variantes generadas: {done}. Errores: {failed}.'))
@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand
+from django.template.defaultfilters import filesizeformat
+
+from cms_project.main.models import PropertyImage, Section
+from cms_project.main.sharding import use_tenant
+from cms_project.media_files.models import MediaBlob, MediaFile, StorageUsage
+from cms_project.media_files.quotas import stored_size
+from cms_project.tenants.models import Tenant
+
+
+class Command(BaseCommand):
+    help = 'Recalcula desde el disco los bytes usados por cada tenant'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tenant', help='Subdominio de un solo tenant')
+        parser.add_argument('--dry-run', action='store_true', help='Sólo mostrar las diferencias')
+
+    def stored_names(self, tenant):
+        """Archivos referenciados por el tenant (los blobs se cuentan una vez)"""
+        yield from MediaBlob.objects.filter(tenant=tenant).values_list('file', flat=True).iterator()
+        yield from MediaFile.objects.filter(tenant=tenant, blob__isnull=True).values_list('file', flat=True).iterator()
+        yield from PropertyImage.objects.filter(property__tenant=tenant).values_list('image', flat=True).iterator()
+        yield from Section.objects.filter(page__tenant=tenant).exclude(background_image='').values_list(
+            'background_image', flat=True
+        ).iterator()
+
+    def handle(self, *args, **options):
+        tenants = Tenant.objects.select_related('storage_usage').order_by('pk')
+        if options['tenant']:
+            tenants = tenants.filter(subdomain=options['tenant'])
+
+        for tenant in tenants:
+            with use_tenant(tenant):
+                used = sum(stored_size(name) for name in self.stored_names(tenant))
+            usage = getattr(tenant, 'storage_usage', None)
+            recorded = usage.used_bytes if usage else 0
+            if used == recorded:
+                continue
+            self.stdout.write(
+                f'{tenant.subdomain}: {filesizeformat(recorded)} -> {filesizeformat(used)} ({used - recorded:+d} bytes)'
+            )
+            if not options['dry_run']:
+                StorageUsage.objects.update_or_create(tenant=tenant, defaults={'used_bytes': used})
+
+        self.stdout.write(self.style.SUCCESS('Contadores de almacenamiento reconciliados.'))
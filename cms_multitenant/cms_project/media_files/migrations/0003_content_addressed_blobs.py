@@ -0,0 +1,48 @@
+# Generated by Django 5.2.18 on 2026-10-17 18:06
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('media_files', '0002_mediafile_renditions'),
+        ('tenants', '0002_tenant_domain_unique'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mediafile',
+            name='content_hash',
+            field=models.CharField(blank=True, db_index=True, max_length=64, verbose_name='SHA-256'),
+        ),
+        migrations.AddField(
+            model_name='mediafile',
+            name='content_type',
+            field=models.CharField(blank=True, max_length=100, verbose_name='Tipo MIME'),
+        ),
+        migrations.CreateModel(
+            name='MediaBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sha256', models.CharField(max_length=64, verbose_name='SHA-256')),
+                ('file', models.FileField(max_length=255, upload_to='', verbose_name='Archivo')),
+                ('size', models.PositiveBigIntegerField(verbose_name='Tamaño (bytes)')),
+                ('content_type', models.CharField(max_length=100, verbose_name='Tipo MIME')),
+                ('ref_count', models.PositiveIntegerField(default=0, verbose_name='Referencias')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('tenant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='tenants.tenant', verbose_name='Tenant')),
+            ],
+            options={
+                'verbose_name': 'Blob',
+                'verbose_name_plural': 'Blobs',
+                'unique_together': {('tenant', 'sha256')},
+            },
+        ),
+        migrations.AddField(
+            model_name='mediafile',
+            name='blob',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='media_files', to='media_files.mediablob', verbose_name='Blob'),
+        ),
+    ]
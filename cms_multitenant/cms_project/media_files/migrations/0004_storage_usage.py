@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-17 18:08
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('media_files', '0003_content_addressed_blobs'),
+        ('tenants', '0003_tenant_storage_quota'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StorageUsage',
+            fields=[
+                ('tenant', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='storage_usage', serialize=False, to='tenants.tenant', verbose_name='Tenant')),
+                ('used_bytes', models.BigIntegerField(default=0, verbose_name='Bytes usados')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Uso de almacenamiento',
+                'verbose_name_plural': 'Uso de almacenamiento',
+            },
+        ),
+    ]
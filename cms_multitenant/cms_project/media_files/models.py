@@ -1,9 +1,55 @@
 
 from django.db import models
 from cms_project.tenants.models import Tenant
+from .renditions import RenditionsMixin
 
 
-class MediaFile(models.Model):
+class StorageUsage(models.Model):
+    """
+    Bytes ocupados por cada tenant. Se actualiza con F() al subir o borrar
+    archivos y se reconstruye con el comando reconcile_storage.
+    """
+    tenant = models.OneToOneField(
+        Tenant,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='storage_usage',
+        verbose_name="Tenant"
+    )
+    used_bytes = models.BigIntegerField(default=0, verbose_name="Bytes usados")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Uso de almacenamiento"
+        verbose_name_plural = "Uso de almacenamiento"
+
+    def __str__(self):
+        return f"{self.tenant_id}: {self.used_bytes} bytes"
+
+
+class MediaBlob(models.Model):
+    """
+    Contenido de un archivo, guardado una sola vez por tenant según su
+    hash. Los MediaFile con los mismos bytes comparten el blob.
+    """
+    tenant = models.ForeignKey(Tenant, on_delete=models.CASCADE, verbose_name="Tenant")
+    sha256 = models.CharField(max_length=64, verbose_name="SHA-256")
+    file = models.FileField(max_length=255, verbose_name="Archivo")
+    size = models.PositiveBigIntegerField(verbose_name="Tamaño (bytes)")
+    content_type = models.CharField(max_length=100, verbose_name="Tipo MIME")
+    ref_count = models.PositiveIntegerField(default=0, verbose_name="Referencias")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Blob"
+        verbose_name_plural = "Blobs"
+        unique_together = ('tenant', 'sha256')
+
+    def __str__(self):
+        return f"{self.sha256[:12]} ({self.ref_count})"
+
+
+class MediaFile(RenditionsMixin, models.Model):
     """
     Gestión de archivos multimedia por tenant
     """
@@ -19,11 +65,25 @@ class MediaFile(models.Model):
     original_name = models.CharField(max_length=255, verbose_name="Nombre original")
     media_type = models.CharField(max_length=20, choices=MEDIA_TYPES, verbose_name="Tipo de medio")
     file_size = models.PositiveIntegerField(verbose_name="Tamaño del archivo (bytes)")
+    content_hash = models.CharField(max_length=64, blank=True, db_index=True, verbose_name="SHA-256")
+    content_type = models.CharField(max_length=100, blank=True, verbose_name="Tipo MIME")
+    blob = models.ForeignKey(
+        MediaBlob,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        editable=False,
+        related_name='media_files',
+        verbose_name="Blob"
+    )
     alt_text = models.CharField(max_length=200, blank=True, verbose_name="Texto alternativo")
     description = models.TextField(blank=True, verbose_name="Descripción")
+    renditions = models.JSONField(default=dict, blank=True, editable=False, verbose_name="Variantes")
     
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+
+    rendition_source_field = 'file'
     
     class Meta:
         verbose_name = "Archivo Multimedia"
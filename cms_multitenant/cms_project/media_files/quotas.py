@@ -0,0 +1,168 @@
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import UploadedFile
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.template.defaultfilters import filesizeformat
+from django.utils import timezone
+
+from .models import StorageUsage
+
+
+class QuotaExceeded(ValidationError):
+    pass
+
+
+def get_quota(tenant):
+    """Cuota en bytes del tenant, o None si no tiene límite"""
+    quota_mb = tenant.storage_quota_mb
+    if quota_mb is None:
+        quota_mb = getattr(settings, 'TENANT_STORAGE_QUOTA_MB', None)
+    return None if quota_mb is None else quota_mb * 1024 * 1024
+
+
+def get_usage(tenant_id):
+    return StorageUsage.objects.filter(pk=tenant_id).values_list('used_bytes', flat=True).first() or 0
+
+
+def quota_exceeded(incoming_bytes, used, quota):
+    return QuotaExceeded(
+        'El archivo (%(size)s) supera el espacio disponible: %(used)s de %(quota)s usados.',
+        code='storage_quota',
+        params={
+            'size': filesizeformat(incoming_bytes),
+            'used': filesizeformat(used),
+            'quota': filesizeformat(quota),
+        },
+    )
+
+
+def check_quota(tenant, incoming_bytes):
+    """
+    Una lectura por clave primaria, antes de escribir nada en disco. Sirve
+    para avisar en el formulario; lo que garantiza la cuota es reserve_usage.
+    """
+    quota = get_quota(tenant)
+    if quota is None or not incoming_bytes:
+        return
+    used = get_usage(tenant.pk)
+    if used + incoming_bytes > quota:
+        raise quota_exceeded(incoming_bytes, used, quota)
+
+
+def reserve_usage(tenant, incoming_bytes):
+    """
+    Suma `incoming_bytes` al contador sólo si caben en la cuota, con un
+    UPDATE condicional (used_bytes + tamaño <= cuota): dos subidas
+    simultáneas no pueden pasarse aunque ambas hayan pasado check_quota.
+    Lanza QuotaExceeded sin tocar el contador. Si lo que sigue falla, el
+    llamador devuelve la reserva con adjust_usage(tenant.pk, -incoming_bytes).
+    """
+    quota = get_quota(tenant)
+    if quota is None or not incoming_bytes:
+        adjust_usage(tenant.pk, incoming_bytes)
+        return
+    values = {'used_bytes': F('used_bytes') + incoming_bytes, 'updated_at': timezone.now()}
+    fits = StorageUsage.objects.filter(pk=tenant.pk, used_bytes__lte=quota - incoming_bytes)
+    if fits.update(**values):
+        return
+    if incoming_bytes <= quota and not StorageUsage.objects.filter(pk=tenant.pk).exists():
+        try:
+            with transaction.atomic():
+                StorageUsage.objects.create(tenant_id=tenant.pk, used_bytes=incoming_bytes)
+            return
+        except IntegrityError:
+            # Otra subida creó el contador al mismo tiempo
+            if fits.update(**values):
+                return
+    raise quota_exceeded(incoming_bytes, get_usage(tenant.pk), quota)
+
+
+def adjust_usage(tenant_id, delta):
+    """Suma (o resta) bytes al contador del tenant de forma atómica"""
+    if not delta or tenant_id is None:
+        return
+    values = {'used_bytes': F('used_bytes') + delta, 'updated_at': timezone.now()}
+    if StorageUsage.objects.filter(pk=tenant_id).update(**values) or delta < 0:
+        return
+    try:
+        with transaction.atomic():
+            StorageUsage.objects.create(tenant_id=tenant_id, used_bytes=delta)
+    except IntegrityError:
+        StorageUsage.objects.filter(pk=tenant_id).update(**values)
+
+
+def stored_size(name):
+    """Tamaño en disco, 0 si el archivo ya no existe"""
+    try:
+        return default_storage.size(name) if name else 0
+    except OSError:
+        return 0
+
+
+def track_file_change(instance, field_name, get_tenant):
+    """
+    pre_save: reserva en la cuota el tamaño del archivo nuevo, antes de que
+    se escriba en disco, y anota el nombre del anterior. Sólo consulta la
+    base cuando se sube o se quita un archivo; `get_tenant` se llama sólo
+    si hay un archivo nuevo.
+    """
+    file = getattr(instance, field_name)
+    new_upload = bool(file) and not file._committed
+    if not new_upload and (file or instance.pk is None):
+        return
+    previous = ''
+    if instance.pk:
+        previous = type(instance)._default_manager.filter(pk=instance.pk).values_list(
+            field_name, flat=True
+        ).first() or ''
+    if new_upload:
+        reserve_usage(get_tenant(), file.size)
+    instance._storage_change = previous
+
+
+def apply_file_change(instance, field_name, get_tenant_id):
+    """
+    post_save: descuenta el archivo anterior anotado por track_file_change
+    (el nuevo ya quedó reservado). `get_tenant_id` se llama sólo si hubo
+    cambios (puede consultar la base).
+    """
+    previous = instance.__dict__.pop('_storage_change', None)
+    if previous is None:
+        return
+    removed = stored_size(previous) if previous != getattr(instance, field_name).name else 0
+    adjust_usage(get_tenant_id(), -removed)
+
+
+def release_file(file, tenant_id):
+    if file:
+        adjust_usage(tenant_id, -stored_size(file.name))
+
+
+class StorageQuotaFormMixin:
+    """
+    Rechaza en la validación del formulario los archivos que no caben en
+    la cuota, antes de que se guarden. El admin asigna `tenant` a la clase
+    del formulario en cada request.
+    """
+    quota_file_fields = ()
+    tenant = None
+
+    def get_quota_tenant(self):
+        return self.tenant
+
+    def clean(self):
+        cleaned_data = super().clean()
+        uploads = [
+            (name, cleaned_data[name]) for name in self.quota_file_fields
+            if isinstance(cleaned_data.get(name), UploadedFile)
+        ]
+        tenant = self.get_quota_tenant() if uploads else None
+        if tenant is not None:
+            try:
+                check_quota(tenant, sum(upload.size for _, upload in uploads))
+            except QuotaExceeded as error:
+                self.add_error(uploads[0][0], error)
+        return cleaned_data
@@ -0,0 +1,170 @@
+
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from django.apps import apps
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.dispatch import Signal
+
+
+logger = logging.getLogger(__name__)
+
+# Ancho máximo de cada variante (nunca se agranda el original)
+DEFAULT_RENDITIONS = {
+    'thumb': 320,
+    'card': 640,
+    'hero': 1600,
+    'full': 2560,
+}
+
+# (formato de Pillow, extensión, clave en el JSON)
+RENDITION_FORMATS = [('WEBP', 'webp', 'webp'), ('JPEG', 'jpg', 'jpeg')]
+
+# Se envía cuando las variantes de un objeto quedan guardadas
+renditions_ready = Signal()
+
+
+def get_rendition_sizes():
+    return getattr(settings, 'IMAGE_RENDITIONS', DEFAULT_RENDITIONS)
+
+
+def rendition_prefix(source_name):
+    """renditions/<ruta del original sin extensión>/"""
+    return 'renditions/' + os.path.splitext(source_name)[0]
+
+
+def render_image(media_root, source_name, sizes, quality=82):
+    """
+    Genera las variantes de una imagen. Se ejecuta en un proceso del pool,
+    así que sólo usa Pillow y el sistema de archivos, nunca el ORM.
+    """
+    from PIL import Image, ImageOps
+
+    prefix = rendition_prefix(source_name)
+    os.makedirs(os.path.join(media_root, prefix), exist_ok=True)
+    with Image.open(os.path.join(media_root, source_name)) as original:
+        image = ImageOps.exif_transpose(original)
+        width, height = image.size
+        if image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+        result = {'source': source_name, 'width': width, 'height': height, 'sizes': {}}
+        for name, max_width in sizes.items():
+            variant = image.copy()
+            variant.thumbnail((max_width, max_width * 10), Image.LANCZOS)
+            entry = {'width': variant.width, 'height': variant.height}
+            for pil_format, extension, key in RENDITION_FORMATS:
+                relative = f'{prefix}/{name}.{extension}'
+                variant.save(os.path.join(media_root, relative), pil_format, quality=quality)
+                entry[key] = relative
+            result['sizes'][name] = entry
+    return result
+
+
+def delete_renditions(data):
+    from django.core.files.storage import default_storage
+    for entry in (data or {}).get('sizes', {}).values():
+        for _, _, key in RENDITION_FORMATS:
+            if entry.get(key):
+                default_storage.delete(entry[key])
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """Pool de procesos compartido, creado al primer uso"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(
+                max_workers=getattr(settings, 'RENDITION_WORKERS', 2),
+                mp_context=multiprocessing.get_context('spawn'),
+            )
+        return _executor
+
+
+def store_renditions(model_label, pk, field_name, renditions_field, source_name, result, using=None):
+    """Guarda el resultado sólo si el objeto sigue apuntando al mismo archivo"""
+    model = apps.get_model(model_label)
+    # `using`: la base (shard) del objeto; fuera de la request no hay tenant para enrutar
+    queryset = model.objects.using(using).filter(pk=pk, **{field_name: source_name})
+    if queryset.update(**{renditions_field: result}):
+        renditions_ready.send(sender=model, pk=pk, renditions=result, using=queryset.db)
+    else:
+        # El archivo cambió mientras se procesaba
+        delete_renditions(result)
+
+
+def _on_rendered(model_label, pk, field_name, renditions_field, source_name, future, using=None):
+    try:
+        store_renditions(model_label, pk, field_name, renditions_field, source_name, future.result(), using)
+    except Exception:
+        logger.exception('No se pudieron generar las variantes de %s', source_name)
+    finally:
+        close_old_connections()
+
+
+def schedule_renditions(instance, field_name, renditions_field):
+    """
+    Encola la generación de variantes al confirmar la transacción. La
+    request que subió el archivo no espera la codificación.
+    """
+    file = getattr(instance, field_name)
+    if not file:
+        return
+    source_name = file.name
+    if (getattr(instance, renditions_field) or {}).get('source') == source_name:
+        return
+    args = (instance._meta.label, instance.pk, field_name, renditions_field, source_name)
+    render_args = (str(settings.MEDIA_ROOT), source_name, get_rendition_sizes())
+    using = instance._state.db
+
+    def submit():
+        if not getattr(settings, 'RENDITIONS_ASYNC', True):
+            store_renditions(*args, render_image(*render_args), using)
+            return
+        future = get_executor().submit(render_image, *render_args)
+        future.add_done_callback(partial(_on_rendered, *args, using=using))
+
+    transaction.on_commit(submit, using=using)
+
+
+class RenditionsMixin:
+    """
+    Acceso a las variantes guardadas en un JSONField. Cada modelo indica
+    el campo del archivo original y el del JSON.
+    """
+    rendition_source_field = 'image'
+    renditions_field = 'renditions'
+
+    def get_renditions(self):
+        data = getattr(self, self.renditions_field) or {}
+        source = getattr(self, self.rendition_source_field)
+        # Variantes de un archivo anterior todavía no reemplazadas
+        if not source or data.get('source') != source.name:
+            return {}
+        return data
+
+    def rendition_url(self, name, image_format='webp'):
+        """URL de la variante o, si aún no existe, la del original"""
+        from django.core.files.storage import default_storage
+        entry = self.get_renditions().get('sizes', {}).get(name)
+        if entry and entry.get(image_format):
+            return default_storage.url(entry[image_format])
+        source = getattr(self, self.rendition_source_field)
+        return source.url if source else ''
+
+    def rendition_srcset(self, image_format='webp'):
+        from django.core.files.storage import default_storage
+        sizes = self.get_renditions().get('sizes', {})
+        candidates = {}
+        for entry in sizes.values():
+            if entry.get(image_format):
+                candidates[entry['width']] = default_storage.url(entry[image_format])
+        return ', '.join(f'{url} {width}w' for width, url in sorted(candidates.items()))
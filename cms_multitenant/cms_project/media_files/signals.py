@@ -0,0 +1,67 @@
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+from cms_project.tenants.models import Tenant
+from .models import MediaBlob, MediaFile
+from .blobs import release_blob
+from .quotas import adjust_usage, track_file_change, apply_file_change, release_file
+from .renditions import schedule_renditions, delete_renditions
+
+
+@receiver(post_save, sender=MediaFile)
+def schedule_media_renditions(sender, instance, **kwargs):
+    """Sólo las imágenes tienen variantes"""
+    if instance.get_file_type() != 'image':
+        return
+    if instance.blob_id and instance.get_renditions() == {}:
+        # Otro archivo con los mismos bytes ya tiene sus variantes
+        shared = MediaFile.objects.filter(blob_id=instance.blob_id).exclude(pk=instance.pk).exclude(
+            renditions={}
+        ).values_list('renditions', flat=True).first()
+        if shared and shared.get('source') == instance.file.name:
+            MediaFile.objects.filter(pk=instance.pk).update(renditions=shared)
+            instance.renditions = shared
+            return
+    schedule_renditions(instance, 'file', 'renditions')
+
+
+@receiver(post_delete, sender=MediaFile)
+def release_media_blob(sender, instance, origin=None, **kwargs):
+    """
+    Las variantes se borran junto con la última referencia al contenido.
+    Al borrar el tenant sus blobs caen en la misma cascada (blob_id puede
+    apuntar a uno ya borrado): no se descuentan referencias, que volverían
+    a borrar el blob y a descontar su espacio, y las variantes se borran.
+    """
+    if isinstance(origin, Tenant) or release_blob(instance.blob_id):
+        delete_renditions(instance.renditions)
+
+
+@receiver(post_delete, sender=MediaBlob)
+def delete_blob_file(sender, instance, using, **kwargs):
+    name = instance.file.name
+    transaction.on_commit(lambda: default_storage.delete(name), using=using)
+
+
+@receiver(post_delete, sender=MediaBlob)
+def release_blob_usage(sender, instance, **kwargs):
+    adjust_usage(instance.tenant_id, -instance.size)
+
+
+@receiver(pre_save, sender=MediaFile)
+def track_media_file(sender, instance, **kwargs):
+    # Archivos guardados sin pasar por store_upload
+    if instance.blob_id is None:
+        track_file_change(instance, 'file', lambda: instance.tenant)
+
+
+@receiver(post_save, sender=MediaFile)
+def charge_media_file(sender, instance, **kwargs):
+    apply_file_change(instance, 'file', lambda: instance.tenant_id)
+
+
+@receiver(post_delete, sender=MediaFile)
+def release_media_file_usage(sender, instance, **kwargs):
+    if instance.blob_id is None:
+        release_file(instance.file, instance.tenant_id)
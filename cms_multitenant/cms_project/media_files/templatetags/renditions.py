@@ -0,0 +1,24 @@
+from django import template
+
+
+register = template.Library()
+
+
+@register.filter
+def rendition(obj, spec):
+    """
+    URL de una variante: {{ image|rendition:"card" }} (WebP) o
+    {{ image|rendition:"card:jpeg" }}. Sin variantes devuelve el original.
+    """
+    if not obj:
+        return ''
+    name, _, image_format = spec.partition(':')
+    return obj.rendition_url(name, image_format or 'webp')
+
+
+@register.filter
+def srcset(obj, image_format='webp'):
+    """Candidatos para el atributo srcset: "<url> 320w, <url> 640w, ..." """
+    if not obj:
+        return ''
+    return obj.rendition_srcset(image_format)
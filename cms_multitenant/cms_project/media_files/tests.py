@@ -1,3 +1,216 @@
-from django.test import TestCase
+import hashlib
+import io
+import os
+import shutil
+import tempfile
+from decimal import Decimal
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.template import Context, Template
+from django.test import RequestFactory, TestCase, override_settings
+from PIL import Image
+
+from cms_project.main.models import Property, PropertyImage
+from cms_project.tenants.custom_admin import tenant_admin_site
+from cms_project.tenants.models import Tenant
+from .models import MediaBlob, MediaFile, StorageUsage
+from .quotas import QuotaExceeded, check_quota, get_usage, reserve_usage
+
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def tearDownModule():
+    shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+
+def make_image(name='foto.jpg', size=(1200, 800)):
+    buffer = io.BytesIO()
+    Image.new('RGB', size, (200, 120, 40)).save(buffer, 'JPEG')
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/jpeg')
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, RENDITIONS_ASYNC=False)
+class RenditionTests(TestCase):
+    def setUp(self):
+        self.tenant = Tenant.objects.create(name='Uno', subdomain='uno')
+        self.property = Property.objects.create(
+            tenant=self.tenant, title='Casa', description='Casa', property_type='casa',
+            sale_type='venta', price=Decimal('1000'), address='Calle 1', city='Santiago'
+        )
+
+    def test_upload_generates_renditions(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            image = PropertyImage.objects.create(property=self.property, image=make_image())
+        image.refresh_from_db()
+        data = image.get_renditions()
+        self.assertEqual((data['width'], data['height']), (1200, 800))
+        self.assertEqual(data['sizes']['thumb']['width'], 320)
+        self.assertEqual(data['sizes']['card']['height'], 427)
+        # Nunca se agranda el original
+        self.assertEqual(data['sizes']['full']['width'], 1200)
+        for entry in data['sizes'].values():
+            self.assertTrue(os.path.exists(os.path.join(MEDIA_ROOT, entry['webp'])))
+            self.assertTrue(os.path.exists(os.path.join(MEDIA_ROOT, entry['jpeg'])))
+
+        html = Template('{% load renditions %}{{ image|rendition:"card" }}|{{ image|srcset:"jpeg" }}').render(
+            Context({'image': image})
+        )
+        card, candidates = html.split('|')
+        self.assertTrue(card.endswith('/card.webp'))
+        self.assertIn('/thumb.jpg 320w', candidates)
+        self.assertIn('/full.jpg 1200w', candidates)
+
+        image.delete()
+        self.assertFalse(os.path.exists(os.path.join(MEDIA_ROOT, data['sizes']['thumb']['webp'])))
+
+    def test_falls_back_to_original(self):
+        image = PropertyImage.objects.create(property=self.property, image=make_image('sin.jpg'))
+        self.assertEqual(image.get_renditions(), {})
+        self.assertEqual(image.rendition_url('card'), image.image.url)
+        self.assertEqual(image.rendition_srcset(), '')
+
+    def test_backfill_command(self):
+        media = MediaFile.objects.create(
+            tenant=self.tenant, file=make_image('plano.png', (400, 300)), original_name='plano.png',
+            media_type='image', file_size=1
+        )
+        self.assertEqual(media.renditions, {})
+        call_command('build_renditions', workers=1, stdout=io.StringIO())
+        media.refresh_from_db()
+        self.assertEqual(media.get_renditions()['sizes']['thumb']['width'], 320)
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, RENDITIONS_ASYNC=False)
+class ContentAddressedUploadTests(TestCase):
+    def setUp(self):
+        self.tenant = Tenant.objects.create(name='Dos', subdomain='dos')
+        self.admin = tenant_admin_site._registry[MediaFile]
+        self.request = RequestFactory().post('/')
+        self.request.tenant = self.tenant
+
+    def upload(self, content, name='folleto.pdf'):
+        media = MediaFile(
+            file=SimpleUploadedFile(name, content), original_name=name, media_type='document', file_size=0
+        )
+        self.admin.save_model(self.request, media, None, False)
+        return media
+
+    def test_identical_uploads_share_one_blob(self):
+        first = self.upload(b'%PDF-1.4 folleto')
+        second = self.upload(b'%PDF-1.4 folleto', 'copia.pdf')
+        self.assertEqual(first.blob_id, second.blob_id)
+        self.assertEqual(first.file.name, second.file.name)
+        self.assertEqual(MediaBlob.objects.get().ref_count, 2)
+        self.assertEqual(second.file_size, 16)
+        self.assertEqual(second.content_type, 'application/pdf')
+        self.assertEqual(second.content_hash, hashlib.sha256(b'%PDF-1.4 folleto').hexdigest())
+
+        path = os.path.join(MEDIA_ROOT, first.file.name)
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        self.assertTrue(os.path.exists(path))
+        with self.captureOnCommitCallbacks(execute=True):
+            second.delete()
+        self.assertFalse(MediaBlob.objects.exists())
+        self.assertFalse(os.path.exists(path))
+
+    def test_tenant_delete_releases_blobs_and_renditions(self):
+        image = make_image('plano.jpg', (400, 300)).read()
+        with self.captureOnCommitCallbacks(execute=True):
+            first = self.upload(image, 'plano.jpg')
+        self.upload(image, 'copia.jpg')
+        first.refresh_from_db()
+        thumb = os.path.join(MEDIA_ROOT, first.get_renditions()['sizes']['thumb']['webp'])
+        blob_path = os.path.join(MEDIA_ROOT, first.file.name)
+        self.assertTrue(os.path.exists(thumb))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.tenant.delete()
+        self.assertFalse(MediaBlob.objects.exists())
+        self.assertFalse(os.path.exists(thumb))
+        self.assertFalse(os.path.exists(blob_path))
+
+    def test_blobs_are_per_tenant(self):
+        self.upload(b'mismo contenido', 'a.txt')
+        self.request.tenant = Tenant.objects.create(name='Tres', subdomain='tres')
+        self.upload(b'mismo contenido', 'a.txt')
+        self.assertEqual(MediaBlob.objects.count(), 2)
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, RENDITIONS_ASYNC=False, TENANT_STORAGE_QUOTA_MB=1)
+class StorageQuotaTests(TestCase):
+    def setUp(self):
+        self.tenant = Tenant.objects.create(name='Cuatro', subdomain='cuatro')
+        self.admin = tenant_admin_site._registry[MediaFile]
+        self.request = RequestFactory().post('/')
+        self.request.tenant = self.tenant
+
+    def upload(self, content, name='a.txt'):
+        media = MediaFile(
+            file=SimpleUploadedFile(name, content), original_name=name, media_type='document', file_size=0
+        )
+        self.admin.save_model(self.request, media, None, False)
+        return media
+
+    def test_usage_follows_uploads_and_deletes(self):
+        first = self.upload(b'x' * 100)
+        self.upload(b'x' * 100, 'copia.txt')
+        self.assertEqual(get_usage(self.tenant.pk), 100)
+
+        prop = Property.objects.create(
+            tenant=self.tenant, title='Casa', description='Casa', property_type='casa',
+            sale_type='venta', price=Decimal('1000'), address='Calle 1', city='Santiago'
+        )
+        image = PropertyImage.objects.create(property=prop, image=make_image())
+        image_size = image.image.size
+        self.assertEqual(get_usage(self.tenant.pk), 100 + image_size)
+
+        prop.delete()
+        first.delete()
+        self.assertEqual(get_usage(self.tenant.pk), 100)
+
+    def test_upload_over_quota_is_rejected(self):
+        StorageUsage.objects.create(tenant=self.tenant, used_bytes=1024 * 1024 - 10)
+        self.request.user = User.objects.create_superuser('admin', 'admin@example.com', 'clave')
+        form_class = self.admin.get_form(self.request)
+        data = {'tenant': self.tenant.pk, 'original_name': 'a.txt', 'media_type': 'document', 'file_size': 0}
+        form = form_class(data, {'file': SimpleUploadedFile('a.txt', b'x' * 20)})
+        self.assertFalse(form.is_valid())
+        self.assertEqual(form.errors.as_data()['file'][0].code, 'storage_quota')
+        form = form_class(data, {'file': SimpleUploadedFile('a.txt', b'x' * 5)})
+        self.assertTrue(form.is_valid(), form.errors)
+
+    def test_reservation_is_conditional(self):
+        quota = 1024 * 1024
+        StorageUsage.objects.create(tenant=self.tenant, used_bytes=quota - 10)
+        # Dos subidas que pasaron check_quota a la vez: sólo una cabe
+        check_quota(self.tenant, 10)
+        self.upload(b'x' * 10, 'uno.txt')
+        with self.assertRaises(QuotaExceeded):
+            self.upload(b'y' * 10, 'dos.txt')
+        self.assertEqual(get_usage(self.tenant.pk), quota)
+        self.assertEqual(MediaBlob.objects.count(), 1)
+
+        with self.assertRaises(QuotaExceeded):
+            PropertyImage.objects.create(property=Property.objects.create(
+                tenant=self.tenant, title='Casa', description='Casa', property_type='casa',
+                sale_type='venta', price=Decimal('1000'), address='Calle 1', city='Santiago'
+            ), image=make_image())
+        self.assertFalse(PropertyImage.objects.exists())
+        self.assertEqual(get_usage(self.tenant.pk), quota)
+
+    def test_reservation_creates_the_counter(self):
+        other = Tenant.objects.create(name='Cinco', subdomain='cinco')
+        reserve_usage(other, 100)
+        self.assertEqual(get_usage(other.pk), 100)
+        with self.assertRaises(QuotaExceeded):
+            reserve_usage(Tenant.objects.create(name='Seis', subdomain='seis'), 2 * 1024 * 1024)
+
+    def test_reconcile_rebuilds_counters(self):
+        self.upload(b'x' * 100)
+        StorageUsage.objects.filter(pk=self.tenant.pk).update(used_bytes=7)
+        call_command('reconcile_storage', stdout=io.StringIO())
+        self.assertEqual(get_usage(self.tenant.pk), 100)
@@ -1,4 +1,5 @@
 import os
+import sys
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -15,6 +16,7 @@ ALLOWED_HOSTS = ['*']  # Para desarrollo - cambiar en producción
 # Application definition
 INSTALLED_APPS = [
     "unfold",
+    "unfold.contrib.filters",
     "django.contrib.admin",
     "django.contrib.auth",
     "django.contrib.contenttypes",
@@ -29,12 +31,17 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'cms_project.main.instrumentation.RequestMetricsMiddleware',  # Primero: mide toda la request
+    'cms_project.main.sqlite.WriteTransactionsMiddleware',  # POST y demás: transacciones BEGIN IMMEDIATE
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'cms_project.tenants.middleware.TenantMiddleware',  # Custom tenant middleware
+    'cms_project.main.sharding.TenantShardMiddleware',  # Enruta la request al shard de request.tenant
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'cms_project.main.replicas.ReplicaMiddleware',  # Después de auth: sólo anónimos leen de réplicas
+    'cms_project.main.profiling.ProfilingMiddleware',  # Después de auth: valida la cabecera de staff
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -43,7 +50,8 @@ ROOT_URLCONF = 'cms_project.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates que además mide el render para las métricas por request
+        'BACKEND': 'cms_project.main.instrumentation.TimedDjangoTemplates',
         'DIRS': [BASE_DIR / 'templates'],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -60,13 +68,126 @@ TEMPLATES = [
 WSGI_APPLICATION = 'cms_project.wsgi.application'
 
 # Database
+# Perfil de producción de SQLite: WAL (lectores concurrentes con un escritor)
+# y pragmas aplicados en cada conexión nueva
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',  # seguro con WAL: sólo sincroniza en los checkpoints
+    'mmap_size': 268435456,  # 256 MB leídos por mmap
+    'cache_size': -65536,  # 64 MB de caché de páginas por conexión
+    'temp_store': 'MEMORY',
+}
+SQLITE_BUSY_TIMEOUT = 20  # segundos esperando el bloqueo de escritura
+SQLITE_WRITE_RETRIES = 3  # reintentos de una sentencia bloqueada fuera de transacción
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {
+            'timeout': SQLITE_BUSY_TIMEOUT,
+            # Las transacciones son DEFERRED; los caminos de escritura
+            # (write_atomic, WriteTransactionsMiddleware) usan BEGIN IMMEDIATE
+            'init_command': '; '.join(f'PRAGMA {name} = {value}' for name, value in SQLITE_PRAGMAS.items()),
+        },
+    }
+}
+
+# Shards: bases donde move_tenant puede ubicar los datos de un tenant
+# (TenantPlacement). Desactivado por defecto; SQLITE_SHARDS=N agrega
+# db_shard1..N.sqlite3. Un archivo sin tenants ubicados no se llega a abrir.
+SHARD_DATABASES = ['default']
+for number in range(1, int(os.environ.get('SQLITE_SHARDS', 0)) + 1):
+    DATABASES[f'shard{number}'] = {**DATABASES['default'], 'NAME': BASE_DIR / f'db_shard{number}.sqlite3'}
+    SHARD_DATABASES.append(f'shard{number}')
+if sys.argv[1:2] == ['test'] and 'shard1' not in DATABASES:
+    # Los tests de sharding lo activan con override_settings(SHARD_DATABASES=...)
+    DATABASES['shard1'] = {**DATABASES['default'], 'NAME': BASE_DIR / 'db_shard1.sqlite3'}
+SHARD_ID_BLOCK = 10 ** 12  # al recibir un tenant, la base pasa a asignar ids en un bloque nuevo de este tamaño
+SHARD_PLACEMENT_CACHE_TIMEOUT = 30  # segundos de una ubicación en la caché compartida
+
+# Réplicas de lectura (alias de DATABASES) para los GET anónimos de las
+# vistas públicas. Para probarlas localmente con archivos SQLite:
+#   SQLITE_REPLICAS=/tmp/replica1.sqlite3 python manage.py sync_replicas --interval 2
+SQLITE_REPLICAS = [path for path in os.environ.get('SQLITE_REPLICAS', '').split(',') if path]
+DATABASE_REPLICAS = []
+for number, path in enumerate(SQLITE_REPLICAS, start=1):
+    DATABASES[f'replica{number}'] = {**DATABASES['default'], 'NAME': path, 'TEST': {'MIRROR': 'default'}}
+    DATABASE_REPLICAS.append(f'replica{number}')
+DATABASE_ROUTERS = [
+    'cms_project.main.sharding.ShardRouter',  # Primero: los datos de un tenant viven en su shard
+    'cms_project.main.replicas.ReplicaRouter',
+]
+REPLICA_NAMESPACES = ['main']  # espacios de nombres de URL que pueden leer de réplicas
+REPLICA_PIN_COOKIE = 'db_pin'  # tras escribir, el visitante lee de la primaria...
+REPLICA_PIN_SECONDS = 10  # ...durante este tiempo (mayor que el retraso de las réplicas)
+
+# Cache
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
     }
 }
 
+# Caché de resolución de tenants (LRU en proceso + caché de Django). En
+# producción debe ser compartida entre procesos (Redis, Memcached, BD):
+# con LocMemCache las invalidaciones no llegan a los demás workers
+TENANT_CACHE_ALIAS = 'default'
+TENANT_CACHE_MAXSIZE = 1024
+TENANT_CACHE_LOCAL_TTL = 30  # segundos en el LRU de cada proceso
+TENANT_CACHE_TIMEOUT = 300  # segundos en la caché compartida
+TENANT_CACHE_NEGATIVE_TIMEOUT = 60  # subdominios inexistentes
+
+# Conteos de facets del catálogo (se invalidan al cambiar propiedades del tenant)
+FACETS_CACHE_TIMEOUT = 300
+
+# Caché de páginas completas para visitantes anónimos (se purga por tenant)
+PAGE_CACHE_TIMEOUT = 600
+
+# Variantes de imágenes (ancho máximo en px), generadas en WebP y JPEG
+IMAGE_RENDITIONS = {
+    'thumb': 320,
+    'card': 640,
+    'hero': 1600,
+    'full': 2560,
+}
+RENDITION_WORKERS = 2  # procesos del pool de codificación
+RENDITIONS_ASYNC = True  # False: se generan al guardar (útil en tests)
+
+# Escritura en lote de los formularios de contacto
+CONTACT_WRITER_BATCH_SIZE = 50
+CONTACT_WRITER_INTERVAL = 0.5  # segundos máximos de espera de un lote
+CONTACT_WRITER_MOVE_TIMEOUT = 300  # espera máxima por un tenant que cambia de shard
+# Contactos que no se pudieron escribir (se reintentan con retry_contacts)
+CONTACT_DEAD_LETTER_PATH = BASE_DIR / 'contact_dead_letters.jsonl'
+
+# Changelists sin filtros con más filas que esto muestran un total estimado;
+# los filtrados cuentan hasta este valor
+ADMIN_ESTIMATED_COUNT_THRESHOLD = 10000
+
+# Límite del formulario de contacto por tenant e IP (token bucket)
+CONTACT_RATE_PER_MINUTE = 6
+CONTACT_RATE_BURST = 10
+RATE_LIMIT_TRUST_X_FORWARDED_FOR = False  # True sólo detrás de un proxy propio
+
+# Carpeta del servidor con las imágenes referenciadas por los feeds importados desde el admin
+PROPERTY_IMPORT_IMAGES_DIR = None
+
+# Cuota de almacenamiento por defecto de cada tenant (None: sin límite)
+TENANT_STORAGE_QUOTA_MB = 1024
+
+# Métricas por request (consultas, SQL, plantillas) en memoria de cada proceso
+REQUEST_METRICS_SERVER_TIMING = True  # cabecera Server-Timing en las respuestas
+REQUEST_METRICS_MAX_KEYS = 2000  # pares (tenant, vista) distintos antes de agrupar
+
+# Perfilado por muestreo de pilas (archivos .collapsed para flamegraph.pl/speedscope)
+PROFILING_SAMPLE_RATE = 0.0  # fracción de requests perfiladas (0: sólo por cabecera)
+PROFILING_HEADER = 'X-Profile'  # perfila la request si viene de staff del tenant (None: desactivada)
+PROFILING_INTERVAL = 0.001  # segundos entre muestras
+PROFILING_DIR = BASE_DIR / 'profiles'
+PROFILING_MAX_FILES = 500  # perfiles conservados (los más antiguos se borran)
+PROFILING_MAX_CONCURRENT = 2
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -89,6 +210,9 @@ AUTHENTICATION_BACKENDS = [
     'django.contrib.auth.backends.ModelBackend',
 ]
 
+# Segundos que una membresía memorizada en la sesión vale sin volver a la BD
+MEMBERSHIP_CACHE_TTL = 60
+
 # Internationalization
 LANGUAGE_CODE = 'es-es'
 TIME_ZONE = 'UTC'
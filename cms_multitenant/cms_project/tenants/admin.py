@@ -1,13 +1,15 @@
 from django.contrib import admin
+from django.template.defaultfilters import filesizeformat
 from unfold.admin import ModelAdmin
+from unfold.contrib.filters.admin import AutocompleteSelectFilter
 from .models import Tenant, TenantUser
 from .custom_admin import tenant_admin_site
 
 
 class TenantAdmin(ModelAdmin):
-    list_display = ['name', 'subdomain', 'contact_email', 'is_active', 'created_at']
+    list_display = ['name', 'subdomain', 'domain', 'contact_email', 'storage_used', 'is_active', 'created_at']
     list_filter = ['is_active', 'created_at']
-    search_fields = ['name', 'subdomain', 'contact_email']
+    search_fields = ['name', 'subdomain', 'domain', 'contact_email']
     readonly_fields = ['created_at', 'updated_at']
     
     fieldsets = (
@@ -17,16 +19,32 @@ class TenantAdmin(ModelAdmin):
         ('Información de Contacto', {
             'fields': ('contact_email', 'contact_phone', 'address')
         }),
+        ('Almacenamiento', {
+            'fields': ('storage_quota_mb',)
+        }),
+        ('Formulario de contacto', {
+            'fields': ('contact_rate_per_minute', 'contact_rate_burst')
+        }),
         ('Metadatos', {
             'fields': ('created_at', 'updated_at'),
             'classes': ('collapse',)
         }),
     )
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('storage_usage')
+
+    @admin.display(description='Almacenamiento usado')
+    def storage_used(self, obj):
+        usage = getattr(obj, 'storage_usage', None)
+        return filesizeformat(usage.used_bytes if usage else 0)
+
 
 class TenantUserAdmin(ModelAdmin):
     list_display = ['user', 'tenant', 'is_owner', 'created_at']
-    list_filter = ['is_owner', 'tenant', 'created_at']
+    list_filter = ['is_owner', ('tenant', AutocompleteSelectFilter), 'created_at']
+    list_filter_submit = True
+    list_select_related = ['user', 'tenant']
     search_fields = ['user__username', 'user__email', 'tenant__name']
     
     def get_queryset(self, request):
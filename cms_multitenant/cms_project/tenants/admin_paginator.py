@@ -0,0 +1,52 @@
+
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db import DatabaseError, connections, transaction
+from django.utils.functional import cached_property
+
+
+def estimate_table_rows(model, using='default'):
+    """
+    Filas aproximadas según las estadísticas del motor (sqlite_stat1 tras
+    ANALYZE, reltuples en PostgreSQL), o None si no hay estadísticas.
+    """
+    connection = connections[using]
+    table = model._meta.db_table
+    if connection.vendor == 'sqlite':
+        sql = "SELECT MAX(CAST(stat AS INTEGER)) FROM sqlite_stat1 WHERE tbl = %s"
+    elif connection.vendor == 'postgresql':
+        sql = "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass"
+    else:
+        return None
+    try:
+        with transaction.atomic(using=using), connection.cursor() as cursor:
+            cursor.execute(sql, [table])
+            row = cursor.fetchone()
+    except DatabaseError:
+        # Todavía no se ejecutó ANALYZE
+        return None
+    return row[0] if row and row[0] and row[0] > 0 else None
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    En listados sin filtros (superusuario, sin búsqueda) usa la estimación
+    del motor en lugar de COUNT(*) sobre toda la tabla. Los filtrados (por
+    tenant, búsqueda o filtros laterales) cuentan sobre una subconsulta con
+    LIMIT: por encima del umbral el total mostrado es el umbral y las
+    páginas siguientes se alcanzan afinando los filtros.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        query = getattr(queryset, 'query', None)
+        if query is None:
+            return super().count
+        threshold = getattr(settings, 'ADMIN_ESTIMATED_COUNT_THRESHOLD', 10000)
+        if not query.where and not query.distinct:
+            estimate = estimate_table_rows(queryset.model, queryset.db)
+            if estimate is not None and estimate >= threshold:
+                return estimate
+        # SELECT COUNT(*) FROM (SELECT ... LIMIT umbral): corta en cuanto llega
+        return queryset.order_by()[:threshold].count()
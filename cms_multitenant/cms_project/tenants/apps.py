@@ -6,3 +6,9 @@ class TenantsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'cms_project.tenants'
     verbose_name = 'Gestión de Tenants'
+
+    def ready(self):
+        from django.core.checks import register
+        from . import signals  # noqa: F401
+        from .checks import check_tenant_cache
+        register(check_tenant_cache)
@@ -1,23 +1,20 @@
 from django.contrib.auth.backends import ModelBackend
 from django.contrib.auth.models import User
-from .models import Tenant, TenantUser
+from .membership import is_member
 
 class TenantBackend(ModelBackend):
     def authenticate(self, request, username=None, password=None, **kwargs):
         if request is None:
             return None
-        # Extrae el subdominio del host
-        host = request.get_host().split(':')[0]
-        subdomain = host.split('.')[0]
-        try:
-            tenant = Tenant.objects.get(subdomain=subdomain)
-        except Tenant.DoesNotExist:
+        # El middleware ya resolvió el tenant del host
+        tenant = getattr(request, 'tenant', None)
+        if tenant is None:
             return None
         try:
             user = User.objects.get(username=username)
         except User.DoesNotExist:
             return None
         if user.check_password(password):
-            if TenantUser.objects.filter(user=user, tenant=tenant).exists():
+            if is_member(user, tenant, request):
                 return user
         return None
\ No newline at end of file
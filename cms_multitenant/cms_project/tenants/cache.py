@@ -0,0 +1,167 @@
+
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+
+
+_MISSING = object()
+
+# Marca guardada para lookups negativos (host sin tenant)
+NEGATIVE = '__tenant_not_found__'
+
+# Clave usada para el tenant por defecto en desarrollo local
+DEFAULT_TENANT_KEY = '__default__'
+
+# Clave usada para el mapa precalculado host -> tenant
+HOST_MAP_KEY = '__host_map__'
+
+
+class LRUCache:
+    """
+    Caché LRU en proceso con expiración por TTL
+    """
+
+    def __init__(self, maxsize=1024, ttl=30):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key, _MISSING)
+            if item is _MISSING:
+                return default
+            value, expires_at = item
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class TenantCache:
+    """
+    Caché de resolución host -> tenant en dos niveles: un LRU en proceso
+    delante del framework de caché de Django. Los lookups negativos
+    también se guardan para que subdominios inexistentes no lleguen a la BD.
+    """
+
+    key_prefix = 'tenants:host:'
+
+    def __init__(self):
+        self.local = LRUCache(
+            maxsize=getattr(settings, 'TENANT_CACHE_MAXSIZE', 1024),
+            ttl=getattr(settings, 'TENANT_CACHE_LOCAL_TTL', 30),
+        )
+
+    @property
+    def shared(self):
+        return caches[getattr(settings, 'TENANT_CACHE_ALIAS', 'default')]
+
+    def make_key(self, lookup):
+        return f'{self.key_prefix}{lookup}'
+
+    def get(self, lookup, loader, timeout=None):
+        """
+        Devuelve el tenant para `lookup`, llamando a `loader` sólo si no
+        está en ninguno de los dos niveles. Devuelve None si no existe.
+        `timeout` reemplaza los de la caché compartida (positivo y negativo).
+        """
+        value = self.local.get(lookup, _MISSING)
+        if value is _MISSING:
+            key = self.make_key(lookup)
+            value = self.shared.get(key, _MISSING)
+            if value is _MISSING:
+                value = loader()
+                if value is None:
+                    value = NEGATIVE
+                    default = getattr(settings, 'TENANT_CACHE_NEGATIVE_TIMEOUT', 60)
+                else:
+                    default = getattr(settings, 'TENANT_CACHE_TIMEOUT', 300)
+                self.shared.set(key, value, default if timeout is None else timeout)
+            self.local.set(lookup, value)
+        if isinstance(value, str) and value == NEGATIVE:
+            return None
+        return value
+
+    def invalidate(self, *lookups):
+        """Elimina las entradas indicadas de ambos niveles"""
+        lookups = [lookup for lookup in lookups if lookup]
+        for lookup in lookups:
+            self.local.delete(lookup)
+        self.shared.delete_many([self.make_key(lookup) for lookup in lookups])
+
+    def clear(self):
+        self.local.clear()
+
+
+tenant_cache = TenantCache()
+
+
+def tenant_version_key(namespace, tenant_id):
+    return f'tenants:version:{namespace}:{tenant_id}'
+
+
+def get_tenant_version(namespace, tenant_id):
+    """
+    Versión actual de las entradas de `namespace` para un tenant. Incluirla
+    en las claves permite invalidar todo lo del tenant con un solo incr.
+    """
+    cache = tenant_cache.shared
+    key = tenant_version_key(namespace, tenant_id)
+    version = cache.get(key)
+    if version is None:
+        # Un valor inicial distinto cada vez evita reutilizar claves viejas si
+        # la versión fue desalojada de la caché
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key)
+    return version
+
+
+def bump_tenant_version(namespace, tenant_id):
+    """Invalida todas las entradas de `namespace` del tenant"""
+    cache = tenant_cache.shared
+    key = tenant_version_key(namespace, tenant_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), None)
+    cache.set(f'{key}:bumped', time.time(), None)
+
+
+def last_bump(namespace, tenant_id):
+    """Momento (time.time()) de la última invalidación, o None si no se conoce"""
+    return tenant_cache.shared.get(f'{tenant_version_key(namespace, tenant_id)}:bumped')
+
+
+def is_cross_process(alias=None):
+    """
+    ¿La caché `alias` (por defecto TENANT_CACHE_ALIAS) la ven todos los
+    procesos? LocMemCache es de cada worker: las invalidaciones no salen
+    del proceso que las hace.
+    """
+    alias = alias or getattr(settings, 'TENANT_CACHE_ALIAS', 'default')
+    return not isinstance(caches[alias], LocMemCache)
@@ -0,0 +1,18 @@
+
+from django.conf import settings
+from django.core.checks import Warning
+
+from .cache import is_cross_process
+
+
+def check_tenant_cache(app_configs, **kwargs):
+    """La caché de tenants debe ser compartida para que las invalidaciones lleguen a todos los workers"""
+    if is_cross_process():
+        return []
+    return [Warning(
+        f"TENANT_CACHE_ALIAS ('{getattr(settings, 'TENANT_CACHE_ALIAS', 'default')}') es una caché "
+        'en memoria de cada proceso.',
+        hint='Con varios workers las membresías revocadas y los tenants editados tardan en verse '
+             'en los demás procesos. Configura una caché compartida (Redis, Memcached o de BD).',
+        id='tenants.W001',
+    )]
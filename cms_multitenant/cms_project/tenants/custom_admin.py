@@ -1,13 +1,27 @@
+from datetime import datetime
+
 from django.contrib.admin import AdminSite
 from django.urls import path
 from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
-from django.shortcuts import render
+from django.shortcuts import redirect, render
+from django.utils import timezone
 from django.contrib.auth.models import User, Group
 from django.contrib.auth.admin import UserAdmin, GroupAdmin
-from .models import TenantUser
+from .membership import is_member
 from django.contrib import messages
 
+# Criterios de orden de la página de métricas (el primero es el por defecto)
+METRICS_ORDER_OPTIONS = [
+    ('total_s', 'Tiempo total'),
+    ('sql_total_s', 'Tiempo SQL total'),
+    ('p95_ms', 'p95'),
+    ('mean_ms', 'Media'),
+    ('queries', 'Consultas por request'),
+    ('count', 'Requests'),
+]
+
+
 class TenantAdminSite(AdminSite):
     site_header = "Administración de Tenants"
 
@@ -22,8 +36,8 @@ class TenantAdminSite(AdminSite):
             # Superuser puede entrar siempre
             if user.is_superuser:
                 return True
-            # Si existe relación TenantUser, permitir acceso
-            return TenantUser.objects.filter(user=user, tenant=tenant).exists()
+            # Si existe relación TenantUser, permitir acceso (cacheado en la sesión)
+            return is_member(user, tenant, request)
         return False
 
     def login(self, request, extra_context=None):
@@ -41,6 +55,8 @@ class TenantAdminSite(AdminSite):
         custom_urls = [
             path('toggle_sidebar/', self.admin_view(self.toggle_sidebar), name='toggle_sidebar'),
             path('search/', self.admin_view(self.search), name='search'),
+            path('page_cache_stats/', self.admin_view(self.page_cache_stats), name='page_cache_stats'),
+            path('request_metrics/', self.admin_view(self.request_metrics), name='request_metrics'),
         ]
         return custom_urls + urls
 
@@ -51,6 +67,54 @@ class TenantAdminSite(AdminSite):
     def search(self, request):
         return render(request, "admin/search.html", {})
 
+    def page_cache_stats(self, request):
+        """Contadores de aciertos/fallos de la caché de páginas públicas"""
+        from cms_project.main.page_cache import page_cache_stats
+        if not request.user.is_staff:
+            return JsonResponse({'error': 'No autorizado'}, status=403)
+        return JsonResponse(page_cache_stats())
+
+    def request_metrics(self, request):
+        """
+        Vistas y tenants más lentos según las métricas en memoria de este
+        proceso. Un usuario que no es superusuario sólo ve su tenant.
+        """
+        from cms_project.main.instrumentation import registry
+        if not request.user.is_staff:
+            return JsonResponse({'error': 'No autorizado'}, status=403)
+        tenant = None
+        if not request.user.is_superuser:
+            tenant = getattr(request.tenant, 'subdomain', '')
+        if request.method == 'POST' and request.user.is_superuser:
+            registry.reset()
+            messages.success(request, "Métricas reiniciadas.")
+            return redirect(f'{self.name}:request_metrics')
+
+        order = request.GET.get('order')
+        if order not in dict(METRICS_ORDER_OPTIONS):
+            order = METRICS_ORDER_OPTIONS[0][0]
+        tables = {
+            'views': registry.summary('view', tenant=tenant, order=order),
+            'tenants': registry.summary('tenant', tenant=tenant, order=order) if tenant is None else [],
+            'pairs': registry.summary('both', tenant=tenant, order=order),
+        }
+        if request.GET.get('format') == 'json':
+            return JsonResponse(tables)
+        return render(request, 'admin/request_metrics.html', {
+            **self.each_context(request),
+            'title': 'Rendimiento por vista y tenant',
+            'order': order,
+            'order_options': METRICS_ORDER_OPTIONS,
+            'sections': [
+                ('Vistas', tables['views']),
+                ('Tenants', tables['tenants']),
+                ('Tenant y vista', tables['pairs']),
+            ],
+            'since': datetime.fromtimestamp(registry.since, tz=timezone.get_current_timezone()),
+            **tables,
+        })
+
+
 tenant_admin_site = TenantAdminSite(name='tenant_admin')
 tenant_admin_site.register(User, UserAdmin)
-tenant_admin_site.register(Group, GroupAdmin)
\ No newline at end of file
+tenant_admin_site.register(Group, GroupAdmin)
@@ -0,0 +1,43 @@
+
+from .models import Tenant
+
+
+def normalize_host(host):
+    """Normaliza un host: sin puerto, en minúsculas y sin punto final"""
+    return host.split(':')[0].strip().lower().rstrip('.')
+
+
+def extract_subdomain(host):
+    """Extrae el subdominio de un host (la primera etiqueta)"""
+    return host.split('.')[0]
+
+
+class HostMap:
+    """
+    Mapa precalculado host -> tenant con todos los tenants activos.
+    Se reconstruye cuando cambia algún tenant, por lo que resolver un host
+    (o fallar) nunca consulta la base de datos.
+    """
+
+    def __init__(self, tenants):
+        self.domains = {}
+        self.subdomains = {}
+        for tenant in tenants:
+            if tenant.domain:
+                self.domains[normalize_host(tenant.domain)] = tenant
+            self.subdomains[tenant.subdomain.lower()] = tenant
+
+    @classmethod
+    def build(cls):
+        return cls(Tenant.objects.filter(is_active=True))
+
+    def resolve(self, host):
+        """Busca primero el dominio exacto y después el subdominio"""
+        host = normalize_host(host)
+        tenant = self.domains.get(host)
+        if tenant is None:
+            tenant = self.subdomains.get(extract_subdomain(host))
+        return tenant
+
+    def __len__(self):
+        return len(self.subdomains)
@@ -0,0 +1,48 @@
+
+import time
+
+from django.conf import settings
+
+from .cache import get_tenant_version, bump_tenant_version
+from .models import TenantUser
+
+
+MEMBERSHIP_NAMESPACE = 'membership'
+
+# Clave de sesión con {"<user>:<tenant>": [pertenece, versión, verificado_en]}
+SESSION_KEY = '_tenant_membership'
+
+
+def is_member(user, tenant, request=None):
+    """
+    ¿El usuario pertenece al tenant? El resultado se memoriza en la request
+    y en la sesión. La versión de membresías del tenant (en la caché
+    compartida) cambia al editar sus TenantUser e invalida lo guardado en
+    todas las sesiones sin tocarlas. Además lo de la sesión vence a los
+    MEMBERSHIP_CACHE_TTL segundos: si la caché no es compartida entre
+    procesos, el cambio de versión no llega a los demás workers y una
+    membresía revocada sólo dura ese tiempo.
+    """
+    key = f'{user.pk}:{tenant.pk}'
+    memo = request.__dict__.setdefault('_tenant_membership', {}) if request is not None else {}
+    if key in memo:
+        return memo[key]
+
+    version = get_tenant_version(MEMBERSHIP_NAMESPACE, tenant.pk)
+    session = getattr(request, 'session', None)
+    stored = session.get(SESSION_KEY, {}).get(key) if session is not None else None
+    now = time.time()
+    ttl = getattr(settings, 'MEMBERSHIP_CACHE_TTL', 60)
+    if stored and len(stored) == 3 and stored[1] == version and now - stored[2] < ttl:
+        allowed = stored[0]
+    else:
+        allowed = TenantUser.objects.filter(user=user, tenant=tenant).exists()
+        if session is not None:
+            session[SESSION_KEY] = {**session.get(SESSION_KEY, {}), key: [allowed, version, now]}
+
+    memo[key] = allowed
+    return allowed
+
+
+def invalidate_membership(tenant_id):
+    bump_tenant_version(MEMBERSHIP_NAMESPACE, tenant_id)
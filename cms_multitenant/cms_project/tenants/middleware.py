@@ -1,47 +1,47 @@
 
 from django.http import Http404
 from django.utils.deprecation import MiddlewareMixin
+from .cache import tenant_cache, DEFAULT_TENANT_KEY, HOST_MAP_KEY
+from .hosts import HostMap
 from .models import Tenant
 
 
 class TenantMiddleware(MiddlewareMixin):
     """
-    Middleware para resolver el tenant basado en el subdominio
+    Middleware para resolver el tenant basado en el dominio o subdominio
     """
-    
+
     def process_request(self, request):
         # Obtener el host de la request
         host = request.get_host().split(':')[0]  # Remover el puerto si existe
-        
+
         # Para desarrollo local, usar un tenant por defecto si no hay subdominio
         if host in ['localhost', '127.0.0.1']:
             try:
-                tenant = Tenant.objects.filter(is_active=True).first()
-                if not tenant:
-                    # Crear tenant por defecto si no existe
-                    tenant = Tenant.objects.create(
-                        name="Demo Inmobiliaria",
-                        subdomain="demo",
-                        contact_email="info@demo.com",
-                        contact_phone="+1-555-0123"
-                    )
+                tenant = tenant_cache.get(DEFAULT_TENANT_KEY, self.get_default_tenant)
             except:
                 # Si hay error en la base de datos (migraciones pendientes), continuar
                 tenant = None
         else:
-            # Extraer subdominio del host
-            parts = host.split('.')
-            if len(parts) >= 3:
-                subdomain = parts[0]
-            else:
-                subdomain = host.split('.')[0] if '.' in host else host
-            
-            try:
-                tenant = Tenant.objects.get(subdomain=subdomain, is_active=True)
-            except Tenant.DoesNotExist:
+            # Dominio personalizado exacto primero, después el subdominio
+            host_map = tenant_cache.get(HOST_MAP_KEY, HostMap.build)
+            tenant = host_map.resolve(host)
+            if tenant is None:
                 raise Http404("Tenant no encontrado")
-        
+
         # Agregar el tenant a la request
         request.tenant = tenant
-        
+
         return None
+
+    def get_default_tenant(self):
+        tenant = Tenant.objects.filter(is_active=True).first()
+        if not tenant:
+            # Crear tenant por defecto si no existe
+            tenant = Tenant.objects.create(
+                name="Demo Inmobiliaria",
+                subdomain="demo",
+                contact_email="info@demo.com",
+                contact_phone="+1-555-0123"
+            )
+        return tenant
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-17 17:50
+
+from django.db import migrations, models
+
+
+def normalize_domains(apps, schema_editor):
+    """Dominios vacíos pasan a NULL para no chocar con el índice único"""
+    Tenant = apps.get_model('tenants', 'Tenant')
+    for tenant in Tenant.objects.exclude(domain__isnull=True):
+        domain = tenant.domain.strip().lower().rstrip('.') or None
+        if domain != tenant.domain:
+            Tenant.objects.filter(pk=tenant.pk).update(domain=domain)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tenants', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(normalize_domains, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='tenant',
+            name='domain',
+            field=models.CharField(blank=True, help_text='Dominio personalizado opcional (ej: www.cliente1.com)', max_length=255, null=True, unique=True, verbose_name='Dominio personalizado'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 18:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tenants', '0002_tenant_domain_unique'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tenant',
+            name='storage_quota_mb',
+            field=models.PositiveIntegerField(blank=True, help_text='Vacío: usa el límite por defecto del sistema', null=True, verbose_name='Cuota de almacenamiento (MB)'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-17 18:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tenants', '0003_tenant_storage_quota'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tenant',
+            name='contact_rate_burst',
+            field=models.PositiveIntegerField(blank=True, help_text='Envíos seguidos permitidos antes de aplicar el límite', null=True, verbose_name='Ráfaga de contactos'),
+        ),
+        migrations.AddField(
+            model_name='tenant',
+            name='contact_rate_per_minute',
+            field=models.PositiveIntegerField(blank=True, help_text='Vacío: usa el límite por defecto del sistema', null=True, verbose_name='Contactos por minuto'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-17 18:48
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tenants', '0004_tenant_contact_rate_limit'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TenantPlacement',
+            fields=[
+                ('tenant', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='placement', serialize=False, to='tenants.tenant', verbose_name='Tenant')),
+                ('database', models.CharField(max_length=100, verbose_name='Base de datos')),
+                ('state', models.CharField(choices=[('active', 'Activo'), ('moving', 'Moviéndose (escrituras bloqueadas)')], default='active', max_length=10, verbose_name='Estado')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Fecha de actualización')),
+            ],
+            options={
+                'verbose_name': 'Ubicación del tenant',
+                'verbose_name_plural': 'Ubicaciones de tenants',
+            },
+        ),
+    ]
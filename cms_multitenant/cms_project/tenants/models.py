@@ -18,8 +18,9 @@ class Tenant(models.Model):
         max_length=255, 
         blank=True, 
         null=True, 
+        unique=True,
         verbose_name="Dominio personalizado",
-        help_text="Dominio personalizado opcional"
+        help_text="Dominio personalizado opcional (ej: www.cliente1.com)"
     )
     is_active = models.BooleanField(default=True, verbose_name="Activo")
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="Fecha de creación")
@@ -29,6 +30,28 @@ class Tenant(models.Model):
     contact_email = models.EmailField(blank=True, verbose_name="Email de contacto")
     contact_phone = models.CharField(max_length=20, blank=True, verbose_name="Teléfono de contacto")
     address = models.TextField(blank=True, verbose_name="Dirección")
+
+    # Almacenamiento
+    storage_quota_mb = models.PositiveIntegerField(
+        blank=True,
+        null=True,
+        verbose_name="Cuota de almacenamiento (MB)",
+        help_text="Vacío: usa el límite por defecto del sistema"
+    )
+
+    # Límite del formulario de contacto por IP
+    contact_rate_per_minute = models.PositiveIntegerField(
+        blank=True,
+        null=True,
+        verbose_name="Contactos por minuto",
+        help_text="Vacío: usa el límite por defecto del sistema"
+    )
+    contact_rate_burst = models.PositiveIntegerField(
+        blank=True,
+        null=True,
+        verbose_name="Ráfaga de contactos",
+        help_text="Envíos seguidos permitidos antes de aplicar el límite"
+    )
     
     class Meta:
         verbose_name = "Tenant"
@@ -37,6 +60,11 @@ class Tenant(models.Model):
     def __str__(self):
         return f"{self.name} ({self.subdomain})"
 
+    def save(self, *args, **kwargs):
+        # Normalizar el dominio para que coincida con el host de la request
+        self.domain = (self.domain or '').strip().lower().rstrip('.') or None
+        super().save(*args, **kwargs)
+
 
 class TenantUser(models.Model):
     """
@@ -55,3 +83,34 @@ class TenantUser(models.Model):
     def __str__(self):
         role = "Dueño" if self.is_owner else "Usuario"
         return f"{self.user.username} - {self.tenant.name} ({role})"
+
+
+class TenantPlacement(models.Model):
+    """
+    Base de datos (shard) donde viven los datos del tenant. Sin fila, el
+    tenant está en la base por defecto. Se cambia con move_tenant.
+    """
+    ACTIVE = 'active'
+    MOVING = 'moving'
+    STATE_CHOICES = [
+        (ACTIVE, 'Activo'),
+        (MOVING, 'Moviéndose (escrituras bloqueadas)'),
+    ]
+
+    tenant = models.OneToOneField(
+        Tenant,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='placement',
+        verbose_name="Tenant"
+    )
+    database = models.CharField(max_length=100, verbose_name="Base de datos")
+    state = models.CharField(max_length=10, choices=STATE_CHOICES, default=ACTIVE, verbose_name="Estado")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Fecha de actualización")
+
+    class Meta:
+        verbose_name = "Ubicación del tenant"
+        verbose_name_plural = "Ubicaciones de tenants"
+
+    def __str__(self):
+        return f"{self.tenant_id} -> {self.database} ({self.state})"
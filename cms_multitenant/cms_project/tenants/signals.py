@@ -0,0 +1,32 @@
+
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+from .cache import tenant_cache, DEFAULT_TENANT_KEY, HOST_MAP_KEY
+from .membership import invalidate_membership
+from .models import Tenant, TenantUser
+
+
+@receiver(post_save, sender=Tenant)
+@receiver(post_delete, sender=Tenant)
+def invalidate_tenant_cache(sender, instance, **kwargs):
+    """
+    Invalida el mapa de hosts para que se reconstruya en la siguiente
+    request. El tenant por defecto de desarrollo depende de todos los
+    tenants, así que también se invalida.
+    """
+    tenant_cache.invalidate(HOST_MAP_KEY, DEFAULT_TENANT_KEY)
+
+
+@receiver(pre_save, sender=TenantUser)
+def invalidate_previous_membership(sender, instance, **kwargs):
+    """Si la relación cambia de tenant, el anterior también pierde la caché"""
+    if instance.pk:
+        previous = TenantUser.objects.filter(pk=instance.pk).values_list('tenant_id', flat=True).first()
+        if previous and previous != instance.tenant_id:
+            invalidate_membership(previous)
+
+
+@receiver(post_save, sender=TenantUser)
+@receiver(post_delete, sender=TenantUser)
+def invalidate_tenant_membership(sender, instance, **kwargs):
+    invalidate_membership(instance.tenant_id)
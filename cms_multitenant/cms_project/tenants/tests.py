@@ -1,3 +1,178 @@
-from django.test import TestCase
+import time
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import IntegrityError, connection, transaction
+from django.test import TestCase, Client, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from .cache import (
+    HOST_MAP_KEY, LRUCache, TenantCache, get_tenant_version, tenant_cache, tenant_version_key,
+)
+from .checks import check_tenant_cache
+from .hosts import HostMap, normalize_host
+from .models import Tenant, TenantUser
+
+
+class LRUCacheTests(TestCase):
+    def test_entries_expire_after_ttl(self):
+        lru = LRUCache(maxsize=10, ttl=30)
+        with mock.patch('cms_project.tenants.cache.time.monotonic', return_value=100):
+            lru.set('uno', 1)
+        with mock.patch('cms_project.tenants.cache.time.monotonic', return_value=129):
+            self.assertEqual(lru.get('uno'), 1)
+        with mock.patch('cms_project.tenants.cache.time.monotonic', return_value=131):
+            self.assertIsNone(lru.get('uno'))
+        self.assertEqual(len(lru), 0)
+
+    def test_evicts_least_recently_used(self):
+        lru = LRUCache(maxsize=2, ttl=30)
+        lru.set('uno', 1)
+        lru.set('dos', 2)
+        # Leer 'uno' lo vuelve el más reciente: sale 'dos'
+        self.assertEqual(lru.get('uno'), 1)
+        lru.set('tres', 3)
+        self.assertEqual(len(lru), 2)
+        self.assertIsNone(lru.get('dos'))
+        self.assertEqual(lru.get('uno'), 1)
+        self.assertEqual(lru.get('tres'), 3)
+
+
+class TenantCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        tenant_cache.clear()
+
+    def test_negative_lookups_are_cached(self):
+        tenants = TenantCache()
+        loader = mock.Mock(return_value=None)
+        self.assertIsNone(tenants.get('nadie', loader))
+        self.assertIsNone(tenants.get('nadie', loader))
+        loader.assert_called_once()
+
+        # Otro proceso (LRU vacío) también lo encuentra en la caché compartida
+        self.assertIsNone(TenantCache().get('nadie', loader))
+        loader.assert_called_once()
+
+    def test_unknown_hosts_do_not_query_the_database(self):
+        Tenant.objects.create(name='Uno', subdomain='uno')
+        client = Client(HTTP_HOST='nadie.example.com')
+        self.assertEqual(client.get('/').status_code, 404)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(client.get('/').status_code, 404)
+            self.assertEqual(Client(HTTP_HOST='otro.example.com').get('/').status_code, 404)
+        self.assertEqual(queries.captured_queries, [])
+
+    def test_saving_or_deleting_a_tenant_invalidates_the_host_map(self):
+        tenant = Tenant.objects.create(name='Uno', subdomain='uno')
+        client = Client(HTTP_HOST='nuevo.example.com')
+        self.assertEqual(client.get('/').status_code, 404)
+        self.assertIsNotNone(tenant_cache.local.get(HOST_MAP_KEY))
+
+        tenant.subdomain = 'nuevo'
+        tenant.save()
+        self.assertIsNone(tenant_cache.local.get(HOST_MAP_KEY))
+        self.assertIsNone(cache.get(tenant_cache.make_key(HOST_MAP_KEY)))
+        self.assertEqual(client.get('/').status_code, 200)
+
+        tenant.delete()
+        self.assertIsNone(tenant_cache.local.get(HOST_MAP_KEY))
+        self.assertEqual(client.get('/').status_code, 404)
+
+
+class HostMapTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        tenant_cache.clear()
+        self.uno = Tenant.objects.create(name='Uno', subdomain='uno', domain='WWW.Cliente.com.')
+        self.dos = Tenant.objects.create(name='Dos', subdomain='www')
+        self.inactivo = Tenant.objects.create(name='Tres', subdomain='tres', is_active=False)
+
+    def test_domain_is_normalized_on_save(self):
+        self.assertEqual(self.uno.domain, 'www.cliente.com')
+        self.assertEqual(normalize_host('Uno.Example.com:8000'), 'uno.example.com')
+        self.assertIsNone(Tenant.objects.create(name='Cuatro', subdomain='cuatro', domain='  ').domain)
+
+    def test_domain_wins_over_subdomain(self):
+        host_map = HostMap.build()
+        # 'www' también es el subdominio de otro tenant
+        self.assertEqual(host_map.resolve('www.cliente.com'), self.uno)
+        self.assertEqual(host_map.resolve('www.example.com'), self.dos)
+
+    def test_subdomain_fallback_ignores_case_and_port(self):
+        host_map = HostMap.build()
+        self.assertEqual(host_map.resolve('UNO.example.com:8000'), self.uno)
+        self.assertEqual(host_map.resolve('WWW.CLIENTE.COM:443'), self.uno)
+        self.assertIsNone(host_map.resolve('tres.example.com'))
+        self.assertIsNone(host_map.resolve('nadie.example.com'))
+        self.assertEqual(len(host_map), 2)
+
+    def test_normalized_domain_is_unique(self):
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Tenant.objects.create(name='Copia', subdomain='copia', domain='www.CLIENTE.com')
+        # El índice único también aplica a escrituras que no pasan por save()
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Tenant.objects.filter(pk=self.dos.pk).update(domain='www.cliente.com')
+        # Varios tenants sin dominio no chocan
+        Tenant.objects.create(name='Cinco', subdomain='cinco')
+        self.assertEqual(Tenant.objects.filter(domain__isnull=True).count(), 3)
+
+
+class MembershipCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        tenant_cache.clear()
+        self.tenant = Tenant.objects.create(name='Uno', subdomain='uno')
+        self.user = User.objects.create_user('agente', password='clave-segura-123', is_staff=True)
+        self.membership = TenantUser.objects.create(user=self.user, tenant=self.tenant)
+        self.client = Client(HTTP_HOST='uno.example.com')
+
+    def membership_queries(self, path='/admin/'):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(path)
+        return response, [q for q in queries.captured_queries if 'tenants_tenantuser' in q['sql']]
+
+    def test_logged_in_pages_do_not_query_membership(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post('/admin/login/', {
+                'username': 'agente', 'password': 'clave-segura-123', 'next': '/admin/'
+            })
+        self.assertEqual(response.status_code, 302)
+        # Una sola consulta entre el backend, el formulario y has_permission
+        self.assertEqual(len([q for q in queries.captured_queries if 'tenants_tenantuser' in q['sql']]), 1)
+
+        for _ in range(2):
+            response, queries = self.membership_queries()
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(queries, [])
+
+    def test_membership_change_invalidates_sessions(self):
+        self.client.force_login(self.user)
+        self.assertEqual(self.membership_queries()[0].status_code, 200)
+        self.membership.delete()
+        response, queries = self.membership_queries()
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(len(queries), 1)
+
+    @override_settings(MEMBERSHIP_CACHE_TTL=60)
+    def test_session_grant_expires_without_version_bump(self):
+        self.client.force_login(self.user)
+        self.assertEqual(self.membership_queries()[0].status_code, 200)
+        # Revocada en otro worker: la versión en la caché de este proceso no cambia
+        version = get_tenant_version('membership', self.tenant.pk)
+        self.membership.delete()
+        cache.set(tenant_version_key('membership', self.tenant.pk), version, None)
+        self.assertEqual(self.membership_queries()[0].status_code, 200)
+
+        later = time.time() + 61
+        with mock.patch('cms_project.tenants.membership.time.time', return_value=later):
+            response, queries = self.membership_queries()
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(len(queries), 1)
+
+    def test_check_requires_cross_process_cache(self):
+        self.assertEqual([error.id for error in check_tenant_cache(None)], ['tenants.W001'])
+        with override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+                                                   'LOCATION': 'cache'}}):
+            self.assertEqual(check_tenant_cache(None), [])